@@ -172,12 +172,14 @@ class DirArtifact(Artifact):
             raise ValueError("local/source path not specified")
 
         files = os.listdir(self.src_path)
+        uploads = {}
         for f in files:
             file_path = os.path.join(self.src_path, f)
             if not os.path.isfile(file_path):
                 raise ValueError(f"file {file_path} not found, cant upload")
             target = os.path.join(self.target_path, f)
-            store_manager.object(url=target).upload(file_path)
+            uploads[target] = file_path
+        store_manager.upload_many(uploads)
 
 
 class LinkArtifact(Artifact):
@@ -224,11 +226,14 @@ def upload_extra_data(
     if not extra_data:
         return
     target_path = artifact_spec.target_path
+    # the objects are written/uploaded in parallel (bulk) after the validation
+    puts = {}
+    uploads = {}
     for key, item in extra_data.items():
 
         if isinstance(item, bytes):
             target = os.path.join(target_path, key)
-            store_manager.object(url=target).put(item)
+            puts[target] = item
             artifact_spec.extra_data[prefix + key] = target
             continue
 
@@ -241,11 +246,14 @@ def upload_extra_data(
             if not os.path.isfile(src_path):
                 raise ValueError(f"extra data file {src_path} not found")
             target = os.path.join(target_path, item)
-            store_manager.object(url=target).upload(src_path)
+            uploads[target] = src_path
 
         if update_spec:
             artifact_spec.extra_data[prefix + key] = item
 
+    store_manager.put_many(puts)
+    store_manager.upload_many(uploads)
+
 
 def get_artifact_meta(artifact):
     """return artifact object, and list of extra data items
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from os import path
-from tempfile import mktemp
 from typing import List
 
 import yaml
@@ -216,9 +215,7 @@ def get_model(model_dir, suffix=""):
     if obj.kind == "file":
         return model_file, model_spec, extra_dataitems
 
-    tmp = mktemp(suffix)
-    obj.download(tmp)
-    return tmp, model_spec, extra_dataitems
+    return obj.local(suffix=suffix), model_spec, extra_dataitems
 
 
 def _load_model_spec(specpath):
@@ -142,13 +142,39 @@ default_config = {
             "user_token": "",
         },
     },
+    "data_cache": {
+        # local directory for caching downloaded remote objects (DataItem.local(),
+        # dataframe reads, models), empty = disabled, e.g. "~/.mlrun/cache"
+        "path": "",
+        # max cache size in bytes, least recently used objects are evicted
+        "max_size": 10 * 1024 ** 3,
+    },
+    "data_transfer": {
+        # part size (bytes) and number of parallel parts of the multipart uploads
+        # and ranged downloads of large objects (s3, azure, v3io)
+        "part_size": 8 * 1024 ** 2,
+        "concurrency": 8,
+        # max parallel object operations of the bulk (many objects/dir) transfers
+        "bulk_concurrency": 32,
+    },
     "feature_store": {
         "data_prefixes": {
             "default": "v3io:///projects/{project}/fs/{kind}",
             "nosql": "v3io:///projects/{project}/fs/{kind}",
+            # local embedded online target
+            "sqlite": "./projects/{project}/fs/{kind}",
         },
         "default_targets": "parquet,nosql",
         "default_job_image": "mlrun/mlrun",
+        # max number of feature sets loaded concurrently by the local merger
+        "merger_max_workers": 8,
+        # max number of processes used to ingest glob/directory sources (0 = cpus)
+        "ingestion_max_workers": 0,
+        # default max number of keys per feature set in the online feature cache
+        "online_cache_max_entries": 10000,
+        # with the approximate stats infer option, the stats of dataframes with more
+        # rows are computed from a sample of this many rows (0 = exact stats)
+        "stats_sample_rows": 1000000,
     },
     "ui": {
         "projects_prefix": "projects",  # The UI link prefix for projects
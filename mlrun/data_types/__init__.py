@@ -1,7 +1,7 @@
 # flake8: noqa  - this is until we take care of the F401 violations with respect to __all__ & sphinx
 
 from .data_types import ValueType, pd_schema_to_value_type, InferOptions
-from .infer import DFDataInfer
+from .infer import DFDataInfer, StatsAccumulator
 
 
 class BaseDataInfer:
@@ -97,6 +97,9 @@ class InferOptions:
     Stats = 8
     Histogram = 16
     Preview = 32
+    # large dataframes stats are approximated from a sample (see get_df_stats),
+    # opt-in, not included in all() and the default options
+    Approximate = 64
 
     @staticmethod
     def schema():
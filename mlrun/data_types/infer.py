@@ -1,6 +1,10 @@
+import base64
+import zlib
+
 import pandas as pd
 import numpy as np
 
+from ..config import config
 from .data_types import InferOptions, pd_schema_to_value_type
 from pandas.io.json._table_schema import convert_pandas_type_to_json_field
 
@@ -64,32 +68,42 @@ def _get_column_type(column):
     return pd_schema_to_value_type(field["type"])
 
 
-def get_df_stats(df, options, num_bins=None):
-    """get per column data stats from dataframe"""
+def get_df_stats(df, options, num_bins=None, sample_rows=None):
+    """get per column data stats from dataframe
+
+    with the Approximate option, the stats of dataframes with more than sample_rows
+    rows (default to the config feature_store.stats_sample_rows) are described from
+    a random sample, the count, mean, std, min and max are still exact (vectorized
+    aggregations), the histograms are binned over the exact range and scaled, and
+    the unique counts are estimated from the sample
+    """
 
     results_dict = {}
     num_bins = num_bins or default_num_bins
     if InferOptions.get_common_options(options, InferOptions.Index) and df.index.name:
         df = df.reset_index()
-    for col, values in df.describe(
+    sample_df = _get_stats_sample(df, options, sample_rows)
+    for col, values in (sample_df if sample_df is not None else df).describe(
         include="all", percentiles=[], datetime_is_numeric=True
     ).items():
         stats_dict = {}
         for stat, val in values.dropna().items():
             if stat != "50%":
-                if isinstance(val, (float, np.floating, np.float64)):
-                    stats_dict[stat] = float(val)
-                elif isinstance(val, (int, np.integer, np.int64)):
-                    stats_dict[stat] = int(val)
-                else:
-                    stats_dict[stat] = str(val)
+                stats_dict[stat] = _stat_value(val)
+        if sample_df is not None:
+            _update_sampled_stats(stats_dict, df[col], sample_df[col])
 
         if InferOptions.get_common_options(
             options, InferOptions.Histogram
         ) and pd.api.types.is_numeric_dtype(df[col]):
             # store histogram
             try:
-                hist, bins = np.histogram(df[col], bins=num_bins)
+                if sample_df is not None:
+                    hist, bins = _get_sampled_histogram(
+                        df[col], sample_df[col], num_bins
+                    )
+                else:
+                    hist, bins = np.histogram(df[col], bins=num_bins)
                 stats_dict["hist"] = [hist.tolist(), bins.tolist()]
             except Exception:
                 pass
@@ -98,6 +112,338 @@ def get_df_stats(df, options, num_bins=None):
     return results_dict
 
 
+def _get_stats_sample(df, options, sample_rows=None):
+    """return a random sample of the df rows, or None if the stats are exact"""
+    if not InferOptions.get_common_options(options, InferOptions.Approximate):
+        return None
+    if sample_rows is None:
+        sample_rows = int(config.feature_store.stats_sample_rows)
+    if not sample_rows or len(df) <= sample_rows:
+        return None
+    rows = np.random.default_rng(0).choice(len(df), sample_rows, replace=False)
+    return df.iloc[np.sort(rows)]
+
+
+def _update_sampled_stats(stats_dict, series, sample):
+    """replace the sample stats with the exact (cheap) stats or the estimates"""
+    stats_dict["count"] = int(series.count())
+    if not pd.api.types.is_bool_dtype(series) and (
+        pd.api.types.is_numeric_dtype(series)
+        or pd.api.types.is_datetime64_any_dtype(series)
+    ):
+        for stat in ["mean", "std", "min", "max"]:
+            if stat in stats_dict:
+                stats_dict[stat] = _stat_value(getattr(series, stat)())
+    sample = sample.dropna()
+    if "unique" in stats_dict:
+        stats_dict["unique"] = _estimate_distinct(sample, stats_dict["count"])
+    if "freq" in stats_dict and len(sample):
+        scale = stats_dict["count"] / len(sample)
+        stats_dict["freq"] = int(round(stats_dict["freq"] * scale))
+
+
+def _estimate_distinct(sample, count):
+    """estimate the number of distinct values from a sample (Duj1 estimator)
+
+    :param sample: sample values (without nulls)
+    :param count:  total number of (non null) values
+    """
+    sample_count = len(sample)
+    if not sample_count or sample_count >= count:
+        return int(sample.nunique())
+    frequencies = sample.value_counts()
+    distinct = len(frequencies)
+    singletons = int((frequencies == 1).sum())
+    estimate = distinct / (
+        1 - (1 - sample_count / count) * singletons / sample_count
+    )
+    return int(min(max(round(estimate), distinct), count))
+
+
+def _get_sampled_histogram(series, sample, num_bins):
+    """histogram over the exact value range, the sample counts are scaled"""
+    sample = sample.dropna()
+    hist, bins = np.histogram(
+        sample, bins=num_bins, range=(series.min(), series.max())
+    )
+    hist = np.round(hist * (series.count() / len(sample))).astype(int)
+    return hist, bins
+
+
+def _stat_value(val):
+    if isinstance(val, (float, np.floating, np.float64)):
+        return float(val)
+    elif isinstance(val, (int, np.integer, np.int64)):
+        return int(val)
+    return str(val)
+
+
+class StatsAccumulator:
+    """mergeable per column data stats, updated chunk by chunk
+
+    the count, mean, std, min and max of every column are merged from the chunk
+    stats (the variance is merged with the parallel algorithm of Chan et al.), with
+    the Histogram option the numeric columns also keep a fixed bins histogram and
+    all the columns keep a HyperLogLog distinct count sketch, so the stats of large
+    data are computed without holding it in memory (e.g. per chunk, file or spark
+    partition, and merged across the workers)
+
+    the stats dict (to_dict) includes the sketches, so the stats of a previous run
+    can be restored (from_dict) and merged with the stats of new data
+
+    example::
+
+        stats = StatsAccumulator()
+        for chunk in mlrun.get_dataitem(url).as_df_iter(100000):
+            stats.update(chunk)
+        featureset.status.stats = stats.to_dict()
+    """
+
+    def __init__(self, options: InferOptions = InferOptions.Stats, num_bins=None):
+        self.options = options
+        self.num_bins = num_bins or default_num_bins
+        self._columns = {}
+
+    @classmethod
+    def from_dict(cls, stats: dict, options: InferOptions = InferOptions.Stats):
+        """restore the accumulator from a stats dict (e.g. featureset.status.stats)
+
+        stats dicts without sketches (e.g. of get_df_stats) are restored without
+        the distinct counts
+        """
+        accumulator = cls(options)
+        for column, stats_dict in (stats or {}).items():
+            accumulator._columns[column] = _column_stats_from_dict(stats_dict)
+            if "hist" in stats_dict:
+                accumulator.num_bins = len(stats_dict["hist"][0])
+        return accumulator
+
+    @property
+    def _with_sketches(self):
+        return bool(
+            InferOptions.get_common_options(self.options, InferOptions.Histogram)
+        )
+
+    def update(self, df: pd.DataFrame):
+        """add the stats of a dataframe (chunk)"""
+        if InferOptions.get_common_options(self.options, InferOptions.Index) and (
+            df.index.name
+        ):
+            df = df.reset_index()
+        for column, series in df.items():
+            self._merge_column(
+                column,
+                _get_column_stats(
+                    series, self.num_bins if self._with_sketches else None
+                ),
+            )
+        return self
+
+    def merge(self, other: "StatsAccumulator"):
+        """merge the stats of another accumulator (e.g. of a different worker)"""
+        for column, stats in other._columns.items():
+            self._merge_column(column, stats)
+        return self
+
+    def _merge_column(self, column, stats):
+        current = self._columns.get(column)
+        self._columns[column] = (
+            stats
+            if current is None
+            else _merge_column_stats(current, stats, self.num_bins)
+        )
+
+    def to_dict(self):
+        """return the stats dict (in the get_df_stats format, with the sketches)"""
+        results_dict = {}
+        for column, stats in self._columns.items():
+            stats_dict = {"count": stats["count"]}
+            if "mean" in stats:
+                stats_dict["mean"] = float(stats["mean"])
+                if stats["n"] > 1:
+                    stats_dict["std"] = float(np.sqrt(stats["m2"] / (stats["n"] - 1)))
+            for stat in ["min", "max"]:
+                if stat in stats:
+                    stats_dict[stat] = _stat_value(stats[stat])
+            if "hll" in stats:
+                stats_dict["unique"] = stats["hll"].count()
+                stats_dict["hll"] = stats["hll"].to_string()
+            if "hist" in stats:
+                counts, low, high = stats["hist"]
+                bins = np.linspace(low, high, len(counts) + 1)
+                stats_dict["hist"] = [counts.tolist(), bins.tolist()]
+            results_dict[column] = stats_dict
+        return results_dict
+
+
+def _get_column_stats(series, num_bins=None):
+    """return the mergeable stats of a series, with sketches if num_bins is set"""
+    values = series.dropna()
+    stats = {"count": len(values)}
+    if num_bins and len(values):
+        try:
+            stats["hll"] = HyperLogLog().update(values)
+        except TypeError:
+            # unhashable values (e.g. lists)
+            pass
+    if not len(values) or pd.api.types.is_bool_dtype(series):
+        return stats
+    if pd.api.types.is_datetime64_any_dtype(series):
+        stats.update({"min": values.min(), "max": values.max()})
+    elif pd.api.types.is_numeric_dtype(series):
+        values = values.astype(float)
+        mean = values.mean()
+        stats.update(
+            {
+                "n": len(values),
+                "mean": mean,
+                "m2": float(((values - mean) ** 2).sum()),
+                "min": series.min(),
+                "max": series.max(),
+            }
+        )
+        if num_bins:
+            counts, bins = np.histogram(values, bins=num_bins)
+            stats["hist"] = (counts, bins[0], bins[-1])
+    return stats
+
+
+def _merge_column_stats(stats, other, num_bins=None):
+    count = stats["count"] + other["count"]
+    merged = {"count": count}
+    for stat, func in [("min", min), ("max", max)]:
+        values = [item[stat] for item in [stats, other] if stat in item]
+        if values:
+            merged[stat] = func(values)
+    if "mean" in stats and "mean" in other:
+        n = stats["n"] + other["n"]
+        delta = other["mean"] - stats["mean"]
+        merged.update(
+            {
+                "n": n,
+                "mean": stats["mean"] + delta * other["n"] / n,
+                "m2": stats["m2"]
+                + other["m2"]
+                + delta ** 2 * stats["n"] * other["n"] / n,
+            }
+        )
+    elif "mean" in stats or "mean" in other:
+        item = stats if "mean" in stats else other
+        merged.update({key: item[key] for key in ["n", "mean", "m2"]})
+
+    # the sketches are merged only when both sides have them (or one is empty)
+    for stat, merge in [
+        ("hist", lambda one, two: _merge_histograms(one, two, num_bins)),
+        ("hll", lambda one, two: HyperLogLog().merge(one).merge(two)),
+    ]:
+        if stat in stats and stat in other:
+            merged[stat] = merge(stats[stat], other[stat])
+        elif stat in stats or stat in other:
+            item, empty = (stats, other) if stat in stats else (other, stats)
+            if not empty["count"]:
+                merged[stat] = item[stat]
+    return merged
+
+
+def _merge_histograms(hist, other, num_bins=None):
+    """merge two fixed bins histograms into bins over the joined value range
+
+    the bins of histograms with a different range are assigned (by their center)
+    to the new bins, histograms with the same range are merged exactly
+    """
+    num_bins = num_bins or len(hist[0])
+    low = min(hist[1], other[1])
+    high = max(hist[2], other[2])
+    edges = np.linspace(low, high, num_bins + 1)
+    counts = np.zeros(num_bins, dtype=np.int64)
+    for item_counts, item_low, item_high in [hist, other]:
+        item_edges = np.linspace(item_low, item_high, len(item_counts) + 1)
+        if len(item_counts) == num_bins and item_low == low and item_high == high:
+            counts += item_counts
+            continue
+        centers = (item_edges[:-1] + item_edges[1:]) / 2
+        positions = np.clip(
+            np.searchsorted(edges, centers, side="right") - 1, 0, num_bins - 1
+        )
+        np.add.at(counts, positions, item_counts)
+    return counts, low, high
+
+
+def _column_stats_from_dict(stats_dict):
+    """restore the mergeable column stats from a column stats dict"""
+    stats = {"count": int(stats_dict.get("count", 0))}
+    for stat in ["min", "max"]:
+        if stat in stats_dict:
+            value = stats_dict[stat]
+            # datetime stats are stored as strings
+            stats[stat] = pd.Timestamp(value) if isinstance(value, str) else value
+    if "mean" in stats_dict:
+        n = stats["count"]
+        std = stats_dict.get("std", 0.0)
+        stats.update({"n": n, "mean": stats_dict["mean"], "m2": std ** 2 * (n - 1)})
+    if "hist" in stats_dict:
+        counts, bins = stats_dict["hist"]
+        stats["hist"] = (np.array(counts, dtype=np.int64), bins[0], bins[-1])
+    if "hll" in stats_dict:
+        stats["hll"] = HyperLogLog.from_string(stats_dict["hll"])
+    return stats
+
+
+class HyperLogLog:
+    """HyperLogLog distinct count sketch (mergeable, ~1.6% error by default)"""
+
+    def __init__(self, precision: int = 12, registers=None):
+        self.precision = precision
+        self.registers = (
+            registers
+            if registers is not None
+            else np.zeros(1 << precision, dtype=np.uint8)
+        )
+
+    def update(self, values: pd.Series):
+        """add the (non null) values to the sketch"""
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(
+            dtype=np.uint64
+        )
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        # the rank is the position of the first 1 bit (in the remaining 32 bits)
+        remaining = ((hashes << np.uint64(self.precision)) >> np.uint64(32)).astype(
+            np.uint32
+        )
+        rank = np.full(len(hashes), 33, dtype=np.uint8)
+        nonzero = remaining > 0
+        rank[nonzero] = 32 - np.floor(np.log2(remaining[nonzero])).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """return the distinct count estimate"""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size ** 2 / np.sum(np.power(2.0, -self.registers))
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * size and zeros:
+            # small cardinalities are estimated by linear counting
+            estimate = size * np.log(size / zeros)
+        return int(round(estimate))
+
+    def to_string(self):
+        return base64.b64encode(zlib.compress(self.registers.tobytes())).decode()
+
+    @classmethod
+    def from_string(cls, value: str):
+        registers = np.frombuffer(
+            zlib.decompress(base64.b64decode(value)), dtype=np.uint8
+        ).copy()
+        return cls(int(np.log2(len(registers))), registers)
+
+
 def get_df_preview(df, preview_lines=20):
     """capture preview data from df"""
     # record sample rows from the dataframe
@@ -1,9 +1,23 @@
+import time
+from decimal import Decimal
+
 import numpy as np
 
 from .data_types import InferOptions, spark_to_value_type
+from ..utils import logger
 
 try:
     import pyspark.sql.functions as funcs
+    from pyspark.sql.types import (
+        DateType,
+        DoubleType,
+        FloatType,
+        NumericType,
+        StringType,
+        TimestampType,
+    )
+
+    _min_max_types = (NumericType, StringType, TimestampType, DateType)
 except ImportError:
     pass
 
@@ -60,112 +74,112 @@ def get_df_preview_spark(df, preview_lines=20):
     return preview
 
 
-def _create_hist_data(df, column, minim, maxim, bins=10):
-    def create_all_conditions(current_col, column, left_edges, count=1):
-        """
-        Recursive function that exploits the
-        ability to call the Spark SQL Column method
-        .when() in a recursive way.
-        """
-        left_edges = left_edges[:]
-        if len(left_edges) == 0:
-            return current_col
-        if len(left_edges) == 1:
-            next_col = current_col.when(
-                funcs.col(column) >= float(left_edges[0]), count
-            )
-            left_edges.pop(0)
-            return create_all_conditions(next_col, column, left_edges[:], count + 1)
-        next_col = current_col.when(
-            (float(left_edges[0]) <= funcs.col(column))
-            & (funcs.col(column) < float(left_edges[1])),
-            count,
-        )
-        left_edges.pop(0)
-        return create_all_conditions(next_col, column, left_edges[:], count + 1)
-
-    num_range = maxim - minim
-    bin_width = num_range / float(bins)
-    left_edges = [minim]
-
-    for _bin in range(bins):
-        left_edges = left_edges + [left_edges[-1] + bin_width]
-    left_edges.pop()
-    expression_col = funcs.when(
-        (float(left_edges[0]) <= funcs.col(column))
-        & (funcs.col(column) < float(left_edges[1])),
-        0,
-    )
-    left_edges_copy = left_edges[:]
-    left_edges_copy.pop(0)
-    bin_data = (
-        df.select(funcs.col(column))
-        .na.drop()
-        .select(
-            funcs.col(column),
-            create_all_conditions(expression_col, column, left_edges_copy).alias(
-                "bin_id"
-            ),
-        )
-        .groupBy("bin_id")
-        .count()
-    ).toPandas()
-
-    bin_data.index = bin_data["bin_id"]
-    new_index = list(range(bins))
-    bin_data = bin_data.reindex(new_index)
-    bin_data["bin_id"] = bin_data.index
-    bin_data = bin_data.fillna(0)
-    bin_data["left_edge"] = left_edges
-    bin_data["width"] = bin_width
-    bin_data = [
-        bin_data["count"].tolist(),
-        [round(x, 2) for x in bin_data["left_edge"].tolist()],
-    ]
-
-    return bin_data
-
-
 def get_dtype(df, colname):
     return [dtype for name, dtype in df.dtypes if name == colname][0]
 
 
 def get_df_stats_spark(df, options, num_bins=20):
+    """get per column data stats from a spark dataframe
+
+    the summary stats (count, mean, stddev, min, max and with the Approximate option
+    the approximate distinct count) of all the columns are computed in a single
+    aggregation pass, and the histograms of all the numeric columns in a second
+    pass (one grouped count of the column bins), instead of a describe() scan and a
+    scan per column histogram
+    """
     if InferOptions.get_common_options(options, InferOptions.Index):
         df = df.select("*").withColumn("id", funcs.monotonically_increasing_id())
 
-    describe_df = df.describe().toPandas()
-    describe_df = describe_df.set_index("summary")
-
-    results_dict = {}
-    for col, values in describe_df.items():
-        stats_dict = {}
-        for stat, val in values.dropna().items():
-            if isinstance(val, (float, np.floating, np.float64)):
-                stats_dict[stat] = float(val)
-            elif isinstance(val, (int, np.integer, np.int64)):
-                stats_dict[stat] = int(val)
-            else:
-                stats_dict[stat] = str(val)
-        results_dict[col] = stats_dict
-
-        if InferOptions.get_common_options(
-            options, InferOptions.Histogram
-        ) and get_dtype(df, col) in ["double", "int"]:
-            try:
-                results_dict[col]["hist"] = _create_hist_data(
-                    df,
-                    col,
-                    float(results_dict[col]["min"]),
-                    float(results_dict[col]["max"]),
-                    bins=num_bins,
-                )
-            except Exception:
-                pass
+    numeric_columns = []
+    aggregations = []
+    for field in df.schema.fields:
+        column = funcs.col(f"`{field.name}`")
+        if isinstance(field.dataType, (FloatType, DoubleType)):
+            # NaN values are skipped (like nulls and like the pandas stats)
+            column = funcs.when(~funcs.isnan(column), column)
+        aggregations.append((field.name, "count", funcs.count(column)))
+        if isinstance(field.dataType, NumericType):
+            numeric_columns.append(field.name)
+            aggregations.append((field.name, "mean", funcs.avg(column)))
+            aggregations.append((field.name, "stddev", funcs.stddev_samp(column)))
+        if isinstance(field.dataType, _min_max_types):
+            aggregations.append((field.name, "min", funcs.min(column)))
+            aggregations.append((field.name, "max", funcs.max(column)))
+        if InferOptions.get_common_options(options, InferOptions.Approximate):
+            aggregations.append(
+                (field.name, "unique", funcs.approx_count_distinct(column))
+            )
+
+    start = time.monotonic()
+    values = df.agg(*[aggregation for _, _, aggregation in aggregations]).first()
+    results_dict = {column: {} for column in df.columns}
+    for (column, stat, _), val in zip(aggregations, values):
+        if val is not None:
+            results_dict[column][stat] = _stat_value(val)
+    logger.debug(f"computed spark summary stats in {time.monotonic() - start:.2f}s")
+
+    if InferOptions.get_common_options(options, InferOptions.Histogram):
+        start = time.monotonic()
+        for column, hist in _get_histograms(
+            df, numeric_columns, results_dict, num_bins
+        ).items():
+            results_dict[column]["hist"] = hist
+        logger.debug(f"computed spark histograms in {time.monotonic() - start:.2f}s")
 
     return results_dict
 
 
+def _get_histograms(df, columns, stats, num_bins):
+    """compute the (fixed bins) histograms of the numeric columns in one pass"""
+    ranges = {}
+    for column in columns:
+        if "min" in stats[column] and "max" in stats[column]:
+            low, high = float(stats[column]["min"]), float(stats[column]["max"])
+            if low == high:
+                # same as numpy, a constant column range is expanded
+                low, high = low - 0.5, high + 0.5
+            ranges[column] = (low, high)
+    if not ranges:
+        return {}
+
+    bins = []
+    for index, (column, (low, high)) in enumerate(ranges.items()):
+        width = (high - low) / num_bins
+        value = funcs.col(f"`{column}`").cast("double")
+        # NaN values are not binned (the floor of NaN is cast to a bin number)
+        value = funcs.when(~funcs.isnan(value), value)
+        bin_id = funcs.least(
+            funcs.floor((value - low) / width).cast("int"), funcs.lit(num_bins - 1)
+        )
+        bins.append(funcs.struct(funcs.lit(index).alias("column"), bin_id.alias("bin")))
+    counts = (
+        df.select(funcs.explode(funcs.array(*bins)).alias("item"))
+        .where(funcs.col("item.bin").isNotNull())
+        .groupBy("item.column", "item.bin")
+        .count()
+        .collect()
+    )
+
+    names = list(ranges.keys())
+    hists = {column: [0] * num_bins for column in names}
+    for column_index, bin_id, count in counts:
+        hists[names[column_index]][bin_id] = count
+    results = {}
+    for column, (low, high) in ranges.items():
+        # the histograms are [counts, bins left edges] (rounded to 2 decimals)
+        edges = np.linspace(low, high, num_bins + 1).tolist()[:-1]
+        results[column] = [hists[column], [round(edge, 2) for edge in edges]]
+    return results
+
+
+def _stat_value(val):
+    if isinstance(val, (float, np.floating, Decimal)):
+        return float(val)
+    elif isinstance(val, (int, np.integer)):
+        return int(val)
+    return str(val)
+
+
 class SparkDataInfer:
     infer_schema = infer_schema_from_df_spark
     get_preview = get_df_preview_spark
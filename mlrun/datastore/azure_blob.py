@@ -15,6 +15,8 @@
 import time
 import fsspec
 from azure.storage.blob import BlobServiceClient
+
+from ..config import config
 from .base import DataStore, FileStats
 
 # Azure blobs will be represented with the following URL: az://<container name>. The storage account is already
@@ -22,12 +24,22 @@ from .base import DataStore, FileStats
 
 
 class AzureBlobStore(DataStore):
+    support_ranges = True
+
     def __init__(self, parent, schema, name, endpoint=""):
         super().__init__(parent, name, schema, endpoint)
 
         con_string = self._get_secret_or_env("AZURE_STORAGE_CONNECTION_STRING")
         if con_string:
-            self.bsc = BlobServiceClient.from_connection_string(con_string)
+            # larger blobs are transferred in parallel blocks/ranges of part_size
+            part_size = int(config.data_transfer.part_size)
+            self.bsc = BlobServiceClient.from_connection_string(
+                con_string,
+                max_single_put_size=part_size,
+                max_block_size=part_size,
+                max_single_get_size=part_size,
+                max_chunk_get_size=part_size,
+            )
 
     def get_filesystem(self, silent=True):
         """return fsspec file system object, if supported"""
@@ -57,7 +69,19 @@ class AzureBlobStore(DataStore):
         # Need to strip leading / from key
         blob_client = self.bsc.get_blob_client(container=self.endpoint, blob=key[1:])
         with open(src_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
+            blob_client.upload_blob(
+                data,
+                overwrite=True,
+                max_concurrency=int(config.data_transfer.concurrency),
+            )
+
+    def download(self, key, target_path):
+        blob_client = self.bsc.get_blob_client(container=self.endpoint, blob=key[1:])
+        downloader = blob_client.download_blob(
+            max_concurrency=int(config.data_transfer.concurrency)
+        )
+        with open(target_path, "wb") as fp:
+            downloader.readinto(fp)
 
     def get(self, key, size=None, offset=0):
         blob_client = self.bsc.get_blob_client(container=self.endpoint, blob=key[1:])
@@ -74,7 +98,7 @@ class AzureBlobStore(DataStore):
         props = blob_client.get_blob_properties()
         size = props.size
         modified = props.last_modified
-        return FileStats(size, time.mktime(modified.timetuple()))
+        return FileStats(size, time.mktime(modified.timetuple()), etag=props.etag)
 
     def listdir(self, key):
         if key and not key.endswith("/"):
@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
 from os import remove, path, getenv
 from tempfile import mktemp
 
@@ -22,24 +24,33 @@ import urllib3
 import pandas as pd
 
 import mlrun.errors
+from mlrun.config import config
 from mlrun.utils import logger
+from .cache import get_data_cache
+from .utils import filter_df, time_range_filters
 
 verify_ssl = False
+# read buffer size when streaming objects from stores without a filesystem
+stream_buffer_size = 8 * 1024 * 1024
 if not verify_ssl:
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
 class FileStats:
-    def __init__(self, size, modified, content_type=None):
+    def __init__(self, size, modified, content_type=None, etag=None):
         self.size = size
         self.modified = modified
         self.content_type = content_type
+        self.etag = etag
 
     def __repr__(self):
         return f"FileStats(size={self.size}, modified={self.modified}, type={self.content_type})"
 
 
 class DataStore:
+    # get() supports ranged reads (size, offset) without reading the whole object
+    support_ranges = False
+
     def __init__(self, parent, name, kind, endpoint=""):
         self._parent = parent
         self.kind = kind
@@ -110,6 +121,11 @@ class DataStore:
         raise ValueError("data store doesnt support listdir")
 
     def download(self, key, target_path):
+        size = self._get_size(key) if self.support_ranges else None
+        if size and size > int(config.data_transfer.part_size):
+            self._download_parts(key, target_path, size)
+            return
+
         data = self.get(key)
         mode = "wb"
         if isinstance(data, str):
@@ -121,32 +137,128 @@ class DataStore:
     def upload(self, key, src_path):
         pass
 
-    def as_df(self, url, subpath, columns=None, df_module=None, format="", **kwargs):
-        df_module = df_module or pd
-        if url.endswith(".csv") or format == "csv":
-            if columns:
-                kwargs["usecols"] = columns
-            reader = df_module.read_csv
-        elif url.endswith(".parquet") or url.endswith(".pq") or format == "parquet":
-            if columns:
-                kwargs["columns"] = columns
-            reader = df_module.read_parquet
-        elif url.endswith(".json") or format == "json":
-            reader = df_module.read_json
-
-        else:
-            raise Exception(f"file type unhandled {url}")
+    def as_df(
+        self,
+        url,
+        subpath,
+        columns=None,
+        df_module=None,
+        format="",
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+        **kwargs,
+    ):
+        filters = time_range_filters(time_column, start_time, end_time) + (
+            filters or []
+        )
+        if df_module is not None and df_module is not pd:
+            # distributed df modules (e.g. dask) read the url by themselves
+            return read_df(
+                url,
+                url,
+                df_module,
+                format,
+                columns,
+                filters,
+                storage_options=self.get_storage_options(),
+                **kwargs,
+            )
 
         fs = self.get_filesystem()
+        is_dir = fs is not None and format in ["", "parquet"] and fs.isdir(url)
+        if is_dir:
+            format = "parquet"
+        # remote objects are read from the local cache (when enabled)
+        cache = get_data_cache() if self.kind != "file" and not is_dir else None
+        if cache:
+            suffix = path.splitext(subpath)[1]
+            cached = cache.get(self, self._join(subpath), url, suffix)
+            if cached:
+                return read_df(
+                    cached, url, df_module, format, columns, filters, **kwargs
+                )
+
         if fs:
-            return reader(fs.open(url), **kwargs)
+            if is_dir:
+                # partitioned parquet dataset (directory)
+                return read_df(
+                    url,
+                    url,
+                    df_module,
+                    format,
+                    columns,
+                    filters,
+                    filesystem=fs,
+                    **kwargs,
+                )
+            return read_df(
+                fs.open(url), url, df_module, format, columns, filters, **kwargs
+            )
 
         tmp = mktemp()
         self.download(self._join(subpath), tmp)
-        df = reader(tmp, **kwargs)
+        df = read_df(tmp, url, df_module, format, columns, filters, **kwargs)
         remove(tmp)
         return df
 
+    def as_df_iter(self, url, subpath, chunk_rows, columns=None, format="", **kwargs):
+        """iterate over the object dataframe chunks (of up to chunk_rows rows)
+
+        the object is streamed through the fsspec filesystem, or through ranged
+        get() calls when the store has no filesystem (and the object size is known)
+        """
+        fs = self.get_filesystem()
+        if fs:
+            with fs.open(url) as fp:
+                yield from read_df_chunks(
+                    fp, url, chunk_rows, format, columns, **kwargs
+                )
+            return
+
+        size = self._get_size(subpath)
+        if size:
+            with io.BufferedReader(
+                RangeReader(self, subpath, size), buffer_size=stream_buffer_size
+            ) as fp:
+                yield from read_df_chunks(
+                    fp, url, chunk_rows, format, columns, **kwargs
+                )
+            return
+
+        tmp = mktemp()
+        self.download(self._join(subpath), tmp)
+        try:
+            yield from read_df_chunks(tmp, url, chunk_rows, format, columns, **kwargs)
+        finally:
+            remove(tmp)
+
+    def _download_parts(self, key, target_path, size):
+        """download the object with parallel ranged gets, each part is written
+        to its offset in the target file (only the running parts are in memory)"""
+        part_size = int(config.data_transfer.part_size)
+        with open(target_path, "wb") as fp:
+            fp.truncate(size)
+
+        def download_part(offset):
+            data = self.get(key, min(part_size, size - offset), offset)
+            with open(target_path, "r+b") as fp:
+                fp.seek(offset)
+                fp.write(data)
+
+        with ThreadPoolExecutor(int(config.data_transfer.concurrency)) as executor:
+            # list() to raise the parts errors
+            list(executor.map(download_part, range(0, size, part_size)))
+
+    def _get_size(self, key):
+        """return the object size, or None if the store cant tell"""
+        try:
+            stats = self.stat(key)
+        except Exception:
+            return None
+        return getattr(stats, "size", None)
+
     def to_dict(self):
         return {
             "name": self.name,
@@ -244,25 +356,53 @@ class DataItem:
         """return a list of child file names"""
         return self._store.listdir(self._path)
 
-    def local(self):
-        """get the local path of the file, download to tmp first if its a remote object"""
+    def local(self, suffix: str = None):
+        """get the local path of the file, download to tmp first if its a remote object
+
+        remote objects are downloaded to the local data cache when it is enabled
+        (config.data_cache.path), and reused while the object is not modified
+
+        :param suffix: local file suffix (default: the object path suffix)
+        """
         if self.kind == "file":
             return self._path
         if self._local_path:
             return self._local_path
 
-        dot = self._path.rfind(".")
-        self._local_path = mktemp() if dot == -1 else mktemp(self._path[dot:])
+        suffix = self.suffix if suffix is None else suffix
+        cache = get_data_cache()
+        if cache:
+            cached = cache.get(self._store, self._path, self._url, suffix)
+            if cached:
+                return cached
+
+        self._local_path = mktemp(suffix)
         logger.info(f"downloading {self.url} to local tmp")
         self.download(self._local_path)
         return self._local_path
 
-    def as_df(self, columns=None, df_module=None, format="", **kwargs):
+    def as_df(
+        self,
+        columns=None,
+        df_module=None,
+        format="",
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+        **kwargs,
+    ):
         """return a dataframe object (generated from the dataitem).
 
-        :param columns:   optional, list of columns to select
-        :param df_module: optional, dataframe class (e.g. pd, dd, cudf, ..)
-        :param format:    file format, if not specified it will be deducted from the suffix
+        :param columns:     optional, list of columns to select
+        :param df_module:   optional, dataframe class (e.g. pd, dd, cudf, ..)
+        :param format:      file format, if not specified it will be deducted from the suffix
+        :param start_time:  optional, return only rows where time_column >= start_time
+        :param end_time:    optional, return only rows where time_column <= end_time
+        :param time_column: the timestamp column used with start_time/end_time
+        :param filters:     optional, list of row filters in the form (column, op, value),
+                            e.g. [("ticker", "in", ["GOOG", "MSFT"])], parquet reads push the
+                            filters down to skip row groups/partitions
         """
         return self._store.as_df(
             self._url,
@@ -270,9 +410,28 @@ class DataItem:
             columns=columns,
             df_module=df_module,
             format=format,
+            start_time=start_time,
+            end_time=end_time,
+            time_column=time_column,
+            filters=filters,
             **kwargs,
         )
 
+    def as_df_iter(self, chunk_rows, columns=None, format="", **kwargs):
+        """return an iterator of dataframe chunks (generated from the dataitem)
+
+        the data is streamed from the store and parsed chunk by chunk, csv and
+        json lines (.jsonl) files are read in chunks of chunk_rows rows and parquet
+        files are read one row group at a time, so only one chunk is held in memory
+
+        :param chunk_rows:  max number of rows per chunk
+        :param columns:     optional, list of columns to select
+        :param format:      file format, if not specified it will be deducted from the suffix
+        """
+        return self._store.as_df_iter(
+            self._url, self._path, chunk_rows, columns=columns, format=format, **kwargs
+        )
+
     def __str__(self):
         return self.url
 
@@ -280,10 +439,138 @@ class DataItem:
         return f"'{self.url}'"
 
 
+def read_df(
+    source, url, df_module=None, format="", columns=None, filters=None, **kwargs
+):
+    """read a dataframe from a file/path/buffer, the reader is selected by url suffix or format
+
+    filters are pushed down to parquet reads (row group/partition pruning) and applied
+    to the resulting rows for all formats
+    """
+    df_module = df_module or pd
+    read_columns = columns
+    if columns and filters:
+        # the filter columns must be read for filtering, and dropped later
+        read_columns = list(columns)
+        for column, _, _ in filters:
+            if column not in read_columns:
+                read_columns.append(column)
+
+    if url.endswith(".csv") or format == "csv":
+        if read_columns:
+            kwargs["usecols"] = read_columns
+        reader = df_module.read_csv
+    elif url.endswith(".parquet") or url.endswith(".pq") or format == "parquet":
+        if read_columns:
+            kwargs["columns"] = read_columns
+        if filters:
+            kwargs["filters"] = filters
+        reader = df_module.read_parquet
+    elif url.endswith(".json") or format == "json":
+        reader = df_module.read_json
+    else:
+        raise mlrun.errors.MLRunInvalidArgumentError(f"file type unhandled {url}")
+
+    df = filter_df(reader(source, **kwargs), filters)
+    if read_columns and len(read_columns) > len(columns):
+        df = df.drop(columns=read_columns[len(columns) :], errors="ignore")
+    return df
+
+
+def read_df_chunks(source, url, chunk_rows, format="", columns=None, **kwargs):
+    """read dataframe chunks (of up to chunk_rows rows) from a file/path/buffer
+
+    csv and json lines (.jsonl/.ndjson, or json with lines=True) files are parsed
+    chunk by chunk, parquet files are read one row group at a time (row groups
+    larger than chunk_rows are split)
+    """
+    if not chunk_rows or chunk_rows < 1:
+        raise mlrun.errors.MLRunInvalidArgumentError("chunk_rows must be positive")
+
+    if url.endswith(".csv") or format == "csv":
+        if columns:
+            kwargs["usecols"] = columns
+        reader = pd.read_csv(source, chunksize=chunk_rows, **kwargs)
+        try:
+            yield from reader
+        finally:
+            reader.close()
+    elif (
+        url.endswith(".jsonl")
+        or url.endswith(".ndjson")
+        or format == "jsonl"
+        or ((url.endswith(".json") or format == "json") and kwargs.get("lines"))
+    ):
+        kwargs["lines"] = True
+        if hasattr(source, "read") and not isinstance(source, io.TextIOBase):
+            source = io.TextIOWrapper(source, encoding=kwargs.pop("encoding", "utf-8"))
+        reader = pd.read_json(source, chunksize=chunk_rows, **kwargs)
+        try:
+            for chunk in reader:
+                yield chunk[columns] if columns else chunk
+        finally:
+            reader.close()
+    elif url.endswith(".parquet") or url.endswith(".pq") or format == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        for index in range(parquet_file.num_row_groups):
+            table = parquet_file.read_row_group(index, columns=columns)
+            for start in range(0, table.num_rows, chunk_rows):
+                yield table.slice(start, chunk_rows).to_pandas(**kwargs)
+    else:
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            f"chunked read is not supported for file type {url}"
+        )
+
+
+class RangeReader(io.RawIOBase):
+    """seekable (binary) file object which reads a store object with ranged gets
+
+    used to stream objects from stores without an fsspec filesystem, wrap it with
+    io.BufferedReader to read in large ranges
+    """
+
+    def __init__(self, store: DataStore, key: str, size: int):
+        self._store = store
+        self._key = key
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(offset, 0)
+        return self._position
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._size - self._position)
+        if size <= 0:
+            return 0
+        data = self._store.get(self._key, size=size, offset=self._position)[:size]
+        if isinstance(data, str):
+            data = data.encode()
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
 def get_range(size, offset):
     byterange = f"bytes={offset}-"
     if size:
-        byterange += str(offset + size)
+        # the range end is inclusive
+        byterange += str(offset + size - 1)
     return byterange
 
 
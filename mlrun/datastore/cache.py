@@ -0,0 +1,210 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from os import path
+
+from ..config import config
+from ..utils import logger
+
+try:
+    import fcntl
+except ImportError:
+    # no cross process entry locks (e.g. on windows)
+    fcntl = None
+
+lock_suffix = ".lock"
+tmp_suffix = ".tmp"
+
+
+class DataCache:
+    """size bounded local disk cache of remote objects, shared by local processes
+
+    the entries are keyed by the object url and stats (etag, size and modified
+    time), so modified objects are downloaded again, a cached file is used only if
+    its size matches the object size, downloads are written to a temp file and
+    renamed (atomic) under a per entry file lock, and the least recently used
+    entries are evicted when the cache is larger than max_size bytes
+
+    enable it with the config data_cache.path (e.g. MLRUN_DATA_CACHE__PATH env var),
+    the cache is used by DataItem.local() and by the dataframe reads and model
+    loading of remote objects
+
+    :param cache_path: local cache directory
+    :param max_size:   max total size of the cached files (bytes)
+    """
+
+    def __init__(self, cache_path: str, max_size: int):
+        self.path = path.expanduser(cache_path)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "downloaded_bytes": 0}
+
+    def get(self, store, key: str, url: str, suffix: str = ""):
+        """return the local path of a cached copy of the store object
+
+        the object is downloaded on a cache miss, return None if the object
+        stats are unknown (the object cant be validated and is not cached)
+
+        :param store:  object DataStore
+        :param key:    object path in the store
+        :param url:    object url (the cache key)
+        :param suffix: local file suffix (e.g. ".csv")
+        """
+        entry_key = self._get_key(store, key, url)
+        if not entry_key:
+            return None
+        size, entry_key = entry_key
+        target = path.join(self.path, entry_key + suffix)
+        if self._is_valid(target, size):
+            return self._hit(target)
+
+        os.makedirs(self.path, exist_ok=True)
+        with self._entry_lock(target):
+            # another process may have downloaded the object while we waited
+            if self._is_valid(target, size):
+                return self._hit(target)
+
+            tmp = f"{target}.{uuid.uuid4().hex}{tmp_suffix}"
+            try:
+                logger.info(f"downloading {url} to the local cache")
+                store.download(key, tmp)
+                if size is not None and path.getsize(tmp) != size:
+                    raise OSError(
+                        f"downloaded {url} size does not match the object size"
+                    )
+                os.replace(tmp, target)
+            finally:
+                if path.isfile(tmp):
+                    os.remove(tmp)
+
+        self._count("misses")
+        self._count("downloaded_bytes", path.getsize(target))
+        self._evict(keep=target)
+        return target
+
+    def stats(self):
+        """return the cache hit/miss/eviction statistics (of this process)"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = sum(size for _, _, size in self._list_entries())
+        return stats
+
+    def clear(self):
+        """remove all the cached files"""
+        for entry, _, _ in self._list_entries():
+            self._remove_entry(entry)
+
+    @staticmethod
+    def _get_key(store, key, url):
+        try:
+            stats = store.stat(key)
+        except Exception:
+            return None
+        size = getattr(stats, "size", None)
+        modified = getattr(stats, "modified", None)
+        etag = getattr(stats, "etag", None)
+        if size is None and modified is None and etag is None:
+            return None
+        entry_key = f"{url}\n{etag}\n{size}\n{modified}"
+        return size, hashlib.sha256(entry_key.encode()).hexdigest()
+
+    @staticmethod
+    def _is_valid(target, size):
+        return path.isfile(target) and (size is None or path.getsize(target) == size)
+
+    def _hit(self, target):
+        try:
+            # the modified time is the lru order
+            os.utime(target)
+        except OSError:
+            pass
+        self._count("hits")
+        return target
+
+    def _count(self, stat, value=1):
+        with self._lock:
+            self._stats[stat] += value
+
+    @contextmanager
+    def _entry_lock(self, target):
+        if not fcntl:
+            yield
+            return
+        with open(target + lock_suffix, "w") as fp:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+
+    def _list_entries(self):
+        """return the cached files (path, modified time, size)"""
+        if not path.isdir(self.path):
+            return []
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(lock_suffix) or name.endswith(tmp_suffix):
+                continue
+            entry = path.join(self.path, name)
+            try:
+                stat = os.stat(entry)
+            except OSError:
+                continue
+            entries.append((entry, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self, keep=None):
+        """remove the least recently used entries until the cache fits max_size"""
+        entries = sorted(self._list_entries(), key=lambda entry: entry[1])
+        total_size = sum(size for _, _, size in entries)
+        for entry, _, size in entries:
+            if total_size <= self.max_size:
+                break
+            if entry == keep:
+                continue
+            self._remove_entry(entry)
+            total_size -= size
+            self._count("evictions")
+
+    @staticmethod
+    def _remove_entry(entry):
+        for file_path in [entry, entry + lock_suffix]:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+_data_cache = None
+
+
+def get_data_cache():
+    """return the local data cache, or None if it is disabled (data_cache.path)"""
+    global _data_cache
+    cache_path = config.data_cache.path
+    if not cache_path:
+        return None
+    max_size = int(config.data_cache.max_size)
+    if (
+        _data_cache is None
+        or _data_cache.path != path.expanduser(cache_path)
+        or _data_cache.max_size != max_size
+    ):
+        _data_cache = DataCache(cache_path, max_size)
+    return _data_cache
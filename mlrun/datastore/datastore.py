@@ -12,10 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
 import mlrun
 import mlrun.errors
+from ..config import config
 from .base import DataItem, HttpStore, DataStore
 from .filestore import FileStore
 from .inmem import InMemoryStore
@@ -170,3 +173,112 @@ class StoreManager:
         store = schema_to_store(schema)(self, schema, store_key, endpoint)
         self._stores[store_key] = store
         return store, subpath
+
+    def get_many(self, urls: list, size=None, offset=0) -> list:
+        """read many objects in parallel, return the list of contents (in order)
+
+        :param urls:   list of object urls
+        :param size:   optional, read size (bytes) per object
+        :param offset: optional, read offset per object
+        """
+        items = [self.object(url=url) for url in urls]
+        return self._run_bulk(
+            [lambda item=item: item.get(size, offset) for item in items]
+        )
+
+    def put_many(self, items: dict):
+        """write many objects in parallel
+
+        :param items: dict of object url -> data (str or bytes)
+        """
+        objects = {url: self.object(url=url) for url in items.keys()}
+        self._run_bulk(
+            [
+                lambda item=objects[url], data=data: item.put(data)
+                for url, data in items.items()
+            ]
+        )
+
+    def upload_many(self, items: dict):
+        """upload many local files in parallel
+
+        :param items: dict of target object url -> local source file path
+        """
+        objects = {url: self.object(url=url) for url in items.keys()}
+        self._run_bulk(
+            [
+                lambda item=objects[url], src=src: item.upload(src)
+                for url, src in items.items()
+            ]
+        )
+
+    def download_many(self, items: dict):
+        """download many objects in parallel
+
+        :param items: dict of object url -> local target file path
+        """
+        objects = {url: self.object(url=url) for url in items.keys()}
+        self._run_bulk(
+            [
+                lambda item=objects[url], target=target: _download(item, target)
+                for url, target in items.items()
+            ]
+        )
+
+    def upload_dir(self, src_dir: str, target_url: str) -> list:
+        """upload a local directory (recursive) in parallel, return the file urls
+
+        :param src_dir:    local source directory
+        :param target_url: target directory url
+        """
+        items = {}
+        for root, _, files in os.walk(src_dir):
+            for file in files:
+                src_path = os.path.join(root, file)
+                relpath = os.path.relpath(src_path, src_dir).replace(os.sep, "/")
+                items[f"{target_url.rstrip('/')}/{relpath}"] = src_path
+        self.upload_many(items)
+        return list(items.keys())
+
+    def download_dir(self, url: str, target_dir: str) -> list:
+        """download all the objects under a directory url in parallel
+
+        :param url:        source directory url
+        :param target_dir: local target directory
+        :return: list of the downloaded local file paths
+        """
+        obj = self.object(url=url)
+        items = {}
+        for name in obj.listdir():
+            if not name or name.endswith("/"):
+                continue
+            src_url = f"{url.rstrip('/')}/{name}"
+            if obj.kind == "file" and not os.path.isfile(src_url):
+                continue
+            items[src_url] = os.path.join(target_dir, name)
+        self.download_many(items)
+        return list(items.values())
+
+    @staticmethod
+    def _run_bulk(operations: list) -> list:
+        """run blocking object operations concurrently, return the results (in order)
+
+        the store clients (boto3, azure, v3io/http) are blocking, so the operations
+        run on a thread pool (and not in an event loop), bounded by the
+        data_transfer.bulk_concurrency config, the stores (and their connections)
+        are shared by all the operations, all the operations run to completion and
+        the first failed operation error is raised
+        """
+        if not operations:
+            return []
+        max_workers = min(int(config.data_transfer.bulk_concurrency), len(operations))
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(operation) for operation in operations]
+        return [future.result() for future in futures]
+
+
+def _download(item, target_path):
+    target_dir = os.path.dirname(target_path)
+    if target_dir:
+        os.makedirs(target_dir, exist_ok=True)
+    item.download(target_path)
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import mmap
+import os
 from os import path, makedirs, listdir, stat
 from shutil import copyfile
 
@@ -19,6 +21,14 @@ import fsspec
 
 from .base import DataStore, FileStats
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# linux ioctl for cloning a file (copy on write reflink, e.g. btrfs, xfs)
+FICLONE = 0x40049409
+
 
 class FileStore(DataStore):
     def __init__(self, parent, schema, name, endpoint=""):
@@ -45,6 +55,21 @@ class FileStore(DataStore):
                 size = -1
             return fp.read(size)
 
+    def get_view(self, key, size=None, offset=0):
+        """return a read only memoryview of the file (or a byte range of it)
+
+        the file is memory mapped, so the data is paged in from the os page cache
+        on access without copying it into a new buffer
+        """
+        with open(self._join(key), "rb") as fp:
+            file_size = os.fstat(fp.fileno()).st_size
+            if offset >= file_size:
+                return memoryview(b"")
+            # the map keeps its own file handle and is released with the view
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        end = min(offset + size, file_size) if size else file_size
+        return memoryview(mapped)[offset:end]
+
     def put(self, key, data, append=False):
         dir = path.dirname(self._join(key))
         if dir:
@@ -60,7 +85,7 @@ class FileStore(DataStore):
         fullpath = self._join(key)
         if fullpath == target_path:
             return
-        copyfile(fullpath, target_path)
+        _copy_file(fullpath, target_path)
 
     def upload(self, key, src_path):
         fullpath = self._join(key)
@@ -69,7 +94,7 @@ class FileStore(DataStore):
         dir = path.dirname(fullpath)
         if dir:
             makedirs(dir, exist_ok=True)
-        copyfile(src_path, fullpath)
+        _copy_file(src_path, fullpath)
 
     def stat(self, key):
         s = stat(self._join(key))
@@ -77,3 +102,40 @@ class FileStore(DataStore):
 
     def listdir(self, key):
         return listdir(key)
+
+
+def _copy_file(src, dst):
+    """copy a local file without moving the data through user space
+
+    try a copy on write clone (reflink) first, then an in kernel copy
+    (copy_file_range), and fall back to a regular copy
+    """
+    with open(src, "rb") as src_fp, open(dst, "wb") as dst_fp:
+        if _clone_file(src_fp, dst_fp) or _copy_file_range(src_fp, dst_fp):
+            return
+    copyfile(src, dst)
+
+
+def _clone_file(src_fp, dst_fp):
+    if not fcntl:
+        return False
+    try:
+        fcntl.ioctl(dst_fp.fileno(), FICLONE, src_fp.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src_fp, dst_fp):
+    if not hasattr(os, "copy_file_range"):
+        return False
+    remaining = os.fstat(src_fp.fileno()).st_size
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(src_fp.fileno(), dst_fp.fileno(), remaining)
+            if not copied:
+                return False
+            remaining -= copied
+    except OSError:
+        return False
+    return True
@@ -12,11 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import pandas as pd
 from io import StringIO, BytesIO
 
-import mlrun
-from .base import DataStore, FileStats
+from .base import DataStore, FileStats, read_df, read_df_chunks
+from .utils import filter_df, time_range_filters
 
 
 class InMemoryStore(DataStore):
@@ -51,32 +50,47 @@ class InMemoryStore(DataStore):
             self._items[key] = fp.read()
 
     def stat(self, key):
-        return FileStats(size=len(self._get_item(key)))
+        return FileStats(size=len(self._get_item(key)), modified=None)
 
     def listdir(self, key):
         return []
 
-    def as_df(self, url, subpath, columns=None, df_module=None, format="", **kwargs):
+    def as_df(
+        self,
+        url,
+        subpath,
+        columns=None,
+        df_module=None,
+        format="",
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+        **kwargs,
+    ):
+        filters = time_range_filters(time_column, start_time, end_time) + (
+            filters or []
+        )
         item = self._get_item(subpath)
         if hasattr(item, "to_csv"):  # detect if it is a dataframe type
-            return item
+            return filter_df(item, filters)
         if isinstance(item, str):
             item = StringIO(item)
         else:
             item = BytesIO(item)
 
-        df_module = df_module or pd
-        if url.endswith(".csv") or format == "csv":
-            if columns:
-                kwargs["usecols"] = columns
-            reader = df_module.read_csv
-        elif url.endswith(".parquet") or url.endswith(".pq") or format == "parquet":
+        return read_df(item, url, df_module, format, columns, filters, **kwargs)
+
+    def as_df_iter(self, url, subpath, chunk_rows, columns=None, format="", **kwargs):
+        item = self._get_item(subpath)
+        if hasattr(item, "to_csv"):  # detect if it is a dataframe type
             if columns:
-                kwargs["columns"] = columns
-            reader = df_module.read_parquet
-        elif url.endswith(".json") or format == "json":
-            reader = df_module.read_json
+                item = item[columns]
+            for start in range(0, len(item), chunk_rows):
+                yield item.iloc[start : start + chunk_rows]
+            return
+        if isinstance(item, str):
+            item = StringIO(item)
         else:
-            raise mlrun.errors.MLRunInvalidArgumentError(f"file type unhandled {url}")
-
-        return reader(item, **kwargs)
+            item = BytesIO(item)
+        yield from read_df_chunks(item, url, chunk_rows, format, columns, **kwargs)
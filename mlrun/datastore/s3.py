@@ -15,13 +15,25 @@
 import boto3
 import time
 import fsspec
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from ..config import config
 from .base import DataStore, get_range, FileStats
 
 
 class S3Store(DataStore):
+    support_ranges = True
+
     def __init__(self, parent, schema, name, endpoint=""):
         super().__init__(parent, name, schema, endpoint)
         region = None
+        # the store connection pool is shared by the parallel (bulk) transfers
+        pool_size = max(
+            int(config.data_transfer.concurrency),
+            int(config.data_transfer.bulk_concurrency),
+        )
+        client_config = Config(max_pool_connections=pool_size)
 
         access_key = self._secret("AWS_ACCESS_KEY_ID")
         secret_key = self._secret("AWS_SECRET_ACCESS_KEY")
@@ -32,10 +44,11 @@ class S3Store(DataStore):
                 region_name=region,
                 aws_access_key_id=access_key,
                 aws_secret_access_key=secret_key,
+                config=client_config,
             )
         else:
             # from env variables
-            self.s3 = boto3.resource("s3", region_name=region)
+            self.s3 = boto3.resource("s3", region_name=region, config=client_config)
 
     def get_filesystem(self, silent=True):
         """return fsspec file system object, if supported"""
@@ -59,9 +72,25 @@ class S3Store(DataStore):
             secret=self._get_secret_or_env("AWS_SECRET_ACCESS_KEY"),
         )
 
+    @staticmethod
+    def _transfer_config():
+        part_size = int(config.data_transfer.part_size)
+        return TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=int(config.data_transfer.concurrency),
+        )
+
     def upload(self, key, src_path):
-        self.s3.Object(self.endpoint, self._join(key)[1:]).put(
-            Body=open(src_path, "rb")
+        # large files are uploaded in parallel parts (multipart upload)
+        self.s3.Object(self.endpoint, self._join(key)[1:]).upload_file(
+            src_path, Config=self._transfer_config()
+        )
+
+    def download(self, key, target_path):
+        # large objects are downloaded with parallel ranged gets
+        self.s3.Object(self.endpoint, self._join(key)[1:]).download_file(
+            target_path, Config=self._transfer_config()
         )
 
     def get(self, key, size=None, offset=0):
@@ -77,7 +106,7 @@ class S3Store(DataStore):
         obj = self.s3.Object(self.endpoint, self._join(key)[1:])
         size = obj.content_length
         modified = obj.last_modified
-        return FileStats(size, time.mktime(modified.timetuple()))
+        return FileStats(size, time.mktime(modified.timetuple()), etag=obj.e_tag)
 
     def listdir(self, key):
         if not key.endswith("/"):
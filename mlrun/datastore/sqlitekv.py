@@ -0,0 +1,214 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    from storey import Driver
+except ImportError:
+    # storey is only required by the online serving/ingestion flows
+    Driver = object
+
+# max number of keys per read query (below the sqlite max query variables)
+read_batch_size = 500
+
+
+class SQLiteKV:
+    """key value table stored in a local sqlite file
+
+    every key holds a dict of attributes (stored as json), writes update the
+    key attributes (like the v3io kv update), the keys are stored as json so keys
+    of different types are different keys (e.g. 1 and "1"), the table is safe to
+    use from multiple threads
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            dir = os.path.dirname(self.path)
+            if dir:
+                os.makedirs(dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, data TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS schema (id INTEGER PRIMARY KEY, data TEXT)"
+            )
+        return self._conn
+
+    def upsert(self, items: dict):
+        """update the attributes of many keys in one transaction
+
+        :param items: dict of key -> dict of attributes
+        """
+        with self._lock:
+            conn = self._connect()
+            existing = self._read(conn, list(items.keys()))
+            rows = []
+            for key, attributes in items.items():
+                data = existing.get(_dumps(key), {})
+                data.update(attributes)
+                rows.append((_dumps(key), _dumps(data)))
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO items (key, data) VALUES (?, ?)", rows
+                )
+
+    def get(self, keys: list, attributes=None) -> dict:
+        """read many keys, return dict of key -> attributes (missing keys omitted)
+
+        :param keys:       list of keys
+        :param attributes: optional, list of attribute names to return
+        """
+        with self._lock:
+            items = self._read(self._connect(), keys)
+        result = {}
+        for key in keys:
+            item = items.get(_dumps(key))
+            if item is not None:
+                if attributes and attributes != "*":
+                    item = {name: item[name] for name in attributes if name in item}
+                result[key] = item
+        return result
+
+    async def aget(self, keys: list, attributes=None) -> dict:
+        """read many keys (asyncio version), the local file is read inline"""
+        return self.get(keys, attributes)
+
+    def items(self):
+        """iterate over all the (key, attributes) items"""
+        with self._lock:
+            rows = self._connect().execute("SELECT key, data FROM items").fetchall()
+        for key, data in rows:
+            yield _loads(key), _loads(data)
+
+    @staticmethod
+    def _read(conn, keys):
+        items = {}
+        keys = [_dumps(key) for key in keys]
+        for start in range(0, len(keys), read_batch_size):
+            batch = keys[start : start + read_batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, data FROM items WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            items.update({key: _loads(data) for key, data in rows})
+        return items
+
+    def save_schema(self, schema):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO schema (id, data) VALUES (0, ?)",
+                    (json.dumps(schema),),
+                )
+
+    def load_schema(self):
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT data FROM schema WHERE id = 0")
+                .fetchone()
+            )
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def aclose(self):
+        self.close()
+
+
+class SQLiteDriver(Driver):
+    """storey table driver for a local sqlite key value table
+
+    used by the storey WriteToTable and QueryByKey steps, aggregations are not
+    supported, the sqlite calls are local and fast so they run in the event loop
+    """
+
+    def __init__(self, path: str):
+        self.kv = SQLiteKV(path)
+
+    async def _save_schema(self, container, table_path, schema):
+        self.kv.save_schema(schema)
+
+    async def _load_schema(self, container, table_path):
+        return self.kv.load_schema()
+
+    async def _save_key(
+        self,
+        container,
+        table_path,
+        key,
+        aggr_item,
+        partitioned_by_key,
+        additional_data=None,
+    ):
+        if aggr_item:
+            raise NotImplementedError(
+                "aggregations are not supported by the sqlite target"
+            )
+        if additional_data:
+            self.kv.upsert({key: additional_data})
+
+    async def _load_aggregates_by_key(self, container, table_path, key):
+        item = self.kv.get([key]).get(key)
+        if item is None:
+            return None, None
+        return {}, item
+
+    async def _load_by_key(self, container, table_path, key, attributes):
+        return self.kv.get([key], attributes).get(key)
+
+    async def close(self):
+        self.kv.close()
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if hasattr(value, "item"):
+        # numpy scalars
+        return value.item()
+    raise TypeError(f"unsupported value type {type(value)}")
+
+
+def _decode(obj):
+    if len(obj) == 1 and "$datetime" in obj:
+        return pd.Timestamp(obj["$datetime"]).to_pydatetime()
+    return obj
+
+
+def _dumps(data):
+    return json.dumps(data, default=_encode)
+
+
+def _loads(data):
+    return json.loads(data, object_hook=_decode)
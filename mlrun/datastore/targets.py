@@ -13,14 +13,27 @@
 # limitations under the License.
 import os
 import sys
+import uuid
 from copy import copy
-from typing import Dict
+from typing import Dict, List
+
+import pandas as pd
+
 import mlrun
 from mlrun.utils import now_date
 
 from mlrun.model import DataTargetBase, DataTarget
-from .v3io import parse_v3io_path
-from .utils import store_path_to_spark
+from .v3io import parse_v3io_path, V3ioKVReader
+from .utils import (
+    store_path_to_spark,
+    add_partition_columns,
+    filter_df,
+    time_range_filters,
+    key_to_bucket,
+    key_bucket_column,
+    time_partitioning_granularities,
+    time_partition_filters,
+)
 
 
 class TargetTypes:
@@ -31,6 +44,7 @@ class TargetTypes:
     stream = "stream"
     dataframe = "dataframe"
     custom = "custom"
+    sqlite = "sqlite"
 
     @staticmethod
     def all():
@@ -38,6 +52,7 @@ class TargetTypes:
             TargetTypes.csv,
             TargetTypes.parquet,
             TargetTypes.nosql,
+            TargetTypes.sqlite,
             TargetTypes.tsdb,
             TargetTypes.stream,
             TargetTypes.dataframe,
@@ -45,6 +60,10 @@ class TargetTypes:
         ]
 
 
+# number of rows per sqlite target upsert transaction
+sqlite_upsert_batch_size = 10000
+
+
 def default_target_names():
     targets = mlrun.mlconf.feature_store.default_targets
     return [target.strip() for target in targets.split(",")]
@@ -131,6 +150,8 @@ class BaseStoreTarget(DataTargetBase):
     is_offline = False
     support_spark = False
     support_storey = False
+    support_pandas = False
+    support_key_reads = False
 
     def __init__(
         self,
@@ -152,28 +173,57 @@ class BaseStoreTarget(DataTargetBase):
         store, _ = mlrun.store_manager.get_or_create_store(self._target_path)
         return store
 
-    def write_dataframe(self, df, key_column=None, timestamp_key=None, **kwargs):
+    def write_dataframe(
+        self, df, key_column=None, timestamp_key=None, append=False, **kwargs
+    ):
         if hasattr(df, "rdd"):
             options = self.get_spark_options(key_column, timestamp_key)
             options.update(kwargs)
-            df.write.mode("overwrite").save(**options)
+            df = self.prepare_spark_df(df, key_column, timestamp_key)
+            df.write.mode("append" if append else "overwrite").save(**options)
+        elif append:
+            return self.write_dataframe_chunks([df], append=True, **kwargs)
         else:
             target_path = self._target_path
-            fs = self._get_store().get_filesystem(False)
-            if fs.protocol == "file":
-                dir = os.path.dirname(target_path)
-                if dir:
-                    os.makedirs(dir, exist_ok=True)
+            fs = self._get_local_ready_filesystem(target_path)
             self._write_dataframe(df, fs, target_path, **kwargs)
             try:
                 return fs.size(target_path)
             except Exception:
                 return None
 
+    def write_dataframe_chunks(self, chunks, append=False, **kwargs):
+        """write an iterable of (pandas) dataframe chunks incrementally to the target
+
+        the chunks are written one by one, so only one chunk is held in memory
+        at a time, with append=True the chunks are added after the existing
+        target data, return the target size
+        """
+        target_path = self._target_path
+        fs = self._get_local_ready_filesystem(target_path)
+        append = append and fs.exists(target_path)
+        self._write_dataframe_chunks(chunks, fs, target_path, append=append, **kwargs)
+        try:
+            return fs.size(target_path)
+        except Exception:
+            return None
+
+    def _get_local_ready_filesystem(self, target_path):
+        fs = self._get_store().get_filesystem(False)
+        if fs.protocol == "file":
+            dir = os.path.dirname(target_path)
+            if dir:
+                os.makedirs(dir, exist_ok=True)
+        return fs
+
     @staticmethod
     def _write_dataframe(df, fs, target_path, **kwargs):
         raise NotImplementedError()
 
+    @staticmethod
+    def _write_dataframe_chunks(chunks, fs, target_path, append=False, **kwargs):
+        raise NotImplementedError()
+
     def set_secrets(self, secrets):
         self._secrets = secrets
 
@@ -187,6 +237,14 @@ class BaseStoreTarget(DataTargetBase):
         driver.name = spec.name
         driver.path = spec.path
         driver.attributes = spec.attributes
+        for attribute in [
+            "partitioned",
+            "key_bucketing_number",
+            "partition_cols",
+            "time_partitioning_granularity",
+        ]:
+            if getattr(spec, attribute, None):
+                setattr(driver, attribute, getattr(spec, attribute))
         driver._resource = resource
         return driver
 
@@ -194,6 +252,10 @@ class BaseStoreTarget(DataTargetBase):
         """get storey Table object"""
         return None
 
+    def get_key_reader(self):
+        """get a key reader of the online table, with get(keys, attributes) -> dict"""
+        return None
+
     @property
     def _target_path(self):
         """return the actual/computed target path"""
@@ -210,6 +272,12 @@ class BaseStoreTarget(DataTargetBase):
         target.updated = now_date().isoformat()
         target.size = size
         target.producer = producer or target.producer
+        target.partitioned = getattr(self, "partitioned", None)
+        target.key_bucketing_number = getattr(self, "key_bucketing_number", None)
+        target.partition_cols = getattr(self, "partition_cols", None)
+        target.time_partitioning_granularity = getattr(
+            self, "time_partitioning_granularity", None
+        )
         self._resource.status.update_target(target)
         return target
 
@@ -219,28 +287,248 @@ class BaseStoreTarget(DataTargetBase):
         """add storey writer state to graph"""
         raise NotImplementedError()
 
-    def as_df(self, columns=None, df_module=None):
-        """return the target data as dataframe"""
+    def as_df(
+        self,
+        columns=None,
+        df_module=None,
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+    ):
+        """return the target data as dataframe
+
+        :param columns:     optional, list of columns to select
+        :param df_module:   optional, dataframe class (e.g. pd, dd, cudf, ..)
+        :param start_time:  optional, return only rows where time_column >= start_time
+        :param end_time:    optional, return only rows where time_column <= end_time
+        :param time_column: time column name (default to the resource timestamp key)
+        :param filters:     optional, list of (column, op, value) row filters
+        """
+        if not time_column and self._resource:
+            time_column = getattr(self._resource.spec, "timestamp_key", None)
         return mlrun.get_dataitem(self._target_path).as_df(
-            columns=columns, df_module=df_module
+            columns=columns,
+            df_module=df_module,
+            start_time=start_time,
+            end_time=end_time,
+            time_column=time_column,
+            filters=filters,
         )
 
     def get_spark_options(self, key_column=None, timestamp_key=None):
         # options used in spark.read.load(**options)
         raise NotImplementedError()
 
+    def prepare_spark_df(self, df, key_column=None, timestamp_key=None):
+        """add the target required columns (e.g. partition columns) to a spark df"""
+        return df
+
 
 class ParquetTarget(BaseStoreTarget):
+    """parquet target storage driver, used to materialize feature set/vector data
+
+    the target can be partitioned (written as a directory of parquet files) by
+    time (the timestamp key truncated to the time_partitioning_granularity), by
+    entity key hash buckets and/or by specified columns, the partition scheme is
+    recorded in the target status and used for pruning partitions when reading
+
+    example::
+
+        ParquetTarget("pq", partitioned=True, key_bucketing_number=8,
+                      time_partitioning_granularity="day")
+
+    :param partitioned:          write a partitioned directory instead of a single file,
+                                 partitioned by hour when no other scheme is specified
+    :param key_bucketing_number: number of entity key hash buckets to partition by
+    :param partition_cols:       list of (data) columns to partition by
+    :param time_partitioning_granularity: partition by timestamp truncated to one of
+                                 year, month, day, hour or minute
+    """
+
     kind = TargetTypes.parquet
     suffix = ".parquet"
     is_offline = True
     support_spark = True
     support_storey = True
+    support_pandas = True
+
+    def __init__(
+        self,
+        name: str = "",
+        path=None,
+        attributes: Dict[str, str] = None,
+        after_state=None,
+        partitioned: bool = None,
+        key_bucketing_number: int = None,
+        partition_cols: List[str] = None,
+        time_partitioning_granularity: str = None,
+    ):
+        super().__init__(name, path, attributes, after_state)
+        if (
+            time_partitioning_granularity
+            and time_partitioning_granularity not in time_partitioning_granularities
+        ):
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "time_partitioning_granularity must be one of: "
+                + ",".join(time_partitioning_granularities)
+            )
+        if key_bucketing_number or partition_cols or time_partitioning_granularity:
+            partitioned = True
+        self.partitioned = partitioned
+        self.key_bucketing_number = key_bucketing_number
+        self.partition_cols = partition_cols
+        self.time_partitioning_granularity = time_partitioning_granularity
+
+    @property
+    def _target_path(self):
+        """return the actual/computed target path (a directory when partitioned)"""
+        if self.path or not self.partitioned:
+            return super()._target_path
+        path = _get_target_path(self, self._resource)
+        return path[: -len(self.suffix)] + "/"
+
+    def _get_partitioning(self, key_column=None, timestamp_key=None):
+        """return the key column, timestamp key and time granularity to partition by"""
+        spec = self._resource.spec if self._resource else None
+        if not key_column and spec and getattr(spec, "entities", None):
+            key_column = list(spec.entities.keys())[0]
+        timestamp_key = timestamp_key or getattr(spec, "timestamp_key", None)
+        granularity = self.time_partitioning_granularity
+        if (
+            self.partitioned
+            and not granularity
+            and not self.key_bucketing_number
+            and not self.partition_cols
+        ):
+            granularity = "hour"
+        if granularity and not timestamp_key:
+            if self.time_partitioning_granularity:
+                raise mlrun.errors.MLRunInvalidArgumentError(
+                    "time partitioning requires a timestamp key"
+                )
+            granularity = None
+        if self.key_bucketing_number and not key_column:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "key bucketing requires an entity key column"
+            )
+        return key_column, timestamp_key, granularity
+
+    def get_partition_cols(self, granularity=None):
+        """return the list of partition columns (in directory hierarchy order)"""
+        columns = list(self.partition_cols or [])
+        if self.key_bucketing_number:
+            columns.append(key_bucket_column)
+        if granularity:
+            for unit in time_partitioning_granularities:
+                columns.append(unit)
+                if unit == granularity:
+                    break
+        return columns
+
+    def write_dataframe(
+        self, df, key_column=None, timestamp_key=None, append=False, **kwargs
+    ):
+        if hasattr(df, "rdd"):
+            return super().write_dataframe(
+                df, key_column, timestamp_key, append=append, **kwargs
+            )
+        return self.write_dataframe_chunks(
+            [df],
+            key_column=key_column,
+            timestamp_key=timestamp_key,
+            append=append,
+            **kwargs,
+        )
+
+    def write_dataframe_chunks(
+        self, chunks, key_column=None, timestamp_key=None, append=False, **kwargs
+    ):
+        if hasattr(chunks, "rdd"):
+            return super().write_dataframe(
+                chunks, key_column, timestamp_key, append=append, **kwargs
+            )
+        if not self.partitioned:
+            return self._write_parts(chunks, append, **kwargs)
+
+        key_column, timestamp_key, granularity = self._get_partitioning(
+            key_column, timestamp_key
+        )
+        target_path = self._target_path
+        fs = self._get_local_ready_filesystem(target_path)
+        if fs.exists(target_path) and not append:
+            fs.rm(target_path, recursive=True)
+        for df in chunks:
+            df = add_partition_columns(
+                df, key_column, timestamp_key, self.key_bucketing_number, granularity
+            )
+            # every chunk adds new files to the partition directories
+            df.to_parquet(
+                target_path,
+                partition_cols=self.get_partition_cols(granularity),
+                filesystem=fs,
+                **kwargs,
+            )
+        return None
+
+    def _write_parts(self, chunks, append=False, **kwargs):
+        """write a non partitioned target (a single file or a directory of parts)
+
+        parquet files cannot be appended to, appends add a new part file to the
+        target directory (so every write only costs its own data), the target is
+        a directory when its path ends with "/" or when it is written with append
+        """
+        target_path = self._target_path
+        fs = self._get_local_ready_filesystem(target_path)
+        exists = fs.exists(target_path)
+        is_dir = target_path.endswith("/") or (exists and fs.isdir(target_path))
+        if append and exists and not is_dir:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                f"cannot append to the parquet file {target_path}, use a directory "
+                "(path ending with /) or a partitioned parquet target"
+            )
+        if not append and exists:
+            fs.rm(target_path, recursive=is_dir)
+        if not (append or is_dir):
+            self._write_dataframe_chunks(chunks, fs, target_path, **kwargs)
+            try:
+                return fs.size(target_path)
+            except Exception:
+                return None
+
+        fs.makedirs(target_path, exist_ok=True)
+        part_path = f"{target_path.rstrip('/')}/part-{uuid.uuid4().hex}.parquet"
+        self._write_dataframe_chunks(chunks, fs, part_path, **kwargs)
+        return None
 
     @staticmethod
-    def _write_dataframe(df, fs, target_path, **kwargs):
+    def _write_dataframe_chunks(
+        chunks, fs, target_path, append=False, index=None, **kwargs
+    ):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # append is handled by _write_parts (new part files)
+        writer = None
         with fs.open(target_path, "wb") as fp:
-            df.to_parquet(fp, **kwargs)
+            for df in chunks:
+                # every chunk is written as a row group and cast to the schema
+                # of the first chunk, so the result is a single parquet file
+                table = pa.Table.from_pandas(
+                    df,
+                    schema=writer.schema if writer else None,
+                    preserve_index=index,
+                )
+                if writer is None:
+                    writer = pq.ParquetWriter(fp, table.schema, **kwargs)
+                writer.write_table(table)
+            if writer is not None:
+                writer.close()
+
+    def update_resource_status(self, status="", producer=None, is_dir=None, size=None):
+        if self.partitioned or self._target_path.endswith("/"):
+            is_dir = True
+        return super().update_resource_status(status, producer, is_dir, size)
 
     def add_writer_state(
         self, graph, after, features, key_column=None, timestamp_key=None
@@ -249,6 +537,27 @@ class ParquetTarget(BaseStoreTarget):
         if timestamp_key:
             column_list = [timestamp_key] + column_list
 
+        partition_cols = []
+        if self.partitioned:
+            key_column, timestamp_key, granularity = self._get_partitioning(
+                key_column, timestamp_key
+            )
+            partition_cols = self.get_partition_cols(granularity)
+            graph.add_step(
+                name="ParquetPartitioner",
+                after=after,
+                class_name="mlrun.feature_store.steps.PartitionColumns",
+                key_column=key_column,
+                timestamp_key=timestamp_key,
+                key_bucketing_number=self.key_bucketing_number,
+                time_partitioning_granularity=granularity,
+            )
+            after = "ParquetPartitioner"
+            column_list += [
+                column for column in partition_cols if column not in column_list
+            ]
+
+        partition_args = {"partition_cols": partition_cols} if partition_cols else {}
         graph.add_step(
             name="WriteToParquet",
             after=after,
@@ -258,13 +567,87 @@ class ParquetTarget(BaseStoreTarget):
             columns=column_list,
             index_cols=key_column,
             storage_options=self._get_store().get_storage_options(),
+            **partition_args,
         )
 
     def get_spark_options(self, key_column=None, timestamp_key=None):
-        return {
+        options = {
             "path": store_path_to_spark(self._target_path),
             "format": "parquet",
         }
+        if self.partitioned:
+            _, _, granularity = self._get_partitioning(key_column, timestamp_key)
+            options["partitionBy"] = self.get_partition_cols(granularity)
+        return options
+
+    def prepare_spark_df(self, df, key_column=None, timestamp_key=None):
+        if not self.partitioned:
+            return df
+        import pyspark.sql.functions as funcs
+
+        key_column, timestamp_key, granularity = self._get_partitioning(
+            key_column, timestamp_key
+        )
+        if self.key_bucketing_number:
+            # same hash as key_to_bucket(), so readers can prune the key buckets
+            df = df.withColumn(
+                key_bucket_column,
+                funcs.crc32(funcs.col(key_column).cast("string").cast("binary"))
+                % self.key_bucketing_number,
+            )
+        if granularity:
+            for unit in time_partitioning_granularities:
+                func = getattr(funcs, "dayofmonth" if unit == "day" else unit)
+                df = df.withColumn(unit, func(funcs.col(timestamp_key)))
+                if unit == granularity:
+                    break
+        return df
+
+    def as_df(
+        self,
+        columns=None,
+        df_module=None,
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+    ):
+        if not self.partitioned:
+            return super().as_df(
+                columns, df_module, start_time, end_time, time_column, filters
+            )
+
+        key_column, timestamp_key, granularity = self._get_partitioning()
+        time_column = time_column or timestamp_key
+        partition_filters = []
+        for column, op, value in filters or []:
+            if column == key_column and op == "in" and self.key_bucketing_number:
+                buckets = {
+                    key_to_bucket(key, self.key_bucketing_number) for key in value
+                }
+                partition_filters.append((key_bucket_column, "in", list(buckets)))
+        if granularity and time_column == timestamp_key:
+            partition_filters += time_partition_filters(
+                granularity, start_time, end_time
+            )
+
+        df = mlrun.get_dataitem(self._target_path).as_df(
+            columns=columns,
+            df_module=df_module,
+            format="parquet",
+            start_time=start_time,
+            end_time=end_time,
+            time_column=time_column,
+            filters=partition_filters + (filters or []),
+        )
+        partition_cols = self.get_partition_cols(granularity)
+        return df.drop(
+            columns=[
+                col
+                for col in partition_cols
+                if col in df.columns and col not in (self.partition_cols or [])
+            ]
+        )
 
 
 class CSVTarget(BaseStoreTarget):
@@ -273,6 +656,7 @@ class CSVTarget(BaseStoreTarget):
     is_offline = True
     support_spark = True
     support_storey = True
+    support_pandas = True
 
     @staticmethod
     def _write_dataframe(df, fs, target_path, **kwargs):
@@ -285,6 +669,16 @@ class CSVTarget(BaseStoreTarget):
         with fs.open(target_path, mode) as fp:
             df.to_csv(fp, **kwargs)
 
+    @staticmethod
+    def _write_dataframe_chunks(chunks, fs, target_path, append=False, **kwargs):
+        mode = "ab" if append else "wb"
+        if sys.version_info[0] == 3 and sys.version_info[1] == 6:
+            mode = "at" if append else "wt"
+        with fs.open(target_path, mode) as fp:
+            for chunk_id, df in enumerate(chunks):
+                # only write the header with the first chunk of a new file
+                df.to_csv(fp, header=chunk_id == 0 and not append, **kwargs)
+
     def add_writer_state(
         self, graph, after, features, key_column=None, timestamp_key=None
     ):
@@ -318,6 +712,7 @@ class NoSqlTarget(BaseStoreTarget):
     is_online = True
     support_spark = True
     support_storey = True
+    support_key_reads = True
 
     def get_table_object(self):
         from storey import Table, V3ioDriver
@@ -326,6 +721,9 @@ class NoSqlTarget(BaseStoreTarget):
         endpoint, uri = parse_v3io_path(self._target_path)
         return Table(uri, V3ioDriver(webapi=endpoint))
 
+    def get_key_reader(self):
+        return V3ioKVReader(self._target_path)
+
     def add_writer_state(
         self, graph, after, features, key_column=None, timestamp_key=None
     ):
@@ -349,10 +747,120 @@ class NoSqlTarget(BaseStoreTarget):
             "key": key_column,
         }
 
-    def as_df(self, columns=None, df_module=None):
+    def as_df(
+        self,
+        columns=None,
+        df_module=None,
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+    ):
         raise NotImplementedError()
 
 
+class SQLiteTarget(BaseStoreTarget):
+    """local embedded online target, a key value table in a local sqlite file
+
+    used to run and benchmark online feature retrieval without the platform
+    (e.g. on a laptop or a ci box), can be selected as a default target with
+    mlconf.feature_store.default_targets = "parquet,sqlite"
+    """
+
+    kind = TargetTypes.sqlite
+    suffix = ".db"
+    is_table = True
+    is_online = True
+    support_storey = True
+    support_pandas = True
+    support_key_reads = True
+
+    def get_table_object(self):
+        from storey import Table
+        from .sqlitekv import SQLiteDriver
+
+        return Table(self._target_path, SQLiteDriver(self._target_path))
+
+    def get_key_reader(self):
+        from .sqlitekv import SQLiteKV
+
+        return SQLiteKV(self._target_path)
+
+    def add_writer_state(
+        self, graph, after, features, key_column=None, timestamp_key=None
+    ):
+        table = self._resource.uri
+        column_list = [
+            key for key, feature in features.items() if not feature.aggregate
+        ]
+        graph.add_step(
+            name="WriteToTable",
+            after=after,
+            graph_shape="cylinder",
+            class_name="storey.WriteToTable",
+            columns=column_list,
+            table=table,
+        )
+
+    def _get_key_column(self, key_column=None):
+        if not key_column and self._resource:
+            key_column = list(self._resource.spec.entities.keys())[0]
+        return key_column
+
+    def write_dataframe(
+        self, df, key_column=None, timestamp_key=None, append=False, **kwargs
+    ):
+        """bulk upsert the dataframe rows (by the key column or index)"""
+        from .sqlitekv import SQLiteKV
+
+        key_column = self._get_key_column(key_column)
+        if key_column and key_column in df.columns:
+            keys = df[key_column].tolist()
+            df = df.drop(columns=[key_column])
+        else:
+            keys = df.index.tolist()
+        records = df.to_dict("records")
+
+        kv = SQLiteKV(self._target_path)
+        try:
+            for start in range(0, len(records), sqlite_upsert_batch_size):
+                end = start + sqlite_upsert_batch_size
+                kv.upsert(dict(zip(keys[start:end], records[start:end])))
+        finally:
+            kv.close()
+        return os.path.getsize(self._target_path)
+
+    def as_df(
+        self,
+        columns=None,
+        df_module=None,
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+    ):
+        from .sqlitekv import SQLiteKV
+
+        key_column = self._get_key_column() or "key"
+        kv = SQLiteKV(self._target_path)
+        try:
+            df = pd.DataFrame(
+                [dict(item, **{key_column: key}) for key, item in kv.items()]
+            )
+        finally:
+            kv.close()
+
+        time_column = time_column or getattr(
+            getattr(self._resource, "spec", None), "timestamp_key", None
+        )
+        filters = time_range_filters(time_column, start_time, end_time) + list(
+            filters or []
+        )
+        if filters and len(df):
+            df = filter_df(df, filters)
+        return df[columns] if columns else df
+
+
 class StreamTarget(BaseStoreTarget):
     kind = TargetTypes.stream
     is_table = False
@@ -380,7 +888,15 @@ class StreamTarget(BaseStoreTarget):
             **self.attributes,
         )
 
-    def as_df(self, columns=None, df_module=None):
+    def as_df(
+        self,
+        columns=None,
+        df_module=None,
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+    ):
         raise NotImplementedError()
 
 
@@ -439,7 +955,15 @@ class DFTarget(BaseStoreTarget):
             insert_time_column_as=timestamp_key,
         )
 
-    def as_df(self, columns=None, df_module=None):
+    def as_df(
+        self,
+        columns=None,
+        df_module=None,
+        start_time=None,
+        end_time=None,
+        time_column=None,
+        filters=None,
+    ):
         return self._df
 
 
@@ -447,6 +971,7 @@ kind_to_driver = {
     TargetTypes.parquet: ParquetTarget,
     TargetTypes.csv: CSVTarget,
     TargetTypes.nosql: NoSqlTarget,
+    TargetTypes.sqlite: SQLiteTarget,
     TargetTypes.dataframe: DFTarget,
     TargetTypes.stream: StreamTarget,
     TargetTypes.custom: CustomTarget,
@@ -1,4 +1,116 @@
+import datetime
+import zlib
+
+import pandas as pd
+
+time_partitioning_granularities = ["year", "month", "day", "hour", "minute"]
+key_bucket_column = "key_bucket"
+
+
 def store_path_to_spark(path):
     if path.startswith("v3io:///"):
         path = "v3io:" + path[len("v3io:/") :]
     return path
+
+
+def time_range_filters(time_column, start_time=None, end_time=None):
+    """return (pyarrow style) filters for selecting rows in [start_time, end_time]"""
+    filters = []
+    if time_column and start_time is not None:
+        filters.append((time_column, ">=", pd.Timestamp(start_time)))
+    if time_column and end_time is not None:
+        filters.append((time_column, "<=", pd.Timestamp(end_time)))
+    return filters
+
+
+def time_partition_filters(granularity, start_time=None, end_time=None):
+    """return (pyarrow style) filters for selecting the time partitions of a range
+
+    the partition levels (year, month, .. down to the granularity) which are the
+    same for the start and end times are set to their value, and the first level
+    which differs is limited to the range, the finer levels are not filtered (the
+    rows are filtered by the time column)
+    """
+    start_time = pd.Timestamp(start_time) if start_time is not None else None
+    end_time = pd.Timestamp(end_time) if end_time is not None else None
+    filters = []
+    for unit in time_partitioning_granularities:
+        start = getattr(start_time, unit) if start_time is not None else None
+        end = getattr(end_time, unit) if end_time is not None else None
+        if start is not None and start == end:
+            filters.append((unit, "=", start))
+        else:
+            if start is not None:
+                filters.append((unit, ">=", start))
+            if end is not None:
+                filters.append((unit, "<=", end))
+            break
+        if unit == granularity:
+            break
+    return filters
+
+
+def filter_df(df, filters):
+    """apply (pyarrow style) filters, e.g. [("key", "in", [1, 2])], to a dataframe"""
+    if not filters:
+        return df
+    mask = None
+    for column, op, value in filters:
+        if column not in df.columns and column in df.index.names:
+            values = pd.Series(df.index.get_level_values(column), index=df.index)
+        else:
+            values = df[column]
+        if pd.api.types.is_categorical_dtype(values):
+            # partition columns are read as categories
+            values = values.astype(values.cat.categories.dtype)
+        if isinstance(value, (datetime.datetime, datetime.date)) and not (
+            pd.api.types.is_datetime64_any_dtype(values)
+        ):
+            values = pd.to_datetime(values)
+        if op in ["=", "=="]:
+            column_mask = values == value
+        elif op == "!=":
+            column_mask = values != value
+        elif op == "<":
+            column_mask = values < value
+        elif op == "<=":
+            column_mask = values <= value
+        elif op == ">":
+            column_mask = values > value
+        elif op == ">=":
+            column_mask = values >= value
+        elif op == "in":
+            column_mask = values.isin(value)
+        elif op == "not in":
+            column_mask = ~values.isin(value)
+        else:
+            raise ValueError(f"unsupported filter operator {op}")
+        mask = column_mask if mask is None else mask & column_mask
+    return df[mask]
+
+
+def key_to_bucket(key, buckets: int):
+    """return the hash bucket of an entity key value (same as spark crc32(string) % n)"""
+    return zlib.crc32(str(key).encode("utf-8")) % buckets
+
+
+def add_partition_columns(
+    df, key_column=None, timestamp_key=None, key_bucketing_number=None, granularity=None
+):
+    """return a copy of the (pandas) dataframe with the time/key partition columns"""
+    df = df.copy()
+    if key_bucketing_number:
+        if key_column in df.columns:
+            keys = df[key_column]
+        else:
+            keys = pd.Series(df.index.get_level_values(key_column), index=df.index)
+        df[key_bucket_column] = keys.map(
+            lambda key: key_to_bucket(key, key_bucketing_number)
+        )
+    if granularity:
+        times = pd.to_datetime(df[timestamp_key])
+        for unit in time_partitioning_granularities:
+            df[unit] = getattr(times.dt, unit)
+            if unit == granularity:
+                break
+    return df
@@ -12,12 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import concurrent.futures
 from copy import deepcopy
 from datetime import datetime
+import os
 import time
 from urllib.parse import urlparse
 
 import fsspec
+import v3io.aio.dataplane
 import v3io.dataplane
 
 import mlrun
@@ -38,6 +42,8 @@ V3IO_LOCAL_ROOT = "v3io"
 
 
 class V3ioStore(DataStore):
+    support_ranges = True
+
     def __init__(self, parent, schema, name, endpoint=""):
         super().__init__(parent, name, schema, endpoint)
         self.endpoint = self.endpoint or mlrun.mlconf.v3io_api
@@ -109,7 +115,7 @@ class V3ioStore(DataStore):
         modified = time.mktime(
             datetime.strptime(datestr, "%a, %d %b %Y %H:%M:%S %Z").timetuple()
         )
-        return FileStats(size, modified)
+        return FileStats(size, modified, etag=head.get("ETag"))
 
     def listdir(self, key):
         v3io_client = v3io.dataplane.Client(
@@ -157,3 +163,89 @@ def parse_v3io_path(url):
     else:
         endpoint = None
     return endpoint, parsed_url.path.strip("/") + "/"
+
+
+class V3ioKVReader:
+    """reads many keys of a v3io kv table (used by the online batch reads)
+
+    :param url: table url, v3io://[host]/{container}/{path}
+    """
+
+    def __init__(self, url: str):
+        endpoint, table_path = parse_v3io_path(url)
+        self.container, self.table_path = split_path(table_path)
+        self._endpoint = endpoint or mlrun.mlconf.v3io_api
+        self._client = v3io.dataplane.Client(
+            endpoint=self._endpoint,
+            access_key=os.environ.get("V3IO_ACCESS_KEY"),
+            transport_kind="requests",
+        )
+        self._async_client = None
+        # the executor threads are started on demand
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            int(mlrun.mlconf.data_transfer.bulk_concurrency)
+        )
+
+    def get(self, keys: list, attributes=None) -> dict:
+        """read many keys, return dict of key -> attributes (missing keys omitted)
+
+        the keys are read concurrently (up to mlconf.data_transfer.bulk_concurrency
+        reads at a time)
+
+        :param keys:       list of keys
+        :param attributes: optional, list of attribute names to return
+        """
+
+        def get_key(key):
+            return self._client.kv.get(
+                container=self.container,
+                table_path=self.table_path,
+                key=str(key),
+                attribute_names=attributes or "*",
+                raise_for_status=v3io.dataplane.RaiseForStatus.never,
+            )
+
+        responses = self._executor.map(get_key, keys)
+        return {
+            key: response.output.item
+            for key, response in zip(keys, responses)
+            if response.status_code == 200
+        }
+
+    async def aget(self, keys: list, attributes=None) -> dict:
+        """read many keys (asyncio version), the keys are read concurrently (up to
+        mlconf.data_transfer.bulk_concurrency reads at a time)"""
+        if self._async_client is None:
+            # the async client is bound to the event loop it was created in
+            self._async_client = v3io.aio.dataplane.Client(
+                endpoint=self._endpoint,
+                access_key=os.environ.get("V3IO_ACCESS_KEY"),
+            )
+        semaphore = asyncio.Semaphore(int(mlrun.mlconf.data_transfer.bulk_concurrency))
+
+        async def get_key(key):
+            async with semaphore:
+                return await self._async_client.kv.get(
+                    container=self.container,
+                    table_path=self.table_path,
+                    key=str(key),
+                    attribute_names=attributes or "*",
+                    raise_for_status=v3io.aio.dataplane.RaiseForStatus.never,
+                )
+
+        responses = await asyncio.gather(*[get_key(key) for key in keys])
+        return {
+            key: response.output.item
+            for key, response in zip(keys, responses)
+            if response.status_code == 200
+        }
+
+    def close(self):
+        self._executor.shutdown()
+        self._client.close()
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
@@ -11,25 +11,38 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import functools
+import itertools
+import os
+import posixpath
+import time
 import uuid
 from typing import List, Union, Dict
 import mlrun
 import pandas as pd
 from .common import get_feature_vector_by_uri, get_feature_set_by_uri
 from ..model import DataTargetBase, DataSource
-from .retrieval import LocalFeatureMerger, init_feature_vector_graph, run_merge_job
+from .retrieval import (
+    BatchKeyReader,
+    get_merger,
+    init_feature_vector_graph,
+    run_merge_job,
+)
 from .ingestion import (
-    init_featureset_graph,
+    run_ingestion_graph,
     default_ingestion_job_function,
     context_to_ingestion_params,
+    run_graph_on_parts,
+    write_chunks_to_targets,
 )
 from .feature_set import FeatureSet
 from .feature_vector import FeatureVector, OnlineVectorService, OfflineVectorResponse
+from ..datastore.sources import CSVSource, ParquetSource
 from ..datastore.targets import get_default_targets, get_target_driver
 from ..runtimes import RuntimeKinds
 from ..runtimes.function_reference import FunctionReference
 from ..utils import get_caller_globals, logger
-from ..data_types import InferOptions, get_infer_interface
+from ..data_types import InferOptions, StatsAccumulator, get_infer_interface
 
 _v3iofs = None
 spark_transform_handler = "transform"
@@ -63,6 +76,11 @@ def get_offline_features(
     watch=False,
     auto_mount=True,
     secrets=None,
+    chunk_size: int = None,
+    start_time=None,
+    end_time=None,
+    engine_args: dict = None,
+    incremental: bool = False,
 ) -> OfflineVectorResponse:
     """retrieve offline feature vector results
 
@@ -86,11 +104,18 @@ def get_offline_features(
         resp.to_parquet("./out.parquet")
 
     :param features:     list of features or feature vector uri or FeatureVector object
-    :param entity_rows:  dataframe with entity rows to join with
+    :param entity_rows:  dataframe with entity rows to join with, chunked merges
+                         (chunk_size) also accept an iterator of dataframes, e.g.
+                         DataItem.as_df_iter(), which is read chunk by chunk
     :param batch:        run as a remote (cluster) batch job
     :param store_target: where to write the results to
     :param drop_columns: list of columns to drop from the final result
-    :param engine:       join/merge engine (local, job, spark)
+    :param engine:       join/merge engine (local, dask, spark), the dask engine joins
+                         the feature sets partition-wise and returns/writes a dask
+                         dataframe, the spark engine reads the feature sets offline
+                         targets and joins them on the spark cluster (returns a spark
+                         dataframe), batch spark merges require a spark/remote-spark
+                         function with a merge_handler
     :param name:         name for the generated feature vector
     :param entity_timestamp_column: timestamp column name in the entity rows dataframe
     :param function:     custom merger function
@@ -98,6 +123,21 @@ def get_offline_features(
     :param watch:        wait for job completion, set to False if you dont want to wait
     :param auto_mount:   add PVC or v3io volume to the function (using mlrun.platform.auto_mount)
     :param secrets:      key/value dictionary for secrets (for data credential vars)
+    :param chunk_size:   merge the entity rows in chunks of up to chunk_size rows and append
+                         each chunk to the store_target, so memory usage is bounded
+                         (requires store_target)
+    :param start_time:   optional, use only feature rows with timestamp >= start_time
+    :param end_time:     optional, use only feature rows with timestamp <= end_time,
+                         feature rows newer than the latest entity row or with keys
+                         not in the entity rows are always skipped when reading
+    :param engine_args:  dict with engine specific args, e.g. for dask:
+                         {"dask_client": <client or DaskCluster function/uri>,
+                         "partition_rows": 100000},
+                         for spark: {"spark": <spark session>}
+    :param incremental:  merge only the entity rows newer than the vector watermark
+                         (the latest entity row time of the previous materialization)
+                         and append the results to the store_target, the watermark
+                         is kept in the vector status (requires a named vector)
     """
     vector = _features_to_vector(features)
     if name:
@@ -115,19 +155,32 @@ def get_offline_features(
             function=function,
             secrets=secrets,
             auto_mount=auto_mount,
+            chunk_size=chunk_size,
+            start_time=start_time,
+            end_time=end_time,
+            engine=engine,
+            engine_args=engine_args,
+            incremental=incremental,
         )
 
-    merger = LocalFeatureMerger(vector)
+    merger = get_merger(vector, engine, engine_args)
     return merger.start(
         entity_rows,
         entity_timestamp_column,
         target=store_target,
         drop_columns=drop_columns,
+        chunk_size=chunk_size,
+        start_time=start_time,
+        end_time=end_time,
+        incremental=incremental,
     )
 
 
 def get_online_feature_service(
-    features: Union[str, List[str], FeatureVector], function=None
+    features: Union[str, List[str], FeatureVector],
+    function=None,
+    cache_ttl: float = None,
+    cache_max_entries: int = None,
 ) -> OnlineVectorService:
     """initialize and return online feature vector service api
 
@@ -138,13 +191,44 @@ def get_online_feature_service(
         print(resp)
         resp = svc.get([{"ticker": "AAPL"}])
         print(resp)
+        df = svc.get([{"ticker": "GOOG"}, {"ticker": "AAPL"}], as_df=True)
+
+        # asyncio api
+        async with get_online_feature_service(vector_uri) as svc:
+            resp = await svc.aget([{"ticker": "GOOG"}])
+
+        # cache hot keys for 10 seconds
+        svc = get_online_feature_service(vector_uri, cache_ttl=10)
+        print(svc.cache_stats())
 
     :param features:     list of features or feature vector uri or FeatureVector object
     :param function:     optional, mlrun FunctionReference object, serverless function template
+    :param cache_ttl:    optional, cache the feature values read per feature set key for
+                         cache_ttl seconds (in-process cache), the cache is used only by
+                         the bulk key reads, vectors with a graph, aggregation features
+                         or online targets without key reads are served by the storey
+                         flow (QueryByKey), which does not use the cache
+    :param cache_max_entries: optional, max number of cached keys per feature set, the
+                         least recently used keys are evicted (enables the cache)
     """
     vector = _features_to_vector(features)
-    graph = init_feature_vector_graph(vector)
-    service = OnlineVectorService(vector, graph)
+    feature_set_objects, feature_set_fields = vector.parse_features()
+    # the vector graph flows are built on first use
+    graph_factory = functools.partial(
+        init_feature_vector_graph, vector, feature_set_objects, feature_set_fields
+    )
+    batch_reader = None
+    if BatchKeyReader.is_supported(vector, feature_set_objects, feature_set_fields):
+        batch_reader = BatchKeyReader(
+            feature_set_objects, feature_set_fields, cache_ttl, cache_max_entries
+        )
+    elif cache_ttl or cache_max_entries:
+        logger.warning(
+            "feature cache is not used, the cache is only used by bulk key reads "
+            "(vectors without a graph and aggregation features, whose online "
+            "targets support key reads)"
+        )
+    service = OnlineVectorService(vector, graph_factory, batch_reader)
 
     # todo: support remote service (using remote nuclio/mlrun function)
     return service
@@ -158,6 +242,9 @@ def ingest(
     return_df: bool = True,
     infer_options: InferOptions = InferOptions.default(),
     mlrun_context=None,
+    chunk_size: int = None,
+    max_workers: int = None,
+    incremental: bool = False,
 ) -> pd.DataFrame:
     """Read local DataFrame, file, or URL into the feature store
 
@@ -167,6 +254,13 @@ def ingest(
         stocks = pd.read_csv("stocks.csv")
         df = ingest(stocks_set, stocks, infer_options=fs.InferOptions.default())
 
+        # ingest a large file in chunks of 100k rows (the memory use is bounded)
+        ingest(stocks_set, "stocks.parquet", return_df=False, chunk_size=100000)
+
+        # execute the graph steps on the whole dataframe (no per event flow)
+        quotes_set = FeatureSet("quotes", entities=[Entity("ticker")], engine="pandas")
+        df = ingest(quotes_set, quotes_df)
+
     :param featureset:    feature set object or uri
     :param source:        source dataframe or file path
     :param targets:       optional list of data target objects
@@ -174,6 +268,24 @@ def ingest(
     :param return_df:     indicate if to return a dataframe with the graph results
     :param infer_options: schema and stats infer options
     :param mlrun_context: mlrun context (when running as a job)
+    :param chunk_size:    optional, ingest the source in chunks of up to chunk_size
+                          rows, csv/parquet files are read chunk by chunk (parquet
+                          row groups), the schema is inferred from the first chunk
+                          and the stats are merged from the chunks stats, set
+                          return_df=False to keep the memory use bounded (in jobs
+                          use the "chunk_size" parameter)
+    :param max_workers:   max number of processes used to ingest glob/directory
+                          sources (e.g. "data/*.parquet"), the files are processed
+                          in parallel and the targets and stats status is saved
+                          once at the end (default to the config
+                          feature_store.ingestion_max_workers or the cpu count)
+    :param incremental:   ingest only the source data which is newer than the source
+                          watermark (saved in the feature set status), rows newer
+                          than the latest ingested timestamp_key, or new/modified
+                          files for glob/directory sources, the results are appended
+                          to the offline targets and upserted to the online targets
+                          and the stats are merged with the stored stats (in jobs
+                          use the "incremental" parameter)
     """
     if not mlrun_context and (not featureset or source is None):
         raise mlrun.errors.MLRunInvalidArgumentError(
@@ -193,42 +305,329 @@ def ingest(
             )
         mlrun_context.logger.info(f"starting ingestion task to {featureset.uri}")
         return_df = False
+        chunk_size = chunk_size or mlrun_context.get_param("chunk_size", None)
+        max_workers = max_workers or mlrun_context.get_param("max_workers", None)
+        incremental = incremental or mlrun_context.get_param("incremental", False)
 
     namespace = namespace or get_caller_globals()
     if isinstance(featureset, str):
         featureset = get_feature_set_by_uri(featureset)
 
-    if isinstance(source, str):
-        # if source is a path/url convert to DataFrame
-        source = mlrun.store_manager.object(url=source).as_df()
+    files = _get_source_files(source)
+    source_key = _get_source_key(source)
+    watermark = {}
+    if incremental:
+        watermark = dict(featureset.status.watermarks.get(source_key) or {})
+        if files:
+            # only new or modified files are ingested
+            files_modified = {
+                path: mlrun.store_manager.object(url=path).stat().modified
+                for path in files
+            }
+            ingested_files = watermark.get("files", {})
+            files = [
+                path
+                for path in files
+                if ingested_files.get(path) != files_modified[path]
+            ]
+        elif not featureset.spec.timestamp_key:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "incremental ingestion requires a timestamp_key or a glob/directory "
+                "source"
+            )
+
+    max_time = None
+    if incremental and files is not None and not files:
+        logger.info(f"no new source files to ingest in {source_key}")
+        df = None
+    elif files and not chunk_size:
+        # the source files are processed in parallel
+        max_workers = max_workers or int(
+            mlrun.mlconf.feature_store.ingestion_max_workers
+        )
+        df, max_time = _ingest_parts(
+            featureset,
+            files,
+            targets,
+            namespace,
+            return_df,
+            infer_options,
+            read_part=functools.partial(
+                _read_source_file, format=getattr(source, "kind", "")
+            ),
+            max_workers=min(max_workers or os.cpu_count(), len(files)),
+            append=incremental,
+        )
+    elif chunk_size or incremental:
+        if chunk_size:
+            parts = _get_source_chunks(source, chunk_size, files)
+        else:
+            parts = [_get_source_df(source)]
+        if watermark.get("time") and not files:
+            parts = _rows_after(
+                parts, featureset.spec.timestamp_key, pd.Timestamp(watermark["time"])
+            )
+        df, max_time = _ingest_parts(
+            featureset,
+            parts,
+            targets,
+            namespace,
+            return_df,
+            infer_options,
+            append=incremental,
+        )
+    else:
+        if isinstance(source, str):
+            # if source is a path/url convert to DataFrame
+            source = mlrun.store_manager.object(url=source).as_df()
+
+        schema_options = InferOptions.get_common_options(
+            infer_options, InferOptions.schema()
+        )
+        if schema_options:
+            infer_metadata(
+                featureset, source, options=schema_options, namespace=namespace,
+            )
+        infer_stats = InferOptions.get_common_options(
+            infer_options, InferOptions.all_stats()
+        )
+        return_df = return_df or infer_stats != InferOptions.Null
+        featureset.save()
+
+        targets = targets or featureset.spec.targets or get_default_targets()
+        df = run_ingestion_graph(
+            source, featureset, namespace, targets=targets, return_df=return_df
+        )
+        infer_from_static_df(df, featureset, options=infer_stats)
+
+    if incremental:
+        if files:
+            watermark["files"] = dict(watermark.get("files", {}))
+            watermark["files"].update({path: files_modified[path] for path in files})
+        if max_time is not None:
+            watermark["time"] = str(max_time)
+        featureset.status.watermarks[source_key] = watermark
+    featureset.save()
+
+    if mlrun_context:
+        mlrun_context.logger.info("ingestion task completed, targets:")
+        mlrun_context.logger.info(f"{featureset.status.targets.to_dict()}")
+        mlrun_context.log_result("featureset", featureset.uri)
+
+    return df
+
+
+def _ingest_parts(
+    featureset,
+    parts,
+    targets,
+    namespace,
+    return_df,
+    infer_options,
+    read_part=None,
+    max_workers=None,
+    append=False,
+):
+    """ingest the source part by part (dataframe chunks or files)
+
+    every part is processed by the feature set graph (which writes the online
+    targets), the results are written to the offline targets part by part and
+    the stats are merged from the parts stats, so the memory use is bounded by the
+    part size, with max_workers > 1 the parts are processed by a process pool
+
+    return the result df (if return_df) and the latest result timestamp
+    """
+    parts = iter(parts)
+    first_part = next(parts, None)
+    if first_part is None:
+        logger.info("no (new) source data to ingest")
+        return None, None
+    parts = itertools.chain([first_part], parts)
 
     schema_options = InferOptions.get_common_options(
         infer_options, InferOptions.schema()
     )
     if schema_options:
+        # the schema is inferred from the first part
+        first_df = read_part(first_part) if read_part else first_part
         infer_metadata(
-            featureset, source, options=schema_options, namespace=namespace,
+            featureset, first_df, options=schema_options, namespace=namespace,
         )
+        first_df = None
     infer_stats = InferOptions.get_common_options(
         infer_options, InferOptions.all_stats()
     )
-    return_df = return_df or infer_stats != InferOptions.Null
     featureset.save()
 
-    targets = targets or featureset.spec.targets or get_default_targets()
-    graph = init_featureset_graph(
-        source, featureset, namespace, targets=targets, return_df=return_df
+    # the offline (file) targets are written by the parts results, the other
+    # targets are written by the graph
+    graph_targets = []
+    offline_targets = []
+    for target in targets or featureset.spec.targets or get_default_targets():
+        driver = get_target_driver(target, featureset)
+        if not driver.is_offline:
+            driver.update_resource_status()
+            graph_targets.append(target)
+        elif target.after_state:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "chunked ingestion does not support after_state in offline targets"
+            )
+        else:
+            offline_targets.append(driver)
+
+    timestamp_key = featureset.spec.timestamp_key
+    columns = list(featureset.spec.features.keys())
+    if timestamp_key:
+        columns = [timestamp_key] + columns
+    stats = None
+    if InferOptions.get_common_options(infer_stats, InferOptions.Stats):
+        if append and featureset.status.stats:
+            # the new data stats are merged with the previous runs stats
+            stats = StatsAccumulator.from_dict(featureset.status.stats, infer_stats)
+        else:
+            stats = StatsAccumulator(infer_stats)
+    result_dfs = []
+    max_time = None
+
+    def process_results():
+        nonlocal max_time
+        results = run_graph_on_parts(
+            parts,
+            featureset,
+            namespace,
+            graph_targets,
+            read_part=read_part,
+            infer_stats=infer_stats,
+            max_workers=max_workers,
+        )
+        is_first = True
+        for df, part_stats in results:
+            if df.empty:
+                continue
+            if is_first:
+                preview = InferOptions.get_common_options(
+                    infer_stats, InferOptions.Preview
+                )
+                infer_from_static_df(df, featureset, options=preview)
+                is_first = False
+            if stats is not None:
+                stats.merge(part_stats)
+            if timestamp_key in df.columns:
+                part_max_time = pd.to_datetime(df[timestamp_key]).max()
+                if max_time is None or part_max_time > max_time:
+                    max_time = part_max_time
+            if return_df:
+                result_dfs.append(df)
+            yield df[[column for column in columns if column in df.columns]]
+
+    if offline_targets:
+        sizes = write_chunks_to_targets(
+            process_results(),
+            offline_targets,
+            featureset.spec.entities[0].name,
+            timestamp_key,
+            append=append,
+        )
+        for target, size in zip(offline_targets, sizes):
+            target.update_resource_status("ready", size=size)
+    else:
+        for _ in process_results():
+            pass
+
+    if stats is not None:
+        featureset.status.stats = stats.to_dict()
+    df = pd.concat(result_dfs) if return_df and result_dfs else None
+    return df, max_time
+
+
+def _get_source_chunks(source, chunk_size, files=None):
+    if files:
+        file_format = getattr(source, "kind", "")
+        return itertools.chain.from_iterable(
+            mlrun.store_manager.object(url=path).as_df_iter(
+                chunk_size, format=file_format
+            )
+            for path in files
+        )
+    if isinstance(source, str):
+        return mlrun.store_manager.object(url=source).as_df_iter(chunk_size)
+    if hasattr(source, "to_csv"):
+        return (
+            source.iloc[start : start + chunk_size]
+            for start in range(0, len(source), chunk_size)
+        )
+    if isinstance(source, (CSVSource, ParquetSource)):
+        return mlrun.store_manager.object(url=source.path).as_df_iter(
+            chunk_size, format=source.kind
+        )
+    raise mlrun.errors.MLRunInvalidArgumentError(
+        f"chunked ingestion is not supported for source type {type(source)}"
     )
-    df = graph.wait_for_completion()
-    infer_from_static_df(df, featureset, options=infer_stats)
-    featureset.save()
 
-    if mlrun_context:
-        mlrun_context.logger.info("ingestion task completed, targets:")
-        mlrun_context.logger.info(f"{featureset.status.targets.to_dict()}")
-        mlrun_context.log_result("featureset", featureset.uri)
 
-    return df
+def _get_source_df(source):
+    if isinstance(source, str):
+        return mlrun.store_manager.object(url=source).as_df()
+    if hasattr(source, "to_dataframe"):
+        return source.to_dataframe()
+    return source
+
+
+def _get_source_key(source):
+    """return the source identifier (used for the source watermark)"""
+    if isinstance(source, str):
+        return source
+    return getattr(source, "path", None) or getattr(source, "name", None) or "df"
+
+
+def _rows_after(dfs, time_column, time):
+    """filter the dataframes rows which are newer than time, skip empty dataframes"""
+    for df in dfs:
+        if time_column in df.columns:
+            df = df[pd.to_datetime(df[time_column]) > time]
+        if len(df):
+            yield df
+
+
+def _get_source_files(source):
+    """return the list of source files for glob/directory sources (else None)"""
+    if isinstance(source, str):
+        path, file_format = source, ""
+    elif isinstance(source, (CSVSource, ParquetSource)):
+        path, file_format = source.path, source.kind
+    else:
+        return None
+
+    is_glob = any(char in path for char in "*?[")
+    store, _ = mlrun.store_manager.get_or_create_store(path)
+    fs = store.get_filesystem()
+    if not fs or not (is_glob or fs.isdir(path)):
+        return None
+
+    if is_glob:
+        files = fs.glob(path)
+    else:
+        files = fs.find(path)
+        if file_format != CSVSource.kind and any(
+            posixpath.dirname(file) != posixpath.dirname(files[0]) for file in files
+        ):
+            # partitioned parquet dataset (read as a single dataset)
+            return None
+    suffixes = {
+        CSVSource.kind: (".csv",),
+        ParquetSource.kind: (".parquet", ".pq"),
+    }.get(file_format, (".csv", ".parquet", ".pq"))
+    # restore the url scheme which the file system strips from the paths
+    stripped_path = fs._strip_protocol(path)
+    prefix = path[: -len(stripped_path)] if path.endswith(stripped_path) else ""
+    files = sorted(prefix + file for file in files if file.endswith(suffixes))
+    if not files:
+        raise mlrun.errors.MLRunInvalidArgumentError(f"no source files in {path}")
+    return files
+
+
+def _read_source_file(path, format=""):
+    return mlrun.store_manager.object(url=path).as_df(format=format)
 
 
 def infer_metadata(
@@ -279,8 +678,7 @@ def infer_metadata(
                 entity_columns,
                 InferOptions.get_common_options(options, InferOptions.Entities),
             )
-        graph = init_featureset_graph(source, featureset, namespace, return_df=True)
-        source = graph.wait_for_completion()
+        source = run_ingestion_graph(source, featureset, namespace)
 
     df = infer_from_static_df(source, featureset, entity_columns, options)
     return df
@@ -492,7 +890,11 @@ def ingest_with_spark(
         featureset = get_feature_set_by_uri(featureset)
 
     df = source.to_spark_df(spark)
+    start = time.monotonic()
     infer_from_static_df(df, featureset, options=infer_options)
+    logger.info(
+        f"inferred the feature set schema/stats in {time.monotonic() - start:.2f}s"
+    )
 
     if transformer:
         df = transformer(spark, mlrun_context, df)
@@ -508,7 +910,10 @@ def ingest_with_spark(
     for target in targets or []:
         spark_options = target.get_spark_options(key_column, timestamp_key)
         logger.info(f"writing to target {target.name}, spark options {spark_options}")
-        df.write.mode("overwrite").save(**spark_options)
+        start = time.monotonic()
+        target_df = target.prepare_spark_df(df, key_column, timestamp_key)
+        target_df.write.mode("overwrite").save(**spark_options)
+        logger.info(f"wrote target {target.name} in {time.monotonic() - start:.2f}s")
         target.set_resource(featureset)
         target.update_resource_status("ready", is_dir=True)
 
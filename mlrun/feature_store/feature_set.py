@@ -150,6 +150,7 @@ class FeatureSetStatus(ModelObj):
         preview=None,
         function_uri=None,
         run_uri=None,
+        watermarks=None,
     ):
         self.state = state or "created"
         self._targets: ObjectList = None
@@ -158,6 +159,8 @@ class FeatureSetStatus(ModelObj):
         self.preview = preview or []
         self.function_uri = function_uri
         self.run_uri = run_uri
+        # per source ingestion high-watermark (latest time and ingested files)
+        self.watermarks = watermarks or {}
 
     @property
     def targets(self) -> List[DataTarget]:
@@ -173,19 +176,34 @@ class FeatureSetStatus(ModelObj):
 
 
 class FeatureSet(ModelObj):
-    """Feature set object, defines a set of features and their data pipeline"""
+    """Feature set object, defines a set of features and their data pipeline
+
+    the engine selects how the graph is executed on ingestion, "pandas" executes
+    the graph steps on whole dataframes, "spark" runs a spark ingestion job, and
+    the default is a storey (event by event) flow
+    """
 
     kind = mlrun.api.schemas.ObjectKind.feature_set.value
     _dict_fields = ["kind", "metadata", "spec", "status"]
 
-    def __init__(self, name=None, description=None, entities=None, timestamp_key=None):
+    def __init__(
+        self,
+        name=None,
+        description=None,
+        entities=None,
+        timestamp_key=None,
+        engine=None,
+    ):
         self._spec: FeatureSetSpec = None
         self._metadata = None
         self._status = None
         self._api_client = None
 
         self.spec = FeatureSetSpec(
-            description=description, entities=entities, timestamp_key=timestamp_key
+            description=description,
+            entities=entities,
+            timestamp_key=timestamp_key,
+            engine=engine,
         )
         self.metadata = VersionedObjMetadata(name=name)
         self.status = None
@@ -333,7 +351,10 @@ class FeatureSet(ModelObj):
     def get_stats_table(self):
         """get feature statistics table (as dataframe)"""
         if self.status.stats:
-            return pd.DataFrame.from_dict(self.status.stats, orient="index")
+            # the distinct count sketches (hll) are only used for merging stats
+            return pd.DataFrame.from_dict(self.status.stats, orient="index").drop(
+                columns=["hll"], errors="ignore"
+            )
 
     def __getitem__(self, name):
         return self._spec.features[name]
@@ -357,8 +378,38 @@ class FeatureSet(ModelObj):
             ]
         return graph.plot(filename, format, targets=targets, **kw)
 
-    def to_dataframe(self, columns=None, df_module=None, target_name=None):
-        """return featureset (offline) data as dataframe"""
+    def to_dataframe(
+        self,
+        columns=None,
+        df_module=None,
+        target_name=None,
+        start_time=None,
+        end_time=None,
+        entity_keys: dict = None,
+    ):
+        """return featureset (offline) data as dataframe
+
+        the time range and entity key filters are pushed down to the target reader
+        (e.g. skip parquet row groups/partitions) when supported
+
+        :param columns:     list of feature columns to select (entities/timestamp are added)
+        :param df_module:   optional, dataframe class (e.g. pd, dd, cudf, ..)
+        :param target_name: select a specific offline target by name
+        :param start_time:  return only rows with timestamp_key >= start_time
+        :param end_time:    return only rows with timestamp_key <= end_time
+        :param entity_keys: dict of entity name -> list of values, return only rows
+                            with those entity values, e.g. {"ticker": ["GOOG", "MSFT"]}
+        """
+        filters = [
+            (entity, "in", list(values))
+            for entity, values in (entity_keys or {}).items()
+        ]
+        if (start_time is not None or end_time is not None) and (
+            not self.spec.timestamp_key
+        ):
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "start_time/end_time require a feature set with timestamp_key"
+            )
         if columns:
             entities = list(self.spec.entities.keys())
             if self.spec.timestamp_key and self.spec.timestamp_key not in entities:
@@ -369,7 +420,14 @@ class FeatureSet(ModelObj):
             raise mlrun.errors.MLRunNotFoundError(
                 "there are no offline targets for this feature set"
             )
-        return driver.as_df(columns=columns, df_module=df_module)
+        return driver.as_df(
+            columns=columns,
+            df_module=df_module,
+            start_time=start_time,
+            end_time=end_time,
+            time_column=self.spec.timestamp_key,
+            filters=filters,
+        )
 
     def save(self, tag="", versioned=False):
         """save to mlrun db"""
@@ -11,7 +11,9 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import collections
+import threading
 from typing import List
 import mlrun
 import pandas as pd
@@ -104,6 +106,7 @@ class FeatureVectorStatus(ModelObj):
         stats=None,
         preview=None,
         run_uri=None,
+        watermark=None,
     ):
         self._targets: ObjectList = None
         self._features: ObjectList = None
@@ -114,6 +117,8 @@ class FeatureVectorStatus(ModelObj):
         self.preview = preview or []
         self.features: List[Feature] = features or []
         self.run_uri = run_uri
+        # latest entity row time materialized to the targets (incremental merge)
+        self.watermark = watermark
 
     @property
     def targets(self) -> List[DataTarget]:
@@ -198,7 +203,10 @@ class FeatureVector(ModelObj):
     def get_stats_table(self):
         """get feature statistics table (as dataframe)"""
         if self.status.stats:
-            return pd.DataFrame.from_dict(self.status.stats, orient="index")
+            # the distinct count sketches (hll) are only used for merging stats
+            return pd.DataFrame.from_dict(self.status.stats, orient="index").drop(
+                columns=["hll"], errors="ignore"
+            )
 
     def get_target_path(self, name=None):
         target = get_offline_target(self, name=name)
@@ -289,32 +297,121 @@ class FeatureVector(ModelObj):
 
 
 class OnlineVectorService:
-    """get_online_feature_service response object"""
+    """get_online_feature_service response object
+
+    can be used as a (sync or async) context manager, which closes the service::
+
+        async with get_online_feature_service(vector_uri) as svc:
+            resp = await svc.aget([{"ticker": "GOOG"}])
+    """
 
-    def __init__(self, vector, graph):
+    def __init__(self, vector, graph_factory, batch_reader=None):
         self.vector = vector
-        self._controller = graph.controller
+        self._graph_factory = graph_factory
+        self._batch_reader = batch_reader
+        self._controller = None
+        self._async_controller = None
+        self._lock = threading.Lock()
 
     @property
     def status(self):
         """vector prep function status (ready, running, error)"""
         return "ready"
 
-    def get(self, entity_rows: List[dict]):
-        """get feature vector given the provided entity inputs"""
-        results = []
-        futures = []
-        for row in entity_rows:
-            futures.append(self._controller.emit(row, return_awaitable_result=True))
-        for future in futures:
-            result = future.await_result()
-            results.append(result.body)
+    def get(self, entity_rows: List[dict], as_df=False):
+        """get feature vector given the provided entity inputs
 
-        return results
+        when the vector has no transformation graph (and no aggregation features)
+        the keys of all the entity rows are read in bulk, the results are
+        returned in the entity rows order
+
+        :param entity_rows: list of entity rows (dicts with the entity keys)
+        :param as_df:       return the results as a dataframe (instead of a list of
+                            dicts), use df.to_numpy() for a feature matrix
+        """
+        if self._batch_reader:
+            results = self._batch_reader.get(entity_rows)
+        else:
+            controller = self._get_controller()
+            futures = [
+                controller.emit(row, return_awaitable_result=True)
+                for row in entity_rows
+            ]
+            results = [future.await_result().body for future in futures]
+        return pd.DataFrame(results) if as_df else results
+
+    async def aget(self, entity_rows: List[dict], as_df=False):
+        """get feature vector given the provided entity inputs (asyncio version)
+
+        the results are awaited without blocking the event loop, so many
+        concurrent requests can be served by one event loop, see get() for details
+
+        vectors with a graph are served by an async (storey) flow, which is
+        started on the event loop of the first aget call (the sync flow of get()
+        runs in a thread)
+        """
+        if self._batch_reader:
+            results = await self._batch_reader.aget(entity_rows)
+        else:
+            controller = await self._get_async_controller()
+            events = await asyncio.gather(
+                *[controller.emit(row) for row in entity_rows]
+            )
+            results = [event.body for event in events]
+        return pd.DataFrame(results) if as_df else results
+
+    def _get_controller(self):
+        with self._lock:
+            if self._controller is None:
+                self._controller = self._graph_factory(async_flow=False).controller
+            return self._controller
+
+    async def _get_async_controller(self):
+        if self._async_controller is None:
+            # the async flow must be built (and run) in the event loop
+            graph = self._graph_factory(async_flow=True)
+            self._async_controller = asyncio.ensure_future(graph.controller)
+        return await self._async_controller
+
+    def cache_stats(self):
+        """return the feature cache hits/misses/entries per feature set"""
+        if not self._batch_reader:
+            return {}
+        return self._batch_reader.cache_stats()
 
     def close(self):
         """terminate the async loop"""
-        self._controller.terminate()
+        if self._controller is not None:
+            self._controller.terminate()
+            self._controller = None
+        if self._batch_reader:
+            self._batch_reader.close()
+
+    async def aclose(self):
+        """terminate the async loop (asyncio version)"""
+        if self._async_controller is not None:
+            controller = await self._async_controller
+            self._async_controller = None
+            await controller.terminate()
+            await controller.await_termination()
+        if self._controller is not None:
+            # the flow of the sync api (when get() was used)
+            self._controller.terminate()
+            self._controller = None
+        if self._batch_reader:
+            await self._batch_reader.aclose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
 
 
 class OfflineVectorResponse:
@@ -329,6 +426,11 @@ class OfflineVectorResponse:
         """vector prep job status (ready, running, error)"""
         return self._merger.get_status()
 
+    @property
+    def load_times(self):
+        """feature set name -> time in seconds spent loading its data"""
+        return self._merger.get_load_times()
+
     def to_dataframe(self):
         """return result as dataframe"""
         if self.status != "completed":
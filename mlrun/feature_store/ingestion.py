@@ -12,34 +12,513 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import copy
+import functools
+import multiprocessing
+import queue
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
 import mlrun
 from ..runtimes import RuntimeKinds
 
 from mlrun.datastore.sources import get_source_step, get_source_from_dict
-from mlrun.datastore.targets import add_target_states, get_target_driver
+from mlrun.datastore.targets import add_target_states, get_target_driver, TargetTypes
 from ..datastore.store_resources import ResourceCache
-from ..serving.server import create_graph_server
-from ..data_types import InferOptions
+from ..serving.server import create_graph_server, MockEvent
+from ..serving.states import StateKinds, callable_prefix
+from ..data_types import InferOptions, StatsAccumulator
 from ..runtimes.function_reference import FunctionReference
+from ..utils import get_class, get_function
 
 
 def init_featureset_graph(source, featureset, namespace, targets=None, return_df=True):
-    """create storey ingestion graph/DAG from feature set object"""
+    """create storey ingestion graph/DAG from feature set object
+
+    when the source is a dataframe, the leading graph steps which have a dataframe
+    implementation (do_df) are applied to the whole dataframe, and only the rest of
+    the graph is executed event by event
+    """
 
     cache = ResourceCache()
     graph = featureset.spec.graph.copy()
+    targets = targets or []
+    batch_states = []
+    if hasattr(source, "to_csv"):
+        batch_states = _pop_batch_states(graph, namespace, targets)
 
     # init targets (and table)
-    targets = targets or []
     _add_data_states(
-        graph, cache, featureset, targets=targets, source=source, return_df=return_df,
+        graph,
+        cache,
+        featureset,
+        targets=targets,
+        source=None if batch_states else source,
+        return_df=return_df,
     )
 
-    server = create_graph_server(graph=graph, parameters={})
+    graph_initializer = None
+    if batch_states:
+        # the batch states are initialized with the graph context
+        graph_initializer = functools.partial(
+            _run_batch_states,
+            states=batch_states,
+            df=source,
+            featureset=featureset,
+            namespace=namespace,
+        )
+    server = create_graph_server(
+        graph=graph, parameters={}, graph_initializer=graph_initializer
+    )
     server.init(None, namespace, cache)
     return graph
 
 
+def _pop_batch_states(graph, namespace, targets):
+    """remove the leading graph states which have a dataframe implementation"""
+    target_states = [target.after_state for target in targets if target.after_state]
+    states = []
+    while True:
+        start_states = [state for state in graph.states.values() if not state.after]
+        if len(start_states) != 1:
+            break
+        state = start_states[0]
+        if (
+            state.kind != StateKinds.task
+            or not state.class_name
+            or state.handler
+            or state.on_error
+            or state.responder
+            or state.name in target_states
+        ):
+            break
+        try:
+            class_object = get_class(state.class_name, namespace)
+        except ImportError:
+            break
+        if not hasattr(class_object, "do_df"):
+            break
+
+        for next_state in graph.states.values():
+            if state.name in (next_state.after or []):
+                next_state.after = [
+                    name for name in next_state.after if name != state.name
+                ]
+        del graph[state.name]
+        states.append(state)
+    return states
+
+
+def _run_batch_states(server, states, df, featureset, namespace):
+    key_columns = list(featureset.spec.entities.keys())
+    if featureset.spec.timestamp_key:
+        key_columns.append(featureset.spec.timestamp_key)
+    key_columns = [column for column in key_columns if column in df.columns]
+    key_df = df[key_columns]
+
+    for state in states:
+        state.init_object(server.context, namespace, mode="skip")
+        df = state.async_object.do_df(df)
+
+    df = _restore_key_columns(df, key_df)
+    _set_flow_source(server.graph, featureset, df)
+
+
+def _restore_key_columns(df, key_df):
+    """the event key and time columns are kept (as in the event source)"""
+    missing_columns = [
+        column for column in key_df.columns if column not in df.columns
+    ]
+    if missing_columns and len(df) == len(key_df):
+        df = df.assign(**{column: key_df[column].array for column in missing_columns})
+    return df
+
+
+def run_ingestion_graph(source, featureset, namespace, targets=None, return_df=True):
+    """run the feature set graph on the source, return the result df (if return_df)
+
+    feature sets with spec.engine="pandas" are executed by the pandas engine, the
+    others by a storey flow
+    """
+    if featureset.spec.engine == "pandas":
+        return run_pandas_graph(
+            source, featureset, namespace, targets=targets, return_df=return_df
+        )
+    graph = init_featureset_graph(
+        source, featureset, namespace, targets=targets, return_df=return_df
+    )
+    return graph.wait_for_completion()
+
+
+def run_pandas_graph(df, featureset, namespace, targets=None, return_df=True):
+    """execute the feature set graph synchronously on a (whole) dataframe
+
+    the graph states are executed one by one (in topological order), states with a
+    dataframe implementation (do_df) process the whole dataframe, the other states
+    are applied row by row (every row is an event body), the targets are written
+    directly with write_dataframe, return the result df (indexed by the entity key)
+    """
+    if not hasattr(df, "to_csv"):
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            "the pandas engine requires a dataframe source"
+        )
+    cache = ResourceCache()
+    cache.cache_resource(featureset.uri, featureset, True)
+    server = create_graph_server(graph=featureset.spec.graph.copy(), parameters={})
+    context = server.init_context(None, cache)
+    graph = server.graph
+    _, final_state, _ = graph.check_and_process_graph(allow_empty=True)
+
+    key_columns = list(featureset.spec.entities.keys())
+    if featureset.spec.timestamp_key:
+        key_columns.append(featureset.spec.timestamp_key)
+    key_df = df[[column for column in key_columns if column in df.columns]]
+
+    results = {}
+    for state in _sorted_states(graph):
+        state.init_object(context, namespace)
+        if state.after:
+            inputs = [results[name] for name in state.after]
+            state_df = inputs[0] if len(inputs) == 1 else pd.concat(inputs)
+        else:
+            state_df = df
+        results[state.name] = _run_pandas_state(
+            state, state_df, featureset, namespace
+        )
+
+    if final_state:
+        df = results[final_state]
+    elif not graph.is_empty():
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            "the pandas engine requires a graph with one final state, "
+            "set the graph final_state"
+        )
+    df = _restore_key_columns(df, key_df)
+
+    key_column = featureset.spec.entities[0].name
+    timestamp_key = featureset.spec.timestamp_key
+    for target in targets or []:
+        driver = get_target_driver(target, featureset)
+        if not driver.support_pandas:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                f"target kind {driver.kind} is not supported by the pandas engine"
+            )
+        target_df = results[target.after_state] if target.after_state else df
+        size = driver.write_dataframe(
+            _to_target_df(target_df, featureset), key_column, timestamp_key
+        )
+        driver.update_resource_status("ready", size=size)
+
+    if not return_df:
+        return None
+    if key_column in df.columns:
+        df = df.set_index(key_column)
+    return df
+
+
+def _sorted_states(graph):
+    """return the graph states in topological order"""
+    states = []
+    done = set()
+    pending = list(graph.states.values())
+    while pending:
+        ready = [state for state in pending if set(state.after or []) <= done]
+        if not ready:
+            raise mlrun.errors.MLRunInvalidArgumentError("graph must be acyclic")
+        for state in ready:
+            states.append(state)
+            done.add(state.name)
+        pending = [state for state in pending if state.name not in done]
+    return states
+
+
+def _run_pandas_state(state, df, featureset, namespace):
+    if state.kind != StateKinds.task:
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            f"state {state.name} kind ({state.kind}) is not supported by the "
+            "pandas engine"
+        )
+    if hasattr(state.async_object, "do_df"):
+        return state.async_object.do_df(df)
+
+    entity_columns = list(featureset.spec.entities.keys())
+    key_column = entity_columns[0] if entity_columns else None
+    timestamp_key = featureset.spec.timestamp_key
+    run_event = _get_event_function(state, namespace)
+
+    # named index levels are event body fields (as in the dataframe source)
+    index_names = [name for name in df.index.names if name]
+    rows = df.reset_index() if index_names else df
+    bodies = []
+    for body in rows.to_dict("records"):
+        event = MockEvent(body=body)
+        event.key = body.get(key_column)
+        event.time = body.get(timestamp_key)
+        for result in run_event(event):
+            if isinstance(result.body, dict):
+                if key_column and key_column not in result.body:
+                    result.body[key_column] = result.key
+                if timestamp_key and timestamp_key not in result.body:
+                    result.body[timestamp_key] = result.time
+            bodies.append(result.body)
+
+    df = pd.DataFrame(bodies, columns=None if bodies else rows.columns)
+    if index_names and all(name in df.columns for name in index_names):
+        df = df.set_index(index_names)
+    return df
+
+
+def _get_event_function(state, namespace):
+    """return a function which runs a (per event) state on an event
+
+    the function returns the list of result events (empty when filtered)
+    """
+    import storey
+
+    step = state.async_object
+    full_event = state.full_event or (state.class_args or {}).get("full_event")
+    if isinstance(step, storey.MapClass):
+        if asyncio.iscoroutinefunction(step.do):
+            _raise_async_state(state)
+        filtered = []
+        # MapClass.do() calls filter() to drop the event
+        step.filter = lambda: filtered.append(True)
+
+        def run(element):
+            result = step.do(element)
+            if filtered:
+                filtered.clear()
+                return []
+            return [result]
+
+    elif isinstance(step, (storey.Filter, storey.Extend, storey.FlatMap, storey.Map)):
+        fn = _get_state_fn(state, namespace)
+        if asyncio.iscoroutinefunction(fn):
+            _raise_async_state(state)
+
+        if isinstance(step, storey.Filter):
+
+            def run(element):
+                return [element] if fn(element) else []
+
+        elif isinstance(step, storey.Extend):
+
+            def run(element):
+                body = element.body if full_event else element
+                body.update(fn(element))
+                return [element]
+
+        elif isinstance(step, storey.FlatMap):
+
+            def run(element):
+                return list(fn(element))
+
+        else:
+
+            def run(element):
+                return [fn(element)]
+
+    elif not hasattr(step, "to") and state._handler:
+
+        def run(element):
+            return [state._handler(element)]
+
+    else:
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            f"state {state.name} ({state.class_name}) is not supported by the "
+            "pandas engine"
+        )
+
+    def run_event(event):
+        results = []
+        for result in run(event if full_event else event.body):
+            if result is None:
+                continue
+            if not full_event:
+                body, result = result, copy.copy(event)
+                result.body = body
+            results.append(result)
+        return results
+
+    return run_event
+
+
+def _get_state_fn(state, namespace):
+    """return the user function of a storey Map/Filter/FlatMap/Extend state"""
+    class_args = state.class_args or {}
+    if callable_prefix + "fn" in class_args:
+        return get_function(class_args[callable_prefix + "fn"], namespace)
+    fn = class_args.get("fn")
+    if not callable(fn):
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            f"state {state.name} function (fn) is not set or not callable"
+        )
+    return fn
+
+
+def _raise_async_state(state):
+    raise mlrun.errors.MLRunInvalidArgumentError(
+        f"state {state.name} is async, not supported by the pandas engine"
+    )
+
+
+def _to_target_df(df, featureset):
+    """return the target columns (timestamp key and features), indexed by key"""
+    key_column = featureset.spec.entities[0].name
+    if key_column in df.columns:
+        df = df.set_index(key_column)
+    columns = list(featureset.spec.features.keys())
+    if featureset.spec.timestamp_key:
+        columns = [featureset.spec.timestamp_key] + columns
+    return df[[column for column in columns if column in df.columns]]
+
+
+def run_graph_on_parts(
+    parts,
+    featureset,
+    namespace,
+    targets,
+    read_part=None,
+    infer_stats=InferOptions.Null,
+    max_workers=None,
+):
+    """run the feature set graph on every part (dataframe chunk or file)
+
+    yield the (result df, stats accumulator) of every part in order, with
+    max_workers > 1 the parts are processed by a (forked) process pool and only a
+    bounded number of results is pending at a time
+
+    :param parts:       iterable of dataframe chunks, or of inputs for read_part
+    :param featureset:  feature set object
+    :param namespace:   namespace or module containing graph classes
+    :param targets:     targets written by the graph (e.g. online targets)
+    :param read_part:   optional, function which reads a part into a dataframe
+    :param infer_stats: stats infer options
+    :param max_workers: max number of processes
+    """
+    context = (featureset, namespace, targets, read_part, infer_stats)
+    if not max_workers or max_workers <= 1:
+        for part in parts:
+            yield _process_part(context, part)
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        # the forked workers inherit the context (e.g. the namespace classes)
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_part_worker,
+            initargs=(context,),
+        )
+        process = _process_worker_part
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        process = functools.partial(_process_part, context)
+
+    with executor:
+        futures = deque()
+        for part in parts:
+            futures.append(executor.submit(process, part))
+            if len(futures) >= 2 * max_workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+_part_worker_context = None
+
+
+def _init_part_worker(context):
+    global _part_worker_context
+    _part_worker_context = context
+
+
+def _process_worker_part(part):
+    return _process_part(_part_worker_context, part)
+
+
+def _process_part(context, part):
+    featureset, namespace, targets, read_part, infer_stats = context
+    df = read_part(part) if read_part else part
+    if df.empty:
+        return df, None
+    df = run_ingestion_graph(df, featureset, namespace, targets=targets)
+    stats = None
+    if InferOptions.get_common_options(infer_stats, InferOptions.Stats):
+        stats = StatsAccumulator(infer_stats).update(df)
+    return df, stats
+
+
+def write_chunks_to_targets(
+    chunks, targets, key_column=None, timestamp_key=None, append=False
+):
+    """write dataframe chunks to multiple (offline) targets, return the target sizes
+
+    every target consumes the chunks in its own thread through a bounded queue, so
+    the chunks are generated once and only a few chunks are held in memory
+    """
+    if len(targets) == 1:
+        return [
+            _write_target_chunks(targets[0], chunks, key_column, timestamp_key, append)
+        ]
+
+    queues = [queue.Queue(maxsize=1) for _ in targets]
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        futures = [
+            executor.submit(
+                _write_target_chunks,
+                target,
+                _iterate_queue(chunks_queue),
+                key_column,
+                timestamp_key,
+                append,
+            )
+            for target, chunks_queue in zip(targets, queues)
+        ]
+        try:
+            for chunk in chunks:
+                for chunks_queue, future in zip(queues, futures):
+                    _put_chunk(chunks_queue, chunk, future)
+        finally:
+            for chunks_queue, future in zip(queues, futures):
+                _put_chunk(chunks_queue, _end_of_chunks, future)
+        return [future.result() for future in futures]
+
+
+_end_of_chunks = object()
+
+
+def _write_target_chunks(target, chunks, key_column, timestamp_key, append):
+    if target.kind == TargetTypes.parquet:
+        return target.write_dataframe_chunks(
+            chunks, key_column=key_column, timestamp_key=timestamp_key, append=append
+        )
+    return target.write_dataframe_chunks(chunks, append=append)
+
+
+def _iterate_queue(chunks_queue):
+    while True:
+        chunk = chunks_queue.get()
+        if chunk is _end_of_chunks:
+            return
+        yield chunk
+
+
+def _put_chunk(chunks_queue, chunk, future):
+    while not future.done():
+        try:
+            chunks_queue.put(chunk, timeout=1)
+            return
+        except queue.Full:
+            pass
+    if chunk is not _end_of_chunks:
+        # the target writer stopped before the end of the chunks, raise its error
+        future.result()
+
+
 def featureset_initializer(server):
     """graph server hook to initialize feature set ingestion graph/DAG"""
 
@@ -85,6 +564,10 @@ def _add_data_states(
     if table:
         cache.cache_table(featureset.uri, table, True)
 
+    _set_flow_source(graph, featureset, source)
+
+
+def _set_flow_source(graph, featureset, source):
     entity_columns = list(featureset.spec.entities.keys())
     key_field = entity_columns[0] if entity_columns else None
     if source is not None:
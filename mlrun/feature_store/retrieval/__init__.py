@@ -12,6 +12,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import mlrun
 from .local_merger import LocalFeatureMerger  # noqa
-from .online import init_feature_vector_graph  # noqa
+from .online import init_feature_vector_graph, BatchKeyReader  # noqa
 from .job import run_merge_job  # noqa
+
+mergers = {"local": LocalFeatureMerger}
+
+
+def get_merger(vector, engine=None, engine_args=None):
+    """return a feature merger object for the specified engine (local, dask, spark)"""
+    engine = engine or "local"
+    if engine == "dask":
+        # imported on demand, dask is an optional dependency
+        from .dask_merger import DaskFeatureMerger
+
+        return DaskFeatureMerger(vector, engine_args=engine_args)
+    if engine == "spark":
+        # imported on demand, pyspark is only available in spark images
+        from .spark_merger import SparkFeatureMerger
+
+        return SparkFeatureMerger(vector, engine_args=engine_args)
+    if engine not in mergers:
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            f"unsupported merger engine {engine}, use one of: local,dask,spark"
+        )
+    return mergers[engine](vector, engine_args=engine_args)
@@ -0,0 +1,170 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dask.dataframe as dd
+import pandas as pd
+
+import mlrun
+from .local_merger import LocalFeatureMerger, _earliest
+
+default_partition_rows = 100000
+
+
+class DaskFeatureMerger(LocalFeatureMerger):
+    """feature merger which joins dask dataframes partition-wise
+
+    the feature sets are read lazily into dask dataframes, the as-of and key
+    joins run on the dask workers (using a dask distributed client/cluster when
+    specified) and the result is written to the target partition by partition
+
+    engine_args::
+
+        dask_client:    dask distributed client, DaskCluster function object or uri
+        partition_rows: number of entity rows per dask partition (default 100000)
+
+    the results are written partition by partition, so chunk_size is not used
+    (set the partition_rows instead)
+    """
+
+    def __init__(self, vector, engine_args: dict = None):
+        super().__init__(vector)
+        engine_args = engine_args or {}
+        self._partition_rows = engine_args.get("partition_rows", default_partition_rows)
+        self.client = self._get_client(engine_args.get("dask_client"))
+
+    @staticmethod
+    def _get_client(client):
+        if isinstance(client, str):
+            # DaskCluster function uri
+            client = mlrun.import_function(client)
+        if client is not None and hasattr(client, "client"):
+            # DaskCluster function object, the client is set as the dask default
+            client = client.client
+        return client
+
+    def start(
+        self,
+        entity_rows=None,
+        entity_timestamp_column=None,
+        target=None,
+        drop_columns=None,
+        chunk_size=None,
+        start_time=None,
+        end_time=None,
+        incremental=False,
+    ):
+        if chunk_size:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "chunk_size is not supported by the dask engine, "
+                "use the partition_rows engine arg"
+            )
+        if entity_rows is not None and not hasattr(entity_rows, "dask"):
+            entity_rows = dd.from_pandas(entity_rows, chunksize=self._partition_rows)
+        # the dask partitions are merged and written one by one (no need for chunks)
+        return super().start(
+            entity_rows,
+            entity_timestamp_column,
+            target,
+            drop_columns,
+            start_time=start_time,
+            end_time=end_time,
+            incremental=incremental,
+        )
+
+    def _compute(self, collection):
+        """compute a dask collection, on the dask cluster when a client is set"""
+        if self.client is not None:
+            return self.client.compute(collection).result()
+        return collection.compute()
+
+    def _write_target(self, target, df, append=False):
+        chunks = (self._compute(df.get_partition(i)) for i in range(df.npartitions))
+        return target.write_dataframe_chunks(chunks, append=append)
+
+    def _max_time(self, df, time_column):
+        max_time = self._compute(dd.to_datetime(df[time_column]).max())
+        return None if pd.isnull(max_time) else max_time
+
+    @staticmethod
+    def _rows_after(df, time_column, time):
+        return df[dd.to_datetime(df[time_column]) > time]
+
+    def _load_featureset_df(
+        self,
+        featureset,
+        columns,
+        entity_df=None,
+        entity_timestamp_column=None,
+        start_time=None,
+        end_time=None,
+        df_module=None,
+    ):
+        if (
+            entity_df is not None
+            and featureset.spec.timestamp_key
+            and entity_timestamp_column in entity_df.columns
+        ):
+            # as-of join never uses feature rows newer than the latest entity row
+            end_time = _earliest(
+                end_time, self._max_time(entity_df, entity_timestamp_column)
+            )
+
+        df = super()._load_featureset_df(
+            featureset, columns, start_time=start_time, end_time=end_time, df_module=dd,
+        )
+        return self._reset_named_index(df)
+
+    @staticmethod
+    def _reset_named_index(df):
+        if df.index.name:
+            return df.reset_index()
+        return df
+
+    def _asof_join(
+        self,
+        entity_df,
+        entity_timestamp_column: str,
+        featureset,
+        featureset_df,
+    ):
+        indexes = list(featureset.spec.entities.keys())
+        timestamp_key = featureset.spec.timestamp_key
+        entity_df = self._reset_named_index(entity_df)
+
+        entity_df[entity_timestamp_column] = dd.to_datetime(
+            entity_df[entity_timestamp_column]
+        )
+        featureset_df[timestamp_key] = dd.to_datetime(featureset_df[timestamp_key])
+
+        # set_index sorts the frames and sets known divisions, so the as-of join
+        # runs per partition (using the tail of the preceding right partitions)
+        merged_df = dd.merge_asof(
+            entity_df.set_index(entity_timestamp_column),
+            featureset_df.set_index(timestamp_key),
+            left_index=True,
+            right_index=True,
+            by=indexes,
+        )
+        return merged_df.reset_index()
+
+    def _join(
+        self,
+        entity_df,
+        entity_timestamp_column: str,
+        featureset,
+        featureset_df,
+    ):
+        indexes = list(featureset.spec.entities.keys())
+        entity_df = self._reset_named_index(entity_df)
+        return dd.merge(entity_df, featureset_df, on=indexes)
@@ -2,6 +2,7 @@ import uuid
 
 import mlrun
 from mlrun.model import new_task
+from mlrun.runtimes import RuntimeKinds
 from mlrun.runtimes.function_reference import FunctionReference
 from mlrun.utils import logger
 
@@ -17,6 +18,12 @@ def run_merge_job(
     function=None,
     secrets=None,
     auto_mount=None,
+    chunk_size=None,
+    start_time=None,
+    end_time=None,
+    engine=None,
+    engine_args=None,
+    incremental=False,
 ):
     name = vector.metadata.name
     if not name:
@@ -26,13 +33,21 @@ def run_merge_job(
     if not target or not hasattr(target, "to_dict"):
         raise mlrun.errors.MLRunInvalidArgumentError("target object must be specified")
     name = f"{name}_merger"
+    if engine == "spark" and (
+        not function
+        or function.kind not in [RuntimeKinds.spark, RuntimeKinds.remotespark]
+    ):
+        # the spark merger needs a spark session, i.e. a spark runtime function
+        raise mlrun.errors.MLRunInvalidArgumentError(
+            "the spark engine batch merge requires a spark or remote-spark "
+            "function (function=...) with a merge_handler"
+        )
     if not function:
         function_ref = vector.spec.function
         if not function_ref.to_dict():
             function_ref = FunctionReference(name=name, kind="job")
-        function_ref.image = (
-            function_ref.image or mlrun.mlconf.feature_store.default_job_image
-        )
+        if not function_ref.image:
+            function_ref.image = mlrun.mlconf.feature_store.default_job_image
         if not function_ref.url:
             function_ref.code = _default_merger_handler
         function = function_ref.to_function()
@@ -48,6 +63,12 @@ def run_merge_job(
             "target": target.to_dict(),
             "timestamp_column": timestamp_column,
             "drop_columns": drop_columns,
+            "chunk_size": chunk_size,
+            "start_time": str(start_time) if start_time is not None else None,
+            "end_time": str(end_time) if end_time is not None else None,
+            "engine": engine,
+            "engine_args": engine_args,
+            "incremental": incremental,
         },
         inputs={"entity_rows": entity_rows},
     )
@@ -92,18 +113,26 @@ class RemoteVectorResponse:
 
 _default_merger_handler = """
 import mlrun
-from mlrun.feature_store.retrieval import LocalFeatureMerger
+from mlrun.feature_store.retrieval import get_merger
 from mlrun.datastore.targets import get_target_driver
-def merge_handler(context, vector_uri, target, entity_rows=None, timestamp_column=None, drop_columns=None):
+def merge_handler(context, vector_uri, target, entity_rows=None, timestamp_column=None, drop_columns=None,
+                  chunk_size=None, start_time=None, end_time=None, engine=None, engine_args=None,
+                  incremental=False):
     vector = context.get_store_resource(vector_uri)
     store_target = get_target_driver(target, vector)
     entity_timestamp_column = timestamp_column or vector.spec.timestamp_field
-    if entity_rows:
-        entity_rows = entity_rows.as_df()
+    if entity_rows and engine != "spark":
+        # the spark engine reads the entity rows directly from the DataItem url,
+        # chunked merges read the entity rows chunk by chunk
+        if chunk_size and engine in [None, "local"]:
+            entity_rows = entity_rows.as_df_iter(chunk_size)
+        else:
+            entity_rows = entity_rows.as_df()
 
     context.logger.info(f"starting vector merge task to {vector.uri}")
-    merger = LocalFeatureMerger(vector)
-    resp = merger.start(entity_rows, entity_timestamp_column, store_target, drop_columns)
+    merger = get_merger(vector, engine, engine_args)
+    resp = merger.start(entity_rows, entity_timestamp_column, store_target, drop_columns, chunk_size=chunk_size,
+                        start_time=start_time, end_time=end_time, incremental=incremental)
     target = vector.status.targets[store_target.name].to_dict()
     context.log_result('feature_vector', vector.uri)
     context.log_result('target', target)
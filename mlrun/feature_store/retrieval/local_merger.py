@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 import pandas as pd
 
@@ -21,8 +23,13 @@ from ...utils import logger
 
 
 class LocalFeatureMerger:
-    def __init__(self, vector):
+    _target_is_dir = None
+
+    def __init__(self, vector, engine_args: dict = None):
         self._result_df = None
+        self._target = None
+        self._load_times = {}
+        self._entity_max_time = None
         self.vector = vector
 
     def start(
@@ -31,30 +38,76 @@ class LocalFeatureMerger:
         entity_timestamp_column=None,
         target=None,
         drop_columns=None,
+        chunk_size=None,
+        start_time=None,
+        end_time=None,
+        incremental=False,
     ):
         feature_set_objects, feature_set_fields = self.vector.parse_features()
         if self.vector.metadata.name:
             self.vector.save()
 
-        # load dataframes
-        feature_sets = []
-        dfs = []
-        df_module = None  # for use of dask or other non pandas df module
-        for name, columns in feature_set_fields.items():
-            feature_set = feature_set_objects[name]
-            feature_sets.append(feature_set)
-            column_names = [name for name, alias in columns]
-            df = feature_set.to_dataframe(columns=column_names, df_module=df_module)
-
-            # rename columns with aliases
-            df.rename(
-                columns={name: alias for name, alias in columns if alias}, inplace=True
+        if chunk_size and not target:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "chunked merge requires a target to write the results to"
+            )
+        watermark = None
+        if incremental:
+            if not target or not self.vector.metadata.name:
+                raise mlrun.errors.MLRunInvalidArgumentError(
+                    "incremental merge requires a named vector and a target"
+                )
+            watermark = self.vector.status.watermark
+
+        feature_sets = [feature_set_objects[name] for name in feature_set_fields]
+        columns_list = list(feature_set_fields.values())
+        if entity_rows is None:
+            # the first feature set is used as the entity rows
+            featureset = feature_sets.pop(0)
+            entity_rows = self._load_featureset_dfs(
+                [featureset],
+                [columns_list.pop(0)],
+                start_time=_latest(start_time, watermark),
+                end_time=end_time,
+            )[0]
+            entity_timestamp_column = (
+                entity_timestamp_column or featureset.spec.timestamp_key
+            )
+
+        if not chunk_size and not isinstance(entity_rows, pd.DataFrame):
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                "entity rows iterators are only supported with chunk_size"
             )
-            dfs.append(df)
+        new_watermark = None
+        if incremental:
+            if not entity_timestamp_column:
+                raise mlrun.errors.MLRunInvalidArgumentError(
+                    "incremental merge requires an entity timestamp column"
+                )
+            if chunk_size:
+                # the chunks are filtered (and the watermark updated) while merged
+                watermark = pd.Timestamp(watermark) if watermark else None
+            else:
+                if watermark:
+                    # only the entity rows newer than the last materialization
+                    entity_rows = self._rows_after(
+                        entity_rows, entity_timestamp_column, pd.Timestamp(watermark)
+                    )
+                new_watermark = self._max_time(entity_rows, entity_timestamp_column)
 
-        self.merge(entity_rows, entity_timestamp_column, feature_sets, dfs)
-        if drop_columns:
-            self._result_df.drop(columns=drop_columns, inplace=True)
+        if not chunk_size:
+            # load dataframes (only the rows relevant for the entity rows)
+            dfs = self._load_featureset_dfs(
+                feature_sets,
+                columns_list,
+                entity_rows,
+                entity_timestamp_column,
+                start_time,
+                end_time,
+            )
+            self.merge(entity_rows, entity_timestamp_column, feature_sets, dfs)
+            if drop_columns:
+                self._result_df = self._drop_columns(self._result_df, drop_columns)
 
         if target:
             is_persistent_vector = self.vector.metadata.name is not None
@@ -64,13 +117,198 @@ class LocalFeatureMerger:
                 )
             target.name = target.name or target.kind
             target.set_resource(self.vector)
-            size = target.write_dataframe(self._result_df)
+            if chunk_size:
+                chunks = self._merge_chunks(
+                    entity_rows,
+                    entity_timestamp_column,
+                    feature_sets,
+                    columns_list,
+                    chunk_size,
+                    drop_columns,
+                    start_time,
+                    end_time,
+                    watermark,
+                )
+                size = target.write_dataframe_chunks(chunks, append=incremental)
+                self._target = target
+                if incremental:
+                    new_watermark = self._entity_max_time
+            else:
+                size = self._write_target(target, self._result_df, append=incremental)
             if is_persistent_vector:
-                target_status = target.update_resource_status("ready", size=size)
+                target_status = target.update_resource_status(
+                    "ready", size=size, is_dir=self._target_is_dir
+                )
                 logger.info(f"wrote target: {target_status}")
+                if new_watermark is not None:
+                    self.vector.status.watermark = str(new_watermark)
                 self.vector.save()
+        logger.info(f"feature sets load times (sec): {self._load_times}")
         return OfflineVectorResponse(self)
 
+    def _load_featureset_dfs(
+        self,
+        featuresets: list,
+        columns_list: list,
+        entity_df=None,
+        entity_timestamp_column=None,
+        start_time=None,
+        end_time=None,
+    ):
+        """load the feature set dataframes concurrently (bounded thread pool)
+
+        the load time of every feature set is accumulated in the merger status
+        """
+
+        def load(featureset, columns):
+            start = time.monotonic()
+            df = self._load_featureset_df(
+                featureset,
+                columns,
+                entity_df,
+                entity_timestamp_column,
+                start_time,
+                end_time,
+            )
+            name = featureset.metadata.name
+            self._load_times[name] = self._load_times.get(name, 0) + (
+                time.monotonic() - start
+            )
+            return df
+
+        if not featuresets:
+            return []
+        max_workers = min(
+            int(mlrun.mlconf.feature_store.merger_max_workers), len(featuresets)
+        )
+        if max_workers <= 1:
+            return [
+                load(featureset, columns)
+                for featureset, columns in zip(featuresets, columns_list)
+            ]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(load, featureset, columns)
+                for featureset, columns in zip(featuresets, columns_list)
+            ]
+            return [future.result() for future in futures]
+
+    def _write_target(self, target, df, append=False):
+        return target.write_dataframe(df, append=append)
+
+    @staticmethod
+    def _max_time(df, time_column):
+        """return the latest time in the df time column (None if empty)"""
+        max_time = pd.to_datetime(df[time_column]).max()
+        return None if pd.isnull(max_time) else max_time
+
+    @staticmethod
+    def _rows_after(df, time_column, time):
+        return df[pd.to_datetime(df[time_column]) > time]
+
+    @staticmethod
+    def _drop_columns(df, drop_columns):
+        return df.drop(columns=drop_columns)
+
+    def _load_featureset_df(
+        self,
+        featureset,
+        columns,
+        entity_df=None,
+        entity_timestamp_column=None,
+        start_time=None,
+        end_time=None,
+        df_module=None,
+    ):
+        """load the feature set columns, read only the rows needed for the entity rows
+
+        the entity keys and the entity rows latest timestamp are pushed down to the
+        feature set target reader as filters
+        """
+        entity_keys = None
+        timestamp_key = featureset.spec.timestamp_key
+        if not timestamp_key:
+            start_time = end_time = None
+        if entity_df is not None:
+            entity_keys = {
+                key: entity_df[key].unique()
+                for key in featureset.spec.entities.keys()
+                if key in entity_df.columns
+            }
+            if timestamp_key and entity_timestamp_column in entity_df.columns:
+                # as-of join never uses feature rows newer than the latest entity row
+                end_time = _earliest(
+                    end_time, self._max_time(entity_df, entity_timestamp_column)
+                )
+
+        column_names = [name for name, alias in columns]
+        df = featureset.to_dataframe(
+            columns=column_names,
+            df_module=df_module,
+            start_time=start_time,
+            end_time=end_time,
+            entity_keys=entity_keys,
+        )
+
+        # rename columns with aliases
+        return df.rename(columns={name: alias for name, alias in columns if alias})
+
+    def _merge_chunks(
+        self,
+        entity_rows,
+        entity_timestamp_column: str,
+        featuresets: list,
+        columns_list: list,
+        chunk_size: int,
+        drop_columns=None,
+        start_time=None,
+        end_time=None,
+        watermark=None,
+    ):
+        """merge the entity rows in chunks of up to chunk_size rows, yield the results
+
+        the entity rows (dataframe or iterator of dataframes) are processed chunk by
+        chunk, and only the feature set rows which match the chunk entity keys and
+        are not newer than the chunk latest timestamp are loaded for every chunk, so
+        the memory usage is bounded by the chunk size (and not the data size)
+        """
+        for entity_chunk in self._entity_chunks(entity_rows, chunk_size):
+            if watermark is not None:
+                # only the entity rows newer than the last materialization are merged
+                entity_chunk = self._rows_after(
+                    entity_chunk, entity_timestamp_column, watermark
+                )
+            if entity_timestamp_column:
+                self._entity_max_time = _latest(
+                    self._entity_max_time,
+                    self._max_time(entity_chunk, entity_timestamp_column),
+                )
+            if entity_chunk.empty:
+                continue
+            dfs = self._load_featureset_dfs(
+                featuresets,
+                columns_list,
+                entity_chunk,
+                entity_timestamp_column,
+                start_time,
+                end_time,
+            )
+            self.merge(entity_chunk, entity_timestamp_column, list(featuresets), dfs)
+            if drop_columns:
+                self._result_df = self._drop_columns(self._result_df, drop_columns)
+            yield self._result_df
+            self._result_df = None
+
+    @staticmethod
+    def _entity_chunks(entity_rows, chunk_size):
+        """yield the entity rows (dataframe or dataframes iterator) in chunks"""
+        if isinstance(entity_rows, pd.DataFrame):
+            entity_rows = [entity_rows]
+        for df in entity_rows:
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start : start + chunk_size]
+
     def merge(
         self,
         entity_df,
@@ -98,6 +336,23 @@ class LocalFeatureMerger:
 
         self._result_df = merged_df
 
+    @staticmethod
+    def _sorted_by_time(df: pd.DataFrame, timestamp_column: str):
+        """return the df with a default index, sorted by its (datetime) time column
+
+        the df is copied only when it needs to be normalized, so frames which
+        are already normalized (e.g. the results of previous as-of joins or
+        targets written in time order) are used as is
+        """
+        if type(df.index) != pd.RangeIndex:
+            # unnamed indexes (e.g. of filtered rows) are dropped
+            df = df.reset_index(drop=not any(df.index.names))
+        if not pd.api.types.is_datetime64_any_dtype(df[timestamp_column]):
+            df = df.assign(**{timestamp_column: pd.to_datetime(df[timestamp_column])})
+        if not df[timestamp_column].is_monotonic_increasing:
+            df = df.sort_values(by=timestamp_column, ignore_index=True)
+        return df
+
     def _asof_join(
         self,
         entity_df,
@@ -106,23 +361,14 @@ class LocalFeatureMerger:
         featureset_df: pd.DataFrame,
     ):
         indexes = list(featureset.spec.entities.keys())
-        index_col_not_in_entity = "index" not in entity_df.columns
-        index_col_not_in_featureset = "index" not in featureset_df.columns
-        # Sort left and right keys
-        if type(entity_df.index) != pd.RangeIndex:
-            entity_df = entity_df.reset_index()
-        if type(featureset_df.index) != pd.RangeIndex:
-            featureset_df = featureset_df.reset_index()
-        entity_df[entity_timestamp_column] = pd.to_datetime(
-            entity_df[entity_timestamp_column]
-        )
-        featureset_df[featureset.spec.timestamp_key] = pd.to_datetime(
-            featureset_df[featureset.spec.timestamp_key]
+        # the entity frame is normalized and sorted once, the as-of join results
+        # keep its order so the next joins use them without sorting or copying
+        entity_df = self._sorted_by_time(entity_df, entity_timestamp_column)
+        featureset_df = self._sorted_by_time(
+            featureset_df, featureset.spec.timestamp_key
         )
-        entity_df = entity_df.sort_values(by=entity_timestamp_column)
-        featureset_df = featureset_df.sort_values(by=entity_timestamp_column)
 
-        merged_df = pd.merge_asof(
+        return pd.merge_asof(
             entity_df,
             featureset_df,
             left_on=entity_timestamp_column,
@@ -130,18 +376,6 @@ class LocalFeatureMerger:
             by=indexes,
         )
 
-        # Undo indexing tricks for asof merge
-        # to return the correct indexes and not
-        # overload `index` columns
-        if (
-            "index" not in indexes
-            and index_col_not_in_entity
-            and index_col_not_in_featureset
-            and "index" in merged_df.columns
-        ):
-            merged_df = merged_df.drop(columns="index")
-        return merged_df
-
     def _join(
         self,
         entity_df,
@@ -150,13 +384,32 @@ class LocalFeatureMerger:
         featureset_df: pd.DataFrame,
     ):
         indexes = list(featureset.spec.entities.keys())
-        merged_df = pd.merge(entity_df, featureset_df, on=indexes)
+        merged_df = pd.merge(entity_df, featureset_df, on=indexes, copy=False)
         return merged_df
 
     def get_status(self):
-        if self._result_df is None:
+        if self._result_df is None and self._target is None:
             raise RuntimeError("unexpected status, no result df")
         return "completed"
 
+    def get_load_times(self):
+        """return the (accumulated) load time in seconds per feature set"""
+        return self._load_times
+
     def get_df(self):
+        if self._result_df is None and self._target is not None:
+            # chunked merge results are only stored in the target
+            return self._target.as_df()
         return self._result_df
+
+
+def _latest(time, other):
+    if time is None or other is None:
+        return other if time is None else time
+    return max(pd.Timestamp(time), pd.Timestamp(other))
+
+
+def _earliest(time, other):
+    if time is None or other is None:
+        return other if time is None else time
+    return min(pd.Timestamp(time), pd.Timestamp(other))
@@ -12,6 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+
 import mlrun
 
 from mlrun.datastore.store_resources import ResourceCache
@@ -57,15 +63,24 @@ def _build_feature_vector_graph(
     return graph
 
 
-def init_feature_vector_graph(vector):
+def init_feature_vector_graph(
+    vector, feature_set_objects=None, feature_set_fields=None, async_flow=False
+):
+    """build and initialize the vector (storey) serving graph
+
+    with async_flow the graph flow uses an async source, it must be initialized
+    from inside the event loop which runs the flow (the controller property is
+    an awaitable which returns the async flow controller)
+    """
     try:
-        from storey import Source
+        from storey import AsyncSource, Source
     except ImportError as exc:
         raise ImportError(f"storey not installed, use pip install storey, {exc}")
 
-    feature_set_objects, feature_set_fields = vector.parse_features()
+    if feature_set_objects is None:
+        feature_set_objects, feature_set_fields = vector.parse_features()
     graph = _build_feature_vector_graph(vector, feature_set_fields, feature_set_objects)
-    graph.set_flow_source(Source())
+    graph.set_flow_source(AsyncSource() if async_flow else Source())
     server = create_graph_server(graph=graph, parameters={})
 
     cache = ResourceCache()
@@ -74,3 +89,228 @@ def init_feature_vector_graph(vector):
         cache.cache_table(featureset.uri, driver.get_table_object())
     server.init(None, None, cache)
     return graph
+
+
+class BatchKeyReader:
+    """read the vector features for many entity rows using bulk key reads
+
+    the unique keys of every feature set are read from the feature set online
+    table with the target key reader, the feature sets are read concurrently (in
+    a thread pool, or as concurrent coroutines with aget), so the batch latency is
+    about that of a single feature set read (instead of one read per row and set)
+    """
+
+    def __init__(
+        self,
+        feature_set_objects,
+        feature_set_fields,
+        cache_ttl=None,
+        cache_max_entries=None,
+    ):
+        self._queries = []
+        for name, columns in feature_set_fields.items():
+            featureset = feature_set_objects[name]
+            cache = None
+            if cache_ttl or cache_max_entries:
+                cache = FeatureCache(cache_ttl, cache_max_entries)
+            self._queries.append(
+                _FeatureSetQuery(
+                    name,
+                    get_online_target(featureset).get_key_reader(),
+                    list(featureset.spec.entities.keys())[0],
+                    columns,
+                    cache,
+                )
+            )
+        self._executor = None
+
+    @staticmethod
+    def is_supported(vector, feature_set_objects, feature_set_fields):
+        """batch reads support vectors without a graph and aggregation features,
+        whose feature sets online targets support key reads"""
+        if vector.spec.graph.states:
+            return False
+        for name, columns in feature_set_fields.items():
+            featureset = feature_set_objects[name]
+            target = get_online_target(featureset)
+            if not target or not target.support_key_reads:
+                return False
+            aggregates = _get_aggregate_features(featureset)
+            if any(name in aggregates for name, alias in columns):
+                return False
+        return True
+
+    def get(self, entity_rows):
+        """return the entity rows enriched with the features, in input order"""
+        executor = self._get_executor()
+        futures = [
+            executor.submit(self._read_keys, query, keys)
+            for query, keys in self._get_keys(entity_rows)
+        ]
+        return self._merge(entity_rows, [future.result() for future in futures])
+
+    async def aget(self, entity_rows):
+        """async get, the reads are awaited natively (no executor threads)"""
+        items_list = await asyncio.gather(
+            *[
+                self._aread_keys(query, keys)
+                for query, keys in self._get_keys(entity_rows)
+            ]
+        )
+        return self._merge(entity_rows, items_list)
+
+    def cache_stats(self):
+        """return the feature cache hits/misses/entries per feature set"""
+        return {
+            query.name: query.cache.stats()
+            for query in self._queries
+            if query.cache is not None
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for query in self._queries:
+            query.reader.close()
+
+    async def aclose(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for query in self._queries:
+            await query.reader.aclose()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor()
+        return self._executor
+
+    def _get_keys(self, entity_rows):
+        """return the unique keys to read per feature set query"""
+        for query in self._queries:
+            # every key is read once, even if it appears in many rows
+            key_column = query.key_column
+            keys = {row[key_column] for row in entity_rows if key_column in row}
+            yield query, keys
+
+    def _merge(self, entity_rows, items_list):
+        results = [dict(row) for row in entity_rows]
+        for query, items in zip(self._queries, items_list):
+            for row, result in zip(entity_rows, results):
+                item = items.get(row.get(query.key_column)) or {}
+                for name, alias in query.columns:
+                    if name in item:
+                        result[alias or name] = item[name]
+        return results
+
+    @staticmethod
+    def _read_keys(query, keys):
+        items, keys = query.get_cached(keys)
+        if not keys:
+            return items
+        return query.update(items, keys, query.reader.get(keys, query.attributes))
+
+    @staticmethod
+    async def _aread_keys(query, keys):
+        items, keys = query.get_cached(keys)
+        if not keys:
+            return items
+        found = await query.reader.aget(keys, query.attributes)
+        return query.update(items, keys, found)
+
+
+def _get_aggregate_features(featureset):
+    """return the names of the feature set aggregation features"""
+    names = {
+        name for name, feature in featureset.spec.features.items() if feature.aggregate
+    }
+    # aggregation states which were added to the graph directly
+    for state in featureset.spec.graph.states.values():
+        if not (getattr(state, "class_name", None) or "").endswith("AggregateByKey"):
+            continue
+        for aggregation in (state.class_args or {}).get("aggregates", []):
+            for operation in aggregation.get("operations", []):
+                for window in aggregation.get("windows", []):
+                    names.add(f"{aggregation['name']}_{operation}_{window}")
+    return names
+
+
+class _FeatureSetQuery:
+    def __init__(self, name, reader, key_column, columns, cache=None):
+        self.name = name
+        self.reader = reader
+        self.key_column = key_column
+        self.columns = columns
+        self.cache = cache
+        self.attributes = [name for name, alias in columns]
+
+    def get_cached(self, keys):
+        """return the cached items and the keys to read"""
+        if self.cache is None:
+            return {}, list(keys)
+        # hot keys are served from the cache, only the misses are read
+        items = {}
+        for key in keys:
+            item = self.cache.get(key)
+            if item is not None:
+                items[key] = item
+        return items, [key for key in keys if key not in items]
+
+    def update(self, items, keys, found):
+        """add the read keys to the items (and cache)"""
+        for key in keys:
+            # missing keys are cached as empty items
+            item = found.get(key) or {}
+            if self.cache is not None:
+                self.cache.set(key, item)
+            items[key] = item
+        return items
+
+
+class FeatureCache:
+    """bounded in-process cache of the feature values per entity key
+
+    entries expire ttl seconds after they were read, when the cache has more
+    than max_entries keys the least recently used keys are evicted, the cache is
+    safe to use from multiple threads
+
+    :param ttl:         optional, time to live in seconds (default: no expiration)
+    :param max_entries: optional, max number of cached keys
+                        (default: mlconf.feature_store.online_cache_max_entries)
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl
+        self.max_entries = max_entries or int(
+            mlrun.mlconf.feature_store.online_cache_max_entries
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        """return the cached item of the key, None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                item, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, item):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (item, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,236 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pandas as pd
+from pyspark.sql import SparkSession, Window
+from pyspark.sql import functions as funcs
+
+import mlrun
+from ...datastore.targets import get_offline_target
+from ...datastore.utils import store_path_to_spark
+from .local_merger import LocalFeatureMerger, _earliest
+
+is_entity_column = "_mlrun_is_entity"
+features_column = "_mlrun_features"
+
+
+class SparkFeatureMerger(LocalFeatureMerger):
+    """feature merger which joins spark dataframes on the spark cluster
+
+    the feature sets offline (parquet/csv) targets are read with spark, the
+    point-in-time (as-of) join is done with window functions and the result is
+    written to the target in parallel by the spark executors
+
+    engine_args::
+
+        spark:    spark session (default: SparkSession.builder.getOrCreate())
+        format:   entity rows file format when the entity rows are a DataItem/url
+                  (default: parquet, or csv for .csv paths)
+    """
+
+    _target_is_dir = True
+
+    def __init__(self, vector, engine_args: dict = None):
+        super().__init__(vector)
+        engine_args = engine_args or {}
+        self._entity_rows_format = engine_args.get("format")
+        self.spark = engine_args.get("spark") or SparkSession.builder.appName(
+            f"{vector.metadata.name or 'vector'}-merger"
+        ).getOrCreate()
+
+    def start(
+        self,
+        entity_rows=None,
+        entity_timestamp_column=None,
+        target=None,
+        drop_columns=None,
+        chunk_size=None,
+        start_time=None,
+        end_time=None,
+        incremental=False,
+    ):
+        entity_rows = self._to_spark_df(entity_rows)
+        if entity_rows is not None and entity_timestamp_column in entity_rows.columns:
+            entity_rows = entity_rows.withColumn(
+                entity_timestamp_column,
+                funcs.col(entity_timestamp_column).cast("timestamp"),
+            )
+        # the spark executors write the result partitions (no need for chunks)
+        return super().start(
+            entity_rows,
+            entity_timestamp_column,
+            target,
+            drop_columns,
+            start_time=start_time,
+            end_time=end_time,
+            incremental=incremental,
+        )
+
+    def _to_spark_df(self, entity_rows):
+        if entity_rows is None or hasattr(entity_rows, "rdd"):
+            return entity_rows
+        if isinstance(entity_rows, pd.DataFrame):
+            return self.spark.createDataFrame(entity_rows)
+
+        # entity rows DataItem or url, read directly by the spark executors
+        url = getattr(entity_rows, "url", entity_rows)
+        file_format = self._entity_rows_format or (
+            "csv" if url.endswith(".csv") else "parquet"
+        )
+        options = {"path": store_path_to_spark(url), "format": file_format}
+        if file_format == "csv":
+            options.update({"header": "true", "inferSchema": "true"})
+        return self.spark.read.load(**options)
+
+    @staticmethod
+    def _drop_columns(df, drop_columns):
+        return df.drop(*drop_columns)
+
+    @staticmethod
+    def _max_time(df, time_column):
+        max_time = df.agg(funcs.max(funcs.col(time_column).cast("timestamp"))).first()
+        return max_time[0]
+
+    @staticmethod
+    def _rows_after(df, time_column, time):
+        time = pd.Timestamp(time).to_pydatetime()
+        return df.filter(funcs.col(time_column).cast("timestamp") > time)
+
+    def _load_featureset_df(
+        self,
+        featureset,
+        columns,
+        entity_df=None,
+        entity_timestamp_column=None,
+        start_time=None,
+        end_time=None,
+        df_module=None,
+    ):
+        target = get_offline_target(featureset)
+        if not target:
+            raise mlrun.errors.MLRunInvalidArgumentError(
+                f"feature set {featureset.metadata.name} has no offline target"
+            )
+
+        entities = list(featureset.spec.entities.keys())
+        timestamp_key = featureset.spec.timestamp_key
+        column_names = [name for name, alias in columns]
+        select_columns = entities + [
+            column for column in column_names if column not in entities
+        ]
+        if timestamp_key and timestamp_key not in select_columns:
+            select_columns.append(timestamp_key)
+
+        df = self.spark.read.load(**target.get_spark_options())
+        df = df.select(*select_columns)
+
+        if timestamp_key:
+            df = df.withColumn(
+                timestamp_key, funcs.col(timestamp_key).cast("timestamp")
+            )
+            if entity_df is not None and entity_timestamp_column in entity_df.columns:
+                # as-of join never uses feature rows newer than the latest entity row
+                end_time = _earliest(
+                    end_time, self._max_time(entity_df, entity_timestamp_column)
+                )
+            # the time filters are pushed down to the parquet reader
+            if start_time is not None:
+                start_time = pd.Timestamp(start_time).to_pydatetime()
+                df = df.filter(funcs.col(timestamp_key) >= start_time)
+            if end_time is not None:
+                end_time = pd.Timestamp(end_time).to_pydatetime()
+                df = df.filter(funcs.col(timestamp_key) <= end_time)
+
+        if entity_df is not None and all(key in entity_df.columns for key in entities):
+            # read only the rows with keys which appear in the entity rows
+            df = df.join(
+                entity_df.select(*entities).distinct(), on=entities, how="left_semi"
+            )
+
+        # rename columns with aliases
+        for name, alias in columns:
+            if alias:
+                df = df.withColumnRenamed(name, alias)
+        return df
+
+    def _asof_join(
+        self, entity_df, entity_timestamp_column: str, featureset, featureset_df,
+    ):
+        """point-in-time join using window functions
+
+        the entity rows and feature rows are unioned and ordered by time (per
+        entity key), every entity row takes the latest feature row which is not
+        newer than it, avoiding a range join between the two dataframes
+        """
+        indexes = list(featureset.spec.entities.keys())
+        timestamp_key = featureset.spec.timestamp_key
+        feature_columns = [
+            column
+            for column in featureset_df.columns
+            if column not in indexes and column != timestamp_key
+        ]
+
+        # pack the feature row values, so null feature values are kept as is
+        features = featureset_df.select(
+            *indexes,
+            funcs.col(timestamp_key).alias(entity_timestamp_column),
+            funcs.struct(*feature_columns).alias(features_column),
+        ).withColumn(is_entity_column, funcs.lit(0))
+        features_type = features.schema[features_column].dataType
+        entity_df = entity_df.withColumn(is_entity_column, funcs.lit(1)).withColumn(
+            features_column, funcs.lit(None).cast(features_type)
+        )
+
+        # align the union columns and types, fill the missing columns with nulls
+        features = features.select(
+            *[
+                (
+                    funcs.col(field.name)
+                    if field.name in features.columns
+                    else funcs.lit(None)
+                )
+                .cast(field.dataType)
+                .alias(field.name)
+                for field in entity_df.schema.fields
+            ]
+        )
+
+        # feature rows precede entity rows with the same time (exact matches)
+        window = (
+            Window.partitionBy(*indexes)
+            .orderBy(entity_timestamp_column, is_entity_column)
+            .rowsBetween(Window.unboundedPreceding, Window.currentRow)
+        )
+        merged_df = (
+            entity_df.unionByName(features)
+            .withColumn(
+                features_column,
+                funcs.last(features_column, ignorenulls=True).over(window),
+            )
+            .filter(funcs.col(is_entity_column) == 1)
+        )
+        return merged_df.select(
+            *[
+                column
+                for column in merged_df.columns
+                if column not in [is_entity_column, features_column]
+            ],
+            *[funcs.col(f"{features_column}.{column}") for column in feature_columns],
+        )
+
+    def _join(
+        self, entity_df, entity_timestamp_column: str, featureset, featureset_df,
+    ):
+        indexes = list(featureset.spec.entities.keys())
+        return entity_df.join(featureset_df, on=indexes, how="inner")
@@ -1,6 +1,15 @@
+import math
 from typing import Dict, Any
+
+import pandas as pd
 from storey import MapClass
 
+from mlrun.datastore.utils import (
+    key_to_bucket,
+    key_bucket_column,
+    time_partitioning_granularities,
+)
+
 this_path = "mlrun.feature_store.steps"
 
 
@@ -34,6 +43,22 @@ class FeaturesetValidator(MapClass):
                     )
         return event
 
+    def do_df(self, df: pd.DataFrame):
+        """validate the dataframe columns (batch implementation of do)"""
+        featureset = getattr(self, "_featureset", None)
+        time_column = featureset.spec.timestamp_key if featureset else None
+        for name, validator in self._validators.items():
+            if name in df.columns:
+                for position, args in validator.check_series(df[name]):
+                    message = args.pop("message")
+                    key_text = f" key={df.index[position]}" if df.index.name else ""
+                    if time_column and time_column in df.columns:
+                        key_text += f" time={df[time_column].iat[position]}"
+                    print(
+                        f"{validator.severity}! {name} {message},{key_text} args={args}"
+                    )
+        return df
+
     def to_dict(self):
         return {
             "class_name": this_path + ".FeaturesetValidator",
@@ -86,6 +111,54 @@ class MapValues(MapClass):
 
         return mapped_values
 
+    def _map_series(self, feature: str, series: pd.Series):
+        feature_map = self.mapping.get(feature, {})
+        ranges = feature_map.get("ranges", [])
+        if pd.api.types.is_bool_dtype(series) or (
+            ranges and not pd.api.types.is_numeric_dtype(series)
+        ):
+            # mixed values, map value by value
+            return series.map(lambda value: self._map_value(feature, value))
+
+        if not pd.api.types.is_numeric_dtype(series):
+            # string replacements
+            replacements = {
+                key: value for key, value in feature_map.items() if key != "ranges"
+            }
+            is_replaced = series.isin(list(replacements.keys()))
+            return series.mask(is_replaced, series.map(replacements))
+
+        # range replacements, the first matching range is used
+        mapped = series
+        is_mapped = pd.Series(False, index=series.index)
+        for feature_range in ranges:
+            low, high = feature_range["range"]
+            in_range = ~is_mapped & (series >= low) & (series < high)
+            mapped = mapped.mask(in_range, feature_range["value"])
+            is_mapped |= in_range
+        return mapped
+
+    def do_df(self, df: pd.DataFrame):
+        """map the dataframe values (batch implementation of do)"""
+        index = df.index
+        df = df.reset_index(drop=True)
+        mapped_df = pd.DataFrame(
+            {
+                self._feature_name(feature): self._map_series(feature, df[feature])
+                for feature in df.columns
+                if feature in self.mapping
+            },
+            index=df.index,
+        )
+
+        if self.with_original_features:
+            mapped_df = pd.concat(
+                [mapped_df.drop(columns=df.columns, errors="ignore"), df], axis=1
+            )
+
+        mapped_df.index = index
+        return mapped_df
+
     def to_dict(self):
         return {
             "class_name": this_path + ".MapValues",
@@ -112,7 +185,7 @@ class Imputer(MapClass):
         self.default_value = default_value
 
     def _impute(self, feature: str, value):
-        if value is None:
+        if _is_missing(value):
             return self.mapping.get(feature, self.default_value)
         return value
 
@@ -122,6 +195,28 @@ class Imputer(MapClass):
         }
         return imputed_values
 
+    def do_df(self, df: pd.DataFrame):
+        """fill the dataframe missing values (batch implementation of do)
+
+        like in do, only None and NaN values are missing (e.g. NaT is not)
+        """
+        mapping = self.mapping or {}
+        imputed = {}
+        for feature in df.columns:
+            value = mapping.get(feature, self.default_value)
+            if value is None:
+                continue
+            column = df[feature]
+            if pd.api.types.is_float_dtype(column):
+                missing = column.isna()
+            elif pd.api.types.is_object_dtype(column):
+                missing = column.map(_is_missing).astype(bool)
+            else:
+                continue
+            if missing.any():
+                imputed[feature] = column.mask(missing, value)
+        return df.assign(**imputed) if imputed else df
+
     def to_dict(self):
         return {
             "class_name": this_path + ".Imputer",
@@ -134,6 +229,10 @@ class Imputer(MapClass):
         }
 
 
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
 class OneHotEncoder(MapClass):
     def __init__(self, mapping: Dict[str, Dict[str, Any]], **kwargs):
         super().__init__(**kwargs)
@@ -158,9 +257,78 @@ class OneHotEncoder(MapClass):
             encoded_values.update(self._encode(feature, val))
         return encoded_values
 
+    def do_df(self, df: pd.DataFrame):
+        """one hot encode the dataframe columns (batch implementation of do)"""
+        index = df.index
+        df = df.reset_index(drop=True)
+        encoded_columns = {}
+        for feature in df.columns:
+            encoding = self.mapping.get(feature, [])
+            if not encoding:
+                encoded_columns[feature] = df[feature]
+                continue
+
+            values = df[feature]
+            unknown_values = values[~values.isin(encoding)].unique()
+            if len(unknown_values):
+                print(
+                    f"Warning, {list(unknown_values)} are not known values "
+                    "by the encoding"
+                )
+            for category in encoding:
+                is_category = values == category
+                encoded_columns[f"{feature}_{category}"] = is_category.astype(int)
+
+        encoded_df = pd.DataFrame(encoded_columns, index=df.index)
+        encoded_df.index = index
+        return encoded_df
+
     def to_dict(self):
         return {
             "class_name": this_path + ".OneHotEncoder",
             "name": self.name or "OneHotEncoder",
             "class_args": {"mapping": self.mapping},
         }
+
+
+class PartitionColumns(MapClass):
+    """add the time/key partition columns used by a partitioned ParquetTarget"""
+
+    def __init__(
+        self,
+        key_column: str = None,
+        timestamp_key: str = None,
+        key_bucketing_number: int = None,
+        time_partitioning_granularity: str = None,
+        **kwargs,
+    ):
+        super().__init__(full_event=True, **kwargs)
+        self.key_column = key_column
+        self.timestamp_key = timestamp_key
+        self.key_bucketing_number = key_bucketing_number
+        self.time_partitioning_granularity = time_partitioning_granularity
+
+    def do(self, event):
+        body = event.body
+        if self.key_bucketing_number:
+            key = body.get(self.key_column, event.key)
+            body[key_bucket_column] = key_to_bucket(key, self.key_bucketing_number)
+        if self.time_partitioning_granularity:
+            time = pd.Timestamp(body.get(self.timestamp_key, event.time))
+            for unit in time_partitioning_granularities:
+                body[unit] = getattr(time, unit)
+                if unit == self.time_partitioning_granularity:
+                    break
+        return event
+
+    def to_dict(self):
+        return {
+            "class_name": this_path + ".PartitionColumns",
+            "name": self.name or "PartitionColumns",
+            "class_args": {
+                "key_column": self.key_column,
+                "timestamp_key": self.timestamp_key,
+                "key_bucketing_number": self.key_bucketing_number,
+                "time_partitioning_granularity": self.time_partitioning_granularity,
+            },
+        }
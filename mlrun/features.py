@@ -83,6 +83,18 @@ class Validator(ModelObj):
     def check(self, value):
         return True, {}
 
+    def check_series(self, series):
+        """check all the values of a (pandas) series
+
+        return a list of (row position, args) for the values which failed the check
+        """
+        failed = []
+        for position, value in enumerate(series):
+            ok, args = self.check(value)
+            if not ok:
+                failed.append((position, args))
+        return failed
+
 
 class MinMaxValidator(Validator):
     """validate min/max value ranges"""
@@ -120,6 +132,26 @@ class MinMaxValidator(Validator):
                     )
         return ok, args
 
+    def check_series(self, series):
+        failed = []
+        below_min = series < self.min if self.min is not None else None
+        if below_min is not None:
+            failed += [
+                (position, {"message": "value is smaller than min", "min": self.min})
+                for position in below_min.to_numpy().nonzero()[0]
+            ]
+        if self.max is not None:
+            above_max = series > self.max
+            if below_min is not None:
+                above_max &= ~below_min
+            failed += [
+                (position, {"message": "value is greater than max", "max": self.max})
+                for position in above_max.to_numpy().nonzero()[0]
+            ]
+        for position, args in failed:
+            args["value"] = series.iat[position]
+        return sorted(failed, key=lambda item: item[0])
+
 
 validator_kinds = {
     "": Validator,
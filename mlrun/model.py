@@ -18,7 +18,7 @@ from collections import OrderedDict
 from copy import deepcopy
 from os import environ
 import re
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List
 import mlrun
 
 from .config import config
@@ -798,7 +798,17 @@ class DataSource(ModelObj):
 class DataTargetBase(ModelObj):
     """data target spec, specify a destination for the feature set data"""
 
-    _dict_fields = ["name", "kind", "path", "after_state", "attributes"]
+    _dict_fields = [
+        "name",
+        "kind",
+        "path",
+        "after_state",
+        "attributes",
+        "partitioned",
+        "key_bucketing_number",
+        "partition_cols",
+        "time_partitioning_granularity",
+    ]
 
     def __init__(
         self,
@@ -807,12 +817,20 @@ class DataTargetBase(ModelObj):
         path=None,
         attributes: Dict[str, str] = None,
         after_state=None,
+        partitioned: bool = None,
+        key_bucketing_number: int = None,
+        partition_cols: List[str] = None,
+        time_partitioning_granularity: str = None,
     ):
         self.name = name
         self.kind: str = kind
         self.path = path
         self.after_state = after_state
         self.attributes = attributes or {}
+        self.partitioned = partitioned
+        self.key_bucketing_number = key_bucketing_number
+        self.partition_cols = partition_cols
+        self.time_partitioning_granularity = time_partitioning_granularity
 
 
 class FeatureSetProducer(ModelObj):
@@ -839,6 +857,10 @@ class DataTarget(DataTargetBase):
         "is_dir",
         "updated",
         "size",
+        "partitioned",
+        "key_bucketing_number",
+        "partition_cols",
+        "time_partitioning_granularity",
     ]
 
     def __init__(
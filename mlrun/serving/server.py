@@ -126,6 +126,23 @@ class GraphServer(ModelObj):
 
         if self.error_stream:
             self._error_stream_object = get_stream_pusher(self.error_stream)
+        context = self.init_context(context, resource_cache, logger)
+
+        if self.graph_initializer:
+            if callable(self.graph_initializer):
+                handler = self.graph_initializer
+            else:
+                handler = get_function(self.graph_initializer, namespace or [])
+            handler(self)
+
+        context.root = self.graph
+        self.graph.init_object(context, namespace, self.load_mode, reset=True)
+        return v2_serving_handler
+
+    def init_context(
+        self, context=None, resource_cache: ResourceCache = None, logger=None
+    ):
+        """for internal use, create the graph context (without initializing states)"""
         self.resource_cache = resource_cache or ResourceCache()
         context = GraphContext(server=self, nuclio_context=context, logger=logger)
 
@@ -139,17 +156,7 @@ class GraphServer(ModelObj):
         context.get_table = self.resource_cache.get_table
         context.verbose = self.verbose
         self.context = context
-
-        if self.graph_initializer:
-            if callable(self.graph_initializer):
-                handler = self.graph_initializer
-            else:
-                handler = get_function(self.graph_initializer, namespace or [])
-            handler(self)
-
-        context.root = self.graph
-        self.graph.init_object(context, namespace, self.load_mode, reset=True)
-        return v2_serving_handler
+        return context
 
     def test(
         self,
@@ -1,4 +1,5 @@
 import os
+import shutil
 
 import mlrun
 import pytest
@@ -13,7 +14,7 @@ from mlrun.feature_store.steps import FeaturesetValidator
 from data_sample import quotes, stocks, trades
 from storey import MapClass
 
-from mlrun.datastore.targets import CSVTarget
+from mlrun.datastore.targets import CSVTarget, ParquetTarget
 from mlrun.utils import logger
 import mlrun.feature_store as fs
 from mlrun.config import config as mlconf
@@ -195,6 +196,110 @@ def test_serverless_ingest():
     print(measurements.to_yaml())
 
 
+@pytest.mark.skipif(not has_db(), reason="no db access")
+def test_chunked_ingest():
+    init_store()
+    key = "patient_id"
+
+    measurements = fs.FeatureSet(
+        "measurements-chunks", entities=[Entity(key)], timestamp_key="timestamp"
+    )
+    target_path = os.path.relpath(results_dir + "chunks.csv")
+    source = CSVSource("mycsv", path=os.path.relpath(local_dir + "testdata.csv"))
+    df = fs.ingest(
+        measurements,
+        source,
+        [CSVTarget("mycsv", path=target_path)],
+        infer_options=fs.InferOptions.schema() + fs.InferOptions.Stats,
+        chunk_size=7,
+    )
+
+    expected = pd.read_csv(local_dir + "testdata.csv")
+    assert len(df) == len(expected), "dataframe size doesnt match"
+    assert len(pd.read_csv(target_path)) == len(expected), "target size doesnt match"
+    stats = measurements.status.stats
+    assert stats["movements"]["count"] == expected["movements"].count()
+    assert stats["movements"]["max"] == expected["movements"].max()
+
+
+@pytest.mark.skipif(not has_db(), reason="no db access")
+def test_multi_file_ingest():
+    init_store()
+    key = "patient_id"
+
+    expected = pd.read_csv(local_dir + "testdata.csv")
+    source_dir = results_dir + "multi-file"
+    os.makedirs(source_dir, exist_ok=True)
+    for index in range(3):
+        expected.iloc[index::3].to_csv(f"{source_dir}/part{index}.csv", index=False)
+
+    measurements = fs.FeatureSet(
+        "measurements-files", entities=[Entity(key)], timestamp_key="timestamp"
+    )
+    target_path = os.path.relpath(results_dir + "multi-file.csv")
+    df = fs.ingest(
+        measurements,
+        CSVSource("mycsv", path=f"{source_dir}/*.csv"),
+        [CSVTarget("mycsv", path=target_path)],
+        infer_options=fs.InferOptions.schema() + fs.InferOptions.Stats,
+        max_workers=2,
+    )
+
+    assert len(df) == len(expected), "dataframe size doesnt match"
+    assert len(pd.read_csv(target_path)) == len(expected), "target size doesnt match"
+    stats = measurements.status.stats
+    assert stats["movements"]["count"] == expected["movements"].count()
+
+
+@pytest.mark.skipif(not has_db(), reason="no db access")
+def test_incremental_ingest():
+    init_store()
+
+    quotes_set = FeatureSet(
+        "stock-quotes-incremental", entities=[Entity("ticker")], timestamp_key="time"
+    )
+    target_path = os.path.relpath(results_dir + "quotes-incremental.csv")
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    targets = [CSVTarget("mycsv", path=target_path)]
+
+    fs.ingest(quotes_set, quotes.iloc[:5], targets, incremental=True)
+    assert len(pd.read_csv(target_path)) == 5, "wrong number of ingested rows"
+
+    # only the rows newer than the watermark are ingested and appended
+    df = fs.ingest(quotes_set, quotes, targets, incremental=True)
+    assert len(df) == 3, "old rows were ingested"
+    assert len(pd.read_csv(target_path)) == len(quotes), "rows were not appended"
+    assert quotes_set.status.watermarks["df"]["time"] == str(quotes["time"].max())
+
+
+@pytest.mark.skipif(not has_db(), reason="no db access")
+def test_incremental_vector():
+    init_store()
+
+    prepare_feature_set("left", "ticker", trades, timestamp_key="time")
+    prepare_feature_set("right", "ticker", quotes, timestamp_key="time")
+    vector = fs.FeatureVector("incremental_fv", ["left.*", "right.*"])
+    target_path = os.path.relpath(results_dir + "incremental-vector/")
+    if os.path.exists(target_path):
+        shutil.rmtree(target_path)
+    target = ParquetTarget("pq", path=target_path)
+
+    old_trades = trades[trades["time"] < trades["time"].max()]
+    fs.get_offline_features(
+        vector, old_trades, "time", store_target=target, incremental=True
+    )
+    assert vector.status.watermark == str(old_trades["time"].max()), "bad watermark"
+
+    # only the entity rows newer than the watermark are merged and appended
+    fs.get_offline_features(
+        vector, trades, "time", store_target=target, incremental=True
+    )
+    assert len(pd.read_parquet(target_path)) == len(trades), "bad appended rows"
+    assert len(os.listdir(target_path)) == 2, "every run should add one part"
+    assert vector.status.watermark == str(trades["time"].max()), "bad watermark"
+
+
 def prepare_feature_set(name: str, entity: str, data: pd.DataFrame, timestamp_key=None):
     df_source = mlrun.datastore.sources.DataFrameSource(data, entity, timestamp_key)
 
@@ -1,11 +1,22 @@
+import pytest
+
 from mlrun.feature_store.api import infer_from_static_df
-from mlrun.data_types import InferOptions
+from mlrun.data_types import InferOptions, StatsAccumulator
+from mlrun.data_types.infer import get_df_stats
 from tests.conftest import tests_root_directory
 import pandas as pd
 import mlrun.feature_store as fs
 
 this_dir = f"{tests_root_directory}/feature-store/"
 
+has_spark = False
+try:
+    import pyspark  # noqa
+
+    has_spark = True
+except ImportError:
+    pass
+
 expected_schema = [
     {"name": "bad", "value_type": "int"},
     {"name": "department", "value_type": "str"},
@@ -68,3 +79,101 @@ def test_infer_from_df():
         "max",
         "hist",
     ], "wrong stats result"
+
+
+def test_stats_accumulator():
+    df = pd.read_csv(this_dir + "testdata.csv")
+    stats = StatsAccumulator()
+    for start in range(0, len(df), 7):
+        stats.update(df.iloc[start : start + 7])
+    result = stats.to_dict()
+    expected = get_df_stats(df, InferOptions.Stats)
+
+    assert sorted(result.keys()) == sorted(expected.keys()), "missing stats columns"
+    for stat in ["count", "mean", "std", "min", "max"]:
+        assert result["movements"][stat] == pytest.approx(
+            expected["movements"][stat]
+        ), f"wrong merged {stat}"
+    assert result["department"]["count"] == expected["department"]["count"]
+
+
+def test_approximate_stats():
+    df = pd.read_csv(this_dir + "testdata.csv")
+    options = InferOptions.Stats + InferOptions.Histogram + InferOptions.Approximate
+    result = get_df_stats(df, options, sample_rows=len(df) // 2)
+    expected = get_df_stats(df, InferOptions.Stats + InferOptions.Histogram)
+
+    assert sorted(result.keys()) == sorted(expected.keys()), "missing stats columns"
+    for stat in ["count", "mean", "std", "min", "max"]:
+        assert result["movements"][stat] == pytest.approx(
+            expected["movements"][stat]
+        ), f"wrong exact {stat}"
+    hist, bins = result["movements"]["hist"]
+    assert bins == pytest.approx(expected["movements"]["hist"][1])
+    assert sum(hist) == pytest.approx(result["movements"]["count"], rel=0.1)
+    unique = result["department"]["unique"]
+    assert 1 <= unique <= result["department"]["count"]
+
+
+def test_stats_accumulator_sketches():
+    df = pd.read_csv(this_dir + "testdata.csv")
+    options = InferOptions.Stats + InferOptions.Histogram
+    half = len(df) // 2
+    stats = StatsAccumulator(options).update(df.iloc[:half])
+    # restore the stats of a previous run and merge them with new data
+    stats = StatsAccumulator.from_dict(stats.to_dict(), options)
+    result = stats.update(df.iloc[half:]).to_dict()
+    expected = get_df_stats(df, options)
+
+    for stat in ["count", "mean", "std", "min", "max"]:
+        assert result["movements"][stat] == pytest.approx(
+            expected["movements"][stat]
+        ), f"wrong merged {stat}"
+    hist, bins = result["movements"]["hist"]
+    assert sum(hist) == expected["movements"]["count"]
+    assert bins == pytest.approx(expected["movements"]["hist"][1])
+    assert result["department"]["unique"] == expected["department"]["unique"]
+
+
+@pytest.mark.skipif(not has_spark, reason="missing pyspark")
+def test_spark_stats():
+    from pyspark.sql import SparkSession
+
+    from mlrun.data_types.spark import get_df_stats_spark
+
+    # a constant column and a null only column
+    rows = [(1.0, 5, None), (2.0, 5, None), (3.0, 5, None), (4.0, 5, None)]
+    df = pd.DataFrame(rows, columns=["value", "constant", "nulls"])
+    df = df.astype({"nulls": float})
+    options = InferOptions.Stats + InferOptions.Histogram
+    expected = get_df_stats(df, options)
+
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    spark_df = spark.createDataFrame(rows, "value double, constant long, nulls double")
+    result = get_df_stats_spark(spark_df, options)
+
+    assert sorted(result.keys()) == sorted(expected.keys()), "missing stats columns"
+    for column, stats in result.items():
+        # spark names the sample standard deviation stddev
+        stats = {
+            "std" if stat == "stddev" else stat: val for stat, val in stats.items()
+        }
+        assert sorted(stats.keys()) == sorted(
+            expected[column].keys()
+        ), f"different {column} stats"
+        for stat, val in stats.items():
+            if stat == "hist":
+                assert val[0] == expected[column]["hist"][0], f"bad {column} hist"
+                # spark histograms keep the bins left edges (rounded)
+                edges = expected[column]["hist"][1][:-1]
+                assert val[1] == pytest.approx(edges, abs=0.01), f"bad {column} bins"
+            else:
+                assert val == pytest.approx(
+                    expected[column][stat]
+                ), f"bad {column} {stat}"
+
+    # NaN values are skipped like nulls
+    nan_df = spark.createDataFrame([(1.0,), (float("nan"),), (3.0,)], "value double")
+    stats = get_df_stats_spark(nan_df, options)["value"]
+    assert stats["count"] == 2 and stats["max"] == 3.0, "NaN was not skipped"
+    assert sum(stats["hist"][0]) == 2, "NaN was binned"
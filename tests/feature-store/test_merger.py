@@ -0,0 +1,249 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import time
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+import pytest
+from data_sample import quotes, stocks, trades
+
+from mlrun.feature_store import FeatureSet, Entity
+from mlrun.feature_store.retrieval import LocalFeatureMerger
+from mlrun.model import DataTarget
+from mlrun.utils import logger
+
+has_dask = False
+try:
+    import dask  # noqa
+
+    has_dask = True
+except ImportError:
+    pass
+
+has_spark = False
+try:
+    import pyspark  # noqa
+
+    has_spark = True
+except ImportError:
+    pass
+
+# the many feature sets merge benchmark is opt-in (e.g. MLRUN_BENCHMARK=1)
+run_benchmarks = bool(os.environ.get("MLRUN_BENCHMARK"))
+
+
+def _time_column(rows, seed):
+    times = pd.date_range("2021-01-01", periods=rows, freq="S")
+    # unsorted string times, as read from a csv file
+    return np.random.RandomState(seed).permutation(times.astype(str))
+
+
+def _naive_asof_merge(entity_df, featuresets, featureset_dfs):
+    # reference merge, which re-parses and re-sorts the frames on every join
+    merged_df = entity_df.copy()
+    for featureset, featureset_df in zip(featuresets, featureset_dfs):
+        featureset_df = featureset_df.copy()
+        merged_df["time"] = pd.to_datetime(merged_df["time"])
+        featureset_df["time"] = pd.to_datetime(featureset_df["time"])
+        merged_df = pd.merge_asof(
+            merged_df.sort_values(by="time"),
+            featureset_df.sort_values(by="time"),
+            left_on="time",
+            right_on="time",
+            by="key",
+        )
+    return merged_df
+
+
+def _many_featuresets(entity_rows, featuresets_count):
+    entity_df = pd.DataFrame(
+        {"key": np.arange(entity_rows) % 100, "time": _time_column(entity_rows, 0)}
+    )
+    featuresets = []
+    featureset_dfs = []
+    for i in range(featuresets_count):
+        featuresets.append(
+            FeatureSet(f"set{i}", entities=[Entity("key")], timestamp_key="time")
+        )
+        featureset_dfs.append(
+            pd.DataFrame(
+                {
+                    "key": np.arange(entity_rows) % 100,
+                    "time": _time_column(entity_rows, i + 1),
+                    f"feature{i}": np.arange(entity_rows),
+                }
+            )
+        )
+    return entity_df, featuresets, featureset_dfs
+
+
+def test_asof_merge_many_featuresets():
+    entity_df, featuresets, featureset_dfs = _many_featuresets(1000, 5)
+    expected = _naive_asof_merge(entity_df, featuresets, featureset_dfs)
+    merger = LocalFeatureMerger(None)
+    merger.merge(entity_df, "time", featuresets, featureset_dfs)
+
+    result = merger.get_df()
+    assert entity_df["time"].dtype == object, "entity rows were modified"
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+
+@pytest.mark.skipif(not run_benchmarks, reason="benchmarks are not enabled")
+def test_asof_merge_many_featuresets_benchmark():
+    entity_df, featuresets, featureset_dfs = _many_featuresets(100000, 30)
+    start = time.monotonic()
+    expected = _naive_asof_merge(entity_df, featuresets, featureset_dfs)
+    naive_time = time.monotonic() - start
+
+    merger = LocalFeatureMerger(None)
+    start = time.monotonic()
+    merger.merge(entity_df, "time", featuresets, featureset_dfs)
+    merge_time = time.monotonic() - start
+    logger.info(
+        f"merge of {len(featuresets)} feature sets, naive: {naive_time:.2f}s,"
+        f" sort once: {merge_time:.2f}s"
+    )
+    pd.testing.assert_frame_equal(merger.get_df(), expected.reset_index(drop=True))
+    assert merge_time < naive_time, "the merge is slower than the naive merge"
+
+
+class _InMemoryMerger(LocalFeatureMerger):
+    """merger of in memory feature set dataframes, counts the feature set loads"""
+
+    def __init__(self, featureset_dfs):
+        super().__init__(None)
+        self.featureset_dfs = featureset_dfs
+        self.loaded_entity_dfs = []
+
+    def _load_featureset_dfs(self, featuresets, columns_list, entity_df=None, *args):
+        self.loaded_entity_dfs.append(entity_df)
+        return [self.featureset_dfs[fs.metadata.name] for fs in featuresets]
+
+
+def test_chunked_merge():
+    quotes_set = FeatureSet("quotes", entities=[Entity("ticker")], timestamp_key="time")
+    stocks_set = FeatureSet("stocks", entities=[Entity("ticker")])
+    featuresets = [quotes_set, stocks_set]
+    merger = _InMemoryMerger({"quotes": quotes, "stocks": stocks})
+    merger.merge(trades, "time", list(featuresets), [quotes, stocks])
+    expected = merger.get_df()
+
+    sort_by = ["ticker", "time", "price", "quantity"]
+    expected = expected.sort_values(by=sort_by, ignore_index=True)
+    # the entity rows can be a dataframe or an iterator of dataframes
+    for entity_rows in [trades, iter([trades.iloc[:3], trades.iloc[3:]])]:
+        merger.loaded_entity_dfs = []
+        chunks = list(
+            merger._merge_chunks(
+                entity_rows, "time", featuresets, [[], []], chunk_size=2
+            )
+        )
+        assert len(chunks) == 3, "bad number of chunks"
+        # the feature sets are loaded per chunk (for the chunk entity rows)
+        assert len(merger.loaded_entity_dfs) == 3, "bad number of loads"
+        assert all(len(df) <= 2 for df in merger.loaded_entity_dfs), "bad chunk"
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks).sort_values(by=sort_by, ignore_index=True), expected,
+        )
+
+
+def test_load_featureset_pushdown():
+    quotes_set = FeatureSet("quotes", entities=[Entity("ticker")], timestamp_key="time")
+    # the first two trades are of MSFT, until 13:30:00.038
+    entity_df = trades.iloc[:2]
+    columns = [("bid", None), ("ask", "ask_price")]
+    with TemporaryDirectory() as tmpdir:
+        quotes.to_parquet(f"{tmpdir}/quotes.parquet")
+        quotes_set.status.update_target(
+            DataTarget("parquet", "parquet", f"{tmpdir}/quotes.parquet")
+        )
+        merger = LocalFeatureMerger(None)
+        df = merger._load_featureset_df(quotes_set, columns, entity_df, "time")
+
+    assert df["ticker"].unique().tolist() == ["MSFT"], "other keys were read"
+    assert (
+        pd.to_datetime(df["time"]).max() <= entity_df["time"].max()
+    ), "rows newer than the entity rows were read"
+    assert len(df) == 2, "bad number of rows"
+    assert "ask_price" in df.columns, "alias was not applied"
+
+    merger.merge(entity_df, "time", [quotes_set], [df])
+    result = merger.get_df()
+    merger.merge(
+        entity_df,
+        "time",
+        [quotes_set],
+        [quotes[["ticker", "time", "bid", "ask"]].rename(columns={"ask": "ask_price"})],
+    )
+    pd.testing.assert_frame_equal(result, merger.get_df())
+
+
+@pytest.mark.skipif(not has_spark, reason="missing pyspark")
+def test_spark_asof_merge():
+    from pyspark.sql import SparkSession
+
+    from mlrun.feature_store.retrieval.spark_merger import SparkFeatureMerger
+
+    quotes_set = FeatureSet("quotes", entities=[Entity("ticker")], timestamp_key="time")
+    expected_merger = LocalFeatureMerger(None)
+    expected_merger.merge(trades, "time", [quotes_set], [quotes])
+    expected = expected_merger.get_df()
+
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    merger = SparkFeatureMerger(None, engine_args={"spark": spark})
+    merger.merge(
+        spark.createDataFrame(trades),
+        "time",
+        [quotes_set],
+        [spark.createDataFrame(quotes)],
+    )
+    result = merger.get_df().toPandas()
+
+    sort_by = ["ticker", "time", "price", "quantity"]
+    pd.testing.assert_frame_equal(
+        result[expected.columns].sort_values(by=sort_by, ignore_index=True),
+        expected.sort_values(by=sort_by, ignore_index=True),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.skipif(not has_dask, reason="missing dask")
+def test_dask_merge():
+    import dask.dataframe as dd
+
+    from mlrun.feature_store.retrieval.dask_merger import DaskFeatureMerger
+
+    quotes_set = FeatureSet("quotes", entities=[Entity("ticker")], timestamp_key="time")
+    stocks_set = FeatureSet("stocks", entities=[Entity("ticker")])
+    expected_merger = LocalFeatureMerger(None)
+    expected_merger.merge(trades, "time", [quotes_set, stocks_set], [quotes, stocks])
+    expected = expected_merger.get_df()
+
+    merger = DaskFeatureMerger(None)
+    merger.merge(
+        dd.from_pandas(trades, npartitions=2),
+        "time",
+        [quotes_set, stocks_set],
+        [dd.from_pandas(quotes, npartitions=2), dd.from_pandas(stocks, npartitions=2)],
+    )
+    result = merger.get_df().compute()
+
+    sort_by = ["ticker", "time", "price", "quantity"]
+    pd.testing.assert_frame_equal(
+        result[expected.columns].sort_values(by=sort_by, ignore_index=True),
+        expected.sort_values(by=sort_by, ignore_index=True),
+        check_dtype=False,
+    )
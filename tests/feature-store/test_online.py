@@ -0,0 +1,228 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import functools
+import threading
+import time
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+
+from data_sample import stocks
+
+from mlrun.datastore.targets import SQLiteTarget
+from mlrun.datastore.v3io import V3ioKVReader
+from mlrun.feature_store import Entity, FeatureSet, FeatureVector
+from mlrun.feature_store.feature_vector import OnlineVectorService
+from mlrun.feature_store.retrieval.online import (
+    BatchKeyReader,
+    FeatureCache,
+    init_feature_vector_graph,
+)
+from mlrun.model import DataTarget
+
+
+def _sqlite_featureset(name, path, df=None):
+    featureset = FeatureSet(name, entities=[Entity("ticker")])
+    if df is not None:
+        target = SQLiteTarget("sqlite", path=path)
+        target.set_resource(featureset)
+        target.write_dataframe(df)
+    featureset.status.update_target(DataTarget("sqlite", "sqlite", path))
+    return featureset
+
+
+def test_feature_cache():
+    cache = FeatureCache(max_entries=2)
+    cache.set("a", {"x": 1})
+    cache.set("b", {"x": 2})
+    assert cache.get("a") == {"x": 1}, "cached item was not returned"
+    cache.set("c", {"x": 3})
+    assert cache.get("b") is None, "least recently used key was not evicted"
+    assert cache.get("a") == {"x": 1}, "recently used key was evicted"
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 2}
+
+    cache = FeatureCache(ttl=0.1)
+    cache.set("a", {})
+    assert cache.get("a") == {}, "missing keys should be cached"
+    time.sleep(0.2)
+    assert cache.get("a") is None, "expired item was returned"
+
+
+def test_batch_key_reader():
+    with TemporaryDirectory() as tmpdir:
+        stocks_set = _sqlite_featureset("stocks", f"{tmpdir}/stocks.db", stocks)
+        reader = BatchKeyReader(
+            {"stocks": stocks_set},
+            {"stocks": [("name", None), ("exchange", "market")]},
+            cache_ttl=10,
+        )
+        rows = [
+            {"ticker": "AAPL"},
+            {"ticker": "IBM"},
+            {"ticker": "MSFT"},
+            {"ticker": "AAPL"},
+        ]
+        results = reader.get(rows)
+        assert [row["ticker"] for row in results] == [
+            row["ticker"] for row in rows
+        ], "results are not in the input order"
+        assert results[0] == {
+            "ticker": "AAPL",
+            "name": "Apple Inc",
+            "market": "NASDAQ",
+        }, "bad features"
+        assert results[2]["name"] == "Microsoft Corporation", "bad features"
+        assert results[1] == {"ticker": "IBM"}, "missing key should not add features"
+        assert results[3] == results[0], "duplicate key got different features"
+
+        # the second read is served from the cache (missing keys are cached too)
+        assert asyncio.run(reader.aget(rows)) == results, "async results differ"
+        assert reader.cache_stats() == {
+            "stocks": {"hits": 3, "misses": 3, "entries": 3}
+        }
+        reader.close()
+
+
+def test_batch_reads_supported():
+    vector = FeatureVector("vector", ["stocks.*"])
+    stocks_set = _sqlite_featureset("stocks", "stocks.db")
+    objects = {"stocks": stocks_set}
+    fields = {"stocks": [("price_avg_1h", None)]}
+    assert BatchKeyReader.is_supported(
+        vector, objects, fields
+    ), "a feature named like an aggregation is not an aggregation"
+
+    stocks_set.add_aggregation("price", "price", ["avg"], ["1h"])
+    assert not BatchKeyReader.is_supported(
+        vector, objects, fields
+    ), "aggregation features should not use batch reads"
+
+    # aggregation states which were added to the graph directly
+    quotes_set = _sqlite_featureset("quotes", "quotes.db")
+    quotes_set.graph.add_step(
+        "storey.AggregateByKey",
+        "aggr",
+        aggregates=[
+            {"name": "asks", "column": "ask", "operations": ["sum"], "windows": ["5h"]}
+        ],
+        table=".",
+    )
+    objects = {"quotes": quotes_set}
+    assert BatchKeyReader.is_supported(vector, objects, {"quotes": [("ask", None)]})
+    assert not BatchKeyReader.is_supported(
+        vector, objects, {"quotes": [("asks_sum_5h", None)]}
+    ), "aggregation features should not use batch reads"
+
+    # feature sets without an online target (with key reads)
+    quotes_set.status.update_target(DataTarget("parquet", "sqlite", "quotes.pq"))
+    assert not BatchKeyReader.is_supported(
+        vector, objects, {"quotes": [("ask", None)]}
+    ), "online target without key reads"
+
+
+def test_online_service_aget():
+    with TemporaryDirectory() as tmpdir:
+        stocks_set = _sqlite_featureset("stocks", f"{tmpdir}/stocks.db", stocks)
+        vector = FeatureVector("stocks-vec", ["stocks.name"])
+        graph_factory = functools.partial(
+            init_feature_vector_graph,
+            vector,
+            {"stocks": stocks_set},
+            {"stocks": [("name", None)]},
+        )
+        service = OnlineVectorService(vector, graph_factory)
+        rows = [[{"ticker": ticker}] for ticker in stocks["ticker"]]
+
+        async def get_concurrently():
+            async with service:
+                threads = threading.active_count()
+                results = await asyncio.gather(*[service.aget(row) for row in rows])
+                # the async flow runs in the event loop (not in a thread)
+                assert threading.active_count() == threads, "flow thread started"
+                return results
+
+        results = asyncio.run(get_concurrently())
+        assert results == [
+            [{"ticker": ticker, "name": name}]
+            for ticker, name in zip(stocks["ticker"], stocks["name"])
+        ], "bad results"
+
+
+def test_online_service_batch_aget():
+    with TemporaryDirectory() as tmpdir:
+        stocks_set = _sqlite_featureset("stocks", f"{tmpdir}/stocks.db", stocks)
+        reader = BatchKeyReader({"stocks": stocks_set}, {"stocks": [("name", None)]})
+        service = OnlineVectorService(None, None, reader)
+
+        rows = [[{"ticker": ticker}] for ticker in stocks["ticker"]]
+
+        async def get_concurrently():
+            async with service:
+                return await asyncio.gather(*[service.aget(row) for row in rows])
+
+        results = asyncio.run(get_concurrently())
+        assert results == [
+            [{"ticker": ticker, "name": name}]
+            for ticker, name in zip(stocks["ticker"], stocks["name"])
+        ], "bad results"
+
+
+class _KVClient:
+    """fake v3io kv client, tracks the number of concurrent key reads"""
+
+    def __init__(self, items):
+        self.items = items
+        self.reading = 0
+        self.max_reading = 0
+        self._lock = threading.Lock()
+
+    def _response(self, key):
+        item = self.items.get(key)
+        return SimpleNamespace(
+            status_code=200 if item else 404, output=SimpleNamespace(item=item)
+        )
+
+    def get(self, key, **kwargs):
+        with self._lock:
+            self.reading += 1
+            self.max_reading = max(self.max_reading, self.reading)
+        time.sleep(0.1)
+        with self._lock:
+            self.reading -= 1
+        return self._response(key)
+
+    async def aget(self, key, **kwargs):
+        self.reading += 1
+        self.max_reading = max(self.max_reading, self.reading)
+        await asyncio.sleep(0.1)
+        self.reading -= 1
+        return self._response(key)
+
+
+def test_v3io_kv_reader_concurrency(monkeypatch):
+    monkeypatch.setenv("V3IO_ACCESS_KEY", "some-key")
+    items = {str(i): {"x": i} for i in range(8)}
+    keys = list(items.keys()) + ["missing"]
+    reader = V3ioKVReader("v3io://webapi.example.com/bigdata/stocks")
+
+    client = _KVClient(items)
+    reader._client = SimpleNamespace(kv=SimpleNamespace(get=client.get))
+    assert reader.get(keys, ["x"]) == items, "bad sync results"
+    assert client.max_reading == len(keys), "the keys were not read concurrently"
+
+    client = _KVClient(items)
+    reader._async_client = SimpleNamespace(kv=SimpleNamespace(get=client.aget))
+    assert asyncio.run(reader.aget(keys, ["x"])) == items, "bad async results"
+    assert client.max_reading == len(keys), "the keys were not read concurrently"
+    reader._executor.shutdown()
@@ -0,0 +1,82 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pandas as pd
+
+from mlrun.feature_store import Entity, FeatureSet
+from mlrun.feature_store.ingestion import run_pandas_graph
+from mlrun.feature_store.steps import Imputer, MapValues, OneHotEncoder
+
+df = pd.DataFrame(
+    {
+        "age": [5, 17, 30, 70, 45],
+        "department": ["IT", "RD", "IT", "Sales", "RD"],
+        "score": [1.5, None, 3.0, None, 0.5],
+    },
+    index=pd.Index(["a", "b", "c", "d", "e"], name="key"),
+)
+
+
+def _do_per_event(step, df):
+    rows = [step.do(row) for row in df.to_dict(orient="records")]
+    return pd.DataFrame(rows, index=df.index)
+
+
+def test_map_values_df():
+    step = MapValues(
+        mapping={
+            "age": {
+                "ranges": [
+                    {"range": [0, 18], "value": "child"},
+                    {"range": [18, 65], "value": "adult"},
+                ]
+            },
+            "department": {"IT": "tech", "RD": "tech"},
+        },
+        with_original_features=True,
+    )
+    pd.testing.assert_frame_equal(step.do_df(df), _do_per_event(step, df))
+
+
+def test_imputer_df():
+    step = Imputer(mapping={"score": 0.0})
+    expected = df.assign(score=[1.5, 0.0, 3.0, 0.0, 0.5])
+    pd.testing.assert_frame_equal(step.do_df(df), expected)
+    pd.testing.assert_frame_equal(step.do_df(df), _do_per_event(step, df))
+
+    # None and NaN values are imputed in object columns too, NaT is not
+    missing_df = df.assign(
+        department=["IT", None, "IT", float("nan"), "RD"],
+        time=[pd.Timestamp("2021-01-01"), pd.NaT, None, None, None],
+    )
+    step = Imputer(mapping={"department": "x", "time": pd.Timestamp("2021-01-02")})
+    result = step.do_df(missing_df)
+    assert result["department"].tolist() == ["IT", "x", "IT", "x", "RD"]
+    assert result["time"].isna().sum() == 4, "NaT values should not be imputed"
+    pd.testing.assert_frame_equal(result, _do_per_event(step, missing_df))
+
+
+def test_one_hot_encoder_df():
+    step = OneHotEncoder(mapping={"department": ["IT", "RD", "Sales"]})
+    pd.testing.assert_frame_equal(step.do_df(df), _do_per_event(step, df))
+
+
+def test_pandas_engine():
+    featureset = FeatureSet("scores", entities=[Entity("key")], engine="pandas")
+    featureset.graph.to("storey.Extend", _fn="({'age2': event['age'] * 2})").to(
+        "storey.Filter", "filter", _fn="(event['age'] > 10)"
+    ).to("mlrun.feature_store.steps.Imputer", mapping={"score": 0.0})
+
+    result = run_pandas_graph(df, featureset, namespace=globals())
+    expected = df.assign(age2=df["age"] * 2, score=df["score"].fillna(0.0))
+    pd.testing.assert_frame_equal(result, expected[df["age"] > 10], check_like=True)
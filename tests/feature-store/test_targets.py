@@ -0,0 +1,141 @@
+# Copyright 2018 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+from tempfile import TemporaryDirectory
+
+import pytest
+from data_sample import quotes, stocks
+
+import mlrun.errors
+
+from mlrun.datastore.targets import (
+    CSVTarget,
+    ParquetTarget,
+    SQLiteTarget,
+    get_target_driver,
+)
+from mlrun.datastore.sqlitekv import SQLiteKV
+from mlrun.datastore.utils import time_partition_filters
+from mlrun.feature_store import FeatureSet, Entity
+
+
+def test_partitioned_parquet_target():
+    quotes_set = FeatureSet("quotes", entities=[Entity("ticker")], timestamp_key="time")
+    with TemporaryDirectory() as tmpdir:
+        target = ParquetTarget(
+            "pq",
+            path=f"{tmpdir}/quotes/",
+            key_bucketing_number=4,
+            time_partitioning_granularity="hour",
+        )
+        target.set_resource(quotes_set)
+        target.write_dataframe(quotes)
+        status = target.update_resource_status("ready")
+        assert status.is_dir, "partitioned target should be a directory"
+        assert status.time_partitioning_granularity == "hour", "scheme not recorded"
+
+        # reader is created from the status, and uses the recorded scheme
+        reader = get_target_driver(status, quotes_set)
+        df = reader.as_df(filters=[("ticker", "in", ["GOOG"])])
+        assert len(df) == 3, "bad key filtered result"
+        assert "year" not in df.columns, "partition columns were not dropped"
+        assert "key_bucket" not in df.columns, "partition columns were not dropped"
+
+        df = reader.as_df(end_time="2016-05-25 13:30:00.030")
+        assert len(df) == 3, "bad time filtered result"
+
+        df = reader.as_df(
+            start_time="2016-05-25 13:30:00.040", end_time="2016-05-25 13:30:00.050"
+        )
+        assert len(df) == 3, "bad time range filtered result"
+
+
+def test_time_partition_filters():
+    assert time_partition_filters("hour", "2021-03-05 10:00", "2021-03-05 12:30") == [
+        ("year", "=", 2021),
+        ("month", "=", 3),
+        ("day", "=", 5),
+        ("hour", ">=", 10),
+        ("hour", "<=", 12),
+    ]
+    assert time_partition_filters("day", "2021-03-05 10:00", "2021-03-05 12:30") == [
+        ("year", "=", 2021),
+        ("month", "=", 3),
+        ("day", "=", 5),
+    ]
+    assert time_partition_filters("hour", "2020-12-30", "2021-01-02") == [
+        ("year", ">=", 2020),
+        ("year", "<=", 2021),
+    ]
+    assert time_partition_filters("month", start_time="2021-03-05") == [
+        ("year", ">=", 2021)
+    ]
+
+
+def test_append_dataframe():
+    with TemporaryDirectory() as tmpdir:
+        for target in [
+            ParquetTarget("pq", path=f"{tmpdir}/quotes/"),
+            CSVTarget("csv", path=f"{tmpdir}/quotes.csv"),
+        ]:
+            target.write_dataframe(quotes.iloc[:4], index=False)
+            target.write_dataframe(quotes.iloc[4:], append=True, index=False)
+            df = target.as_df()
+            assert len(df) == len(quotes), f"{target.kind} rows were not appended"
+
+        # every parquet append adds a part file (existing parts are not rewritten)
+        assert len(os.listdir(f"{tmpdir}/quotes")) == 2, "bad number of parts"
+
+
+def test_append_parquet_file():
+    with TemporaryDirectory() as tmpdir:
+        target = ParquetTarget("pq", path=f"{tmpdir}/quotes.parquet")
+        target.write_dataframe(quotes.iloc[:4], index=False)
+        with pytest.raises(mlrun.errors.MLRunInvalidArgumentError):
+            target.write_dataframe(quotes.iloc[4:], append=True, index=False)
+        assert len(target.as_df()) == 4, "existing target was modified"
+
+        # incremental writes to a new target create a directory of parts
+        target = ParquetTarget("pq", path=f"{tmpdir}/new.parquet")
+        target.write_dataframe(quotes.iloc[:4], append=True, index=False)
+        target.write_dataframe(quotes.iloc[4:], append=True, index=False)
+        assert len(target.as_df()) == len(quotes), "rows were not appended"
+
+
+def test_sqlite_target():
+    stocks_set = FeatureSet("stocks", entities=[Entity("ticker")])
+    with TemporaryDirectory() as tmpdir:
+        target = SQLiteTarget("sqlite", path=f"{tmpdir}/stocks.db")
+        target.set_resource(stocks_set)
+        target.write_dataframe(stocks)
+        target.write_dataframe(stocks.assign(name="x").iloc[:1])
+
+        df = target.as_df()
+        assert len(df) == len(stocks), "bad number of keys"
+        names = df.set_index("ticker")["name"]
+        assert names[stocks["ticker"][0]] == "x", "key was not updated"
+        assert names[stocks["ticker"][1]] == stocks["name"][1], "bad value"
+
+
+def test_sqlite_kv_key_types():
+    with TemporaryDirectory() as tmpdir:
+        kv = SQLiteKV(f"{tmpdir}/kv.db")
+        kv.upsert({1: {"x": "int"}, "1": {"x": "str"}})
+        kv.upsert({1: {"y": 2}})
+        assert kv.get([1, "1", 2]) == {
+            1: {"x": "int", "y": 2},
+            "1": {"x": "str"},
+        }, "keys of different types should not collide"
+        assert dict(kv.items()) == {1: {"x": "int", "y": 2}, "1": {"x": "str"}}
+        kv.close()
@@ -11,19 +11,39 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import io
 from os import listdir
 from tempfile import TemporaryDirectory
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pandas as pd
 import pytest
 
 import mlrun
 import mlrun.errors
+from mlrun.artifacts.base import Artifact, DirArtifact, upload_extra_data
+from mlrun.datastore.base import DataStore, FileStats, RangeReader, get_range
+from mlrun.datastore.cache import get_data_cache
 from tests.conftest import rundb_path
 
 mlrun.mlconf.dbpath = rundb_path
 
+has_boto3 = False
+try:
+    import boto3  # noqa
+
+    has_boto3 = True
+except ImportError:
+    pass
+
+has_azure = False
+try:
+    import azure.storage.blob  # noqa
+
+    has_azure = True
+except ImportError:
+    pass
+
 raw_data = {
     "name": ["Jason", "Molly", "Tina", "Jake", "Amy"],
     "age": [42, 52, 36, 24, 73],
@@ -218,3 +238,286 @@ def test_fsspec():
         assert len(files) == 2, "2 test files were not written"
         assert files[0].endswith("x.txt"), "wrong file name"
         assert fs.open(tmpdir + "/1x.txt", "r").read() == "123", "wrong file content"
+
+
+def test_as_df_filters():
+    times_df = pd.DataFrame(
+        {
+            "name": ["Jason", "Molly", "Tina", "Jake", "Amy"],
+            "time": pd.date_range("2021-01-01", periods=5, freq="D"),
+            "age": [42, 52, 36, 24, 73],
+        }
+    )
+    with TemporaryDirectory() as tmpdir:
+        for suffix in [".parquet", ".csv"]:
+            path = f"{tmpdir}/times{suffix}"
+            if suffix == ".csv":
+                times_df.to_csv(path, index=False)
+            else:
+                times_df.to_parquet(path)
+            item = mlrun.get_dataitem(path)
+
+            result = item.as_df(
+                start_time="2021-01-02", end_time="2021-01-04", time_column="time"
+            )
+            assert list(result["name"]) == ["Molly", "Tina", "Jake"], "bad time filter"
+
+            result = item.as_df(
+                columns=["age"], filters=[("name", "in", ["Amy", "Tina"])]
+            )
+            assert list(result.columns) == ["age"], "filter column was not dropped"
+            assert list(result["age"]) == [36, 73], "bad key filter"
+
+
+def test_as_df_iter():
+    with TemporaryDirectory() as tmpdir:
+        paths = [f"{tmpdir}/df.csv", f"{tmpdir}/df.parquet", f"{tmpdir}/df.jsonl"]
+        df.to_csv(paths[0], index=False)
+        df.to_parquet(paths[1])
+        df.to_json(paths[2], orient="records", lines=True)
+        for path in paths:
+            chunks = list(mlrun.get_dataitem(path).as_df_iter(2, columns=["age"]))
+            assert [len(chunk) for chunk in chunks] == [2, 2, 1], "bad chunks"
+            assert list(pd.concat(chunks).columns) == ["age"], "bad chunk columns"
+            assert pd.concat(chunks)["age"].tolist() == raw_data["age"]
+
+        # stores without a filesystem stream the objects with ranged gets
+        store, _ = mlrun.store_manager.get_or_create_store(paths[1])
+        size = store.stat(paths[1]).size
+        with io.BufferedReader(RangeReader(store, paths[1], size), 64) as fp:
+            assert pd.read_parquet(fp).equals(df), "bad ranged read"
+
+
+def test_data_cache():
+    with TemporaryDirectory() as tmpdir:
+        old_cache = mlrun.mlconf.data_cache.to_dict()
+        mlrun.mlconf.data_cache.path = tmpdir
+        mlrun.mlconf.data_cache.max_size = 10
+        try:
+            mlrun.datastore.set_in_memory_item("cached.txt", "123456")
+            path = mlrun.get_dataitem("memory://cached.txt").local()
+            assert path.startswith(tmpdir) and path.endswith(".txt"), "not cached"
+            assert mlrun.get_dataitem("memory://cached.txt").local() == path
+            local_path = mlrun.get_dataitem("memory://cached.txt").local(".bin")
+            assert local_path.endswith(".bin"), "suffix was not kept"
+
+            # modified objects are downloaded again
+            mlrun.datastore.set_in_memory_item("cached.txt", "1234567")
+            new_path = mlrun.get_dataitem("memory://cached.txt").local()
+            assert new_path != path, "modified object not downloaded"
+            with open(new_path) as fp:
+                assert fp.read() == "1234567", "bad cached content"
+
+            stats = get_data_cache().stats()
+            assert stats["hits"] == 1 and stats["misses"] == 3, "bad cache stats"
+            assert stats["evictions"] == 2, "lru entries not evicted"
+            assert stats["size"] == 7, "bad cache size"
+        finally:
+            mlrun.mlconf.data_cache = old_cache
+
+
+class _PrefixedStore(DataStore):
+    """store of in memory objects, the keys include the store subpath"""
+
+    def __init__(self, objects):
+        super().__init__(None, "prefixed", "prefixed")
+        self.subpath = "/prefix"
+        self.objects = objects
+
+    def get(self, key, size=None, offset=0):
+        return self.objects[key]
+
+    def stat(self, key):
+        return FileStats(len(self.objects[key]), 1)
+
+
+def test_data_cache_prefixed_store():
+    with TemporaryDirectory() as tmpdir:
+        old_cache = mlrun.mlconf.data_cache.to_dict()
+        mlrun.mlconf.data_cache.path = tmpdir
+        try:
+            store = _PrefixedStore({"/prefix/data.csv": "x,y\n1,2\n"})
+            df = store.as_df("prefixed://prefix/data.csv", "data.csv")
+            assert df.to_dict(orient="list") == {"x": [1], "y": [2]}, "bad df"
+            assert get_data_cache().stats()["misses"] == 1, "object not cached"
+        finally:
+            mlrun.mlconf.data_cache = old_cache
+
+
+def test_download_parts():
+    assert get_range(10, 0) == "bytes=0-9", "bad range end"
+    old_transfer = mlrun.mlconf.data_transfer.to_dict()
+    mlrun.mlconf.data_transfer.part_size = 3
+    try:
+        with TemporaryDirectory() as tmpdir:
+            with open(f"{tmpdir}/src.txt", "w") as fp:
+                fp.write("0123456789")
+            store, _ = mlrun.store_manager.get_or_create_store(f"{tmpdir}/src.txt")
+            store._download_parts(f"{tmpdir}/src.txt", f"{tmpdir}/dst.txt", 10)
+            with open(f"{tmpdir}/dst.txt") as fp:
+                assert fp.read() == "0123456789", "bad parallel download"
+    finally:
+        mlrun.mlconf.data_transfer = old_transfer
+
+
+def test_file_store_view_and_copy():
+    with TemporaryDirectory() as tmpdir:
+        with open(f"{tmpdir}/src.txt", "w") as fp:
+            fp.write("0123456789")
+        item = mlrun.get_dataitem(f"{tmpdir}/src.txt")
+        view = item.store.get_view(item._path, 4, 2)
+        assert isinstance(view, memoryview) and bytes(view) == b"2345", "bad view"
+        assert bytes(item.store.get_view(item._path, offset=20)) == b""
+
+        item.download(f"{tmpdir}/dst.txt")
+        mlrun.get_dataitem(f"{tmpdir}/sub/up.txt").upload(f"{tmpdir}/dst.txt")
+        with open(f"{tmpdir}/sub/up.txt") as fp:
+            assert fp.read() == "0123456789", "bad local copy"
+
+
+def test_bulk_operations():
+    with TemporaryDirectory() as tmpdir:
+        urls = [f"{tmpdir}/src/f{i}.txt" for i in range(5)]
+        mlrun.store_manager.put_many({url: f"data{i}" for i, url in enumerate(urls)})
+        assert mlrun.store_manager.get_many(urls) == [
+            f"data{i}".encode() for i in range(5)
+        ], "bad bulk get"
+
+        uploaded = mlrun.store_manager.upload_dir(f"{tmpdir}/src", f"{tmpdir}/dst")
+        assert sorted(uploaded) == [url.replace("/src/", "/dst/") for url in urls]
+
+        downloaded = mlrun.store_manager.download_dir(f"{tmpdir}/dst", f"{tmpdir}/out")
+        assert sorted(listdir(f"{tmpdir}/out")) == [f"f{i}.txt" for i in range(5)]
+        assert len(downloaded) == 5, "bad bulk download"
+
+
+def test_bulk_partial_failure():
+    with TemporaryDirectory() as tmpdir:
+        with open(f"{tmpdir}/file", "w") as fp:
+            fp.write("x")
+        items = {f"{tmpdir}/ok{i}.txt": f"data{i}" for i in range(3)}
+        # the object parent is a file, so the write fails
+        items[f"{tmpdir}/file/bad.txt"] = "data"
+        with pytest.raises(OSError):
+            mlrun.store_manager.put_many(items)
+        assert sorted(listdir(tmpdir)) == [
+            "file",
+            "ok0.txt",
+            "ok1.txt",
+            "ok2.txt",
+        ], "the other objects were not written"
+
+
+def test_artifact_bulk_uploads():
+    store_manager = mlrun.store_manager
+    with TemporaryDirectory() as tmpdir:
+        mlrun.store_manager.put_many(
+            {f"{tmpdir}/src/{name}": name for name in ["a.txt", "b.txt"]}
+        )
+
+        artifact = Artifact("model", target_path=f"{tmpdir}/model")
+        artifact.src_path = f"{tmpdir}/src"
+        with patch.object(
+            store_manager, "upload_many", wraps=store_manager.upload_many
+        ) as upload_many:
+            upload_extra_data(
+                artifact, {"a": "a.txt", "b": "b.txt", "c": b"c"}, update_spec=True
+            )
+        assert upload_many.call_count == 1, "extra data files were not bulk uploaded"
+        assert sorted(listdir(f"{tmpdir}/model")) == ["a.txt", "b.txt", "c"]
+        assert artifact.extra_data == {
+            "a": "a.txt",
+            "b": "b.txt",
+            "c": f"{tmpdir}/model/c",
+        }, "bad extra data spec"
+
+        # missing files fail before any object is uploaded
+        artifact.target_path = f"{tmpdir}/other"
+        with pytest.raises(ValueError):
+            upload_extra_data(artifact, {"a": "a.txt", "x": "x.txt", "c": b"c"})
+        assert "other" not in listdir(tmpdir), "objects were uploaded"
+
+        artifact = DirArtifact("dir", target_path=f"{tmpdir}/dir")
+        artifact.src_path = f"{tmpdir}/src"
+        with patch.object(
+            store_manager, "upload_many", wraps=store_manager.upload_many
+        ) as upload_many:
+            artifact.upload()
+        assert upload_many.call_count == 1, "dir files were not bulk uploaded"
+        assert sorted(listdir(f"{tmpdir}/dir")) == ["a.txt", "b.txt"]
+
+
+def _store_parent(secrets=None):
+    parent = Mock()
+    parent.secret.side_effect = lambda key: (secrets or {}).get(key)
+    return parent
+
+
+@pytest.mark.skipif(not has_boto3, reason="missing boto3")
+def test_s3_transfers():
+    from mlrun.datastore.s3 import S3Store
+
+    old_transfer = mlrun.mlconf.data_transfer.to_dict()
+    mlrun.mlconf.data_transfer.part_size = 1024
+    mlrun.mlconf.data_transfer.concurrency = 4
+    mlrun.mlconf.data_transfer.bulk_concurrency = 16
+    try:
+        with patch("boto3.resource") as resource:
+            store = S3Store(_store_parent(), "s3", "s3://bucket", "bucket")
+            client_config = resource.call_args[1]["config"]
+            assert client_config.max_pool_connections == 16, "bad pool size"
+
+            s3_object = resource.return_value.Object
+            store.upload("/dir/file.bin", "src.bin")
+            s3_object.assert_called_with("bucket", "dir/file.bin")
+            store.download("/dir/file.bin", "dst.bin")
+            transfers = [("upload_file", "src.bin"), ("download_file", "dst.bin")]
+            for method, path in transfers:
+                args, kwargs = getattr(s3_object.return_value, method).call_args
+                assert args == (path,), f"bad {method} path"
+                transfer_config = kwargs["Config"]
+                assert transfer_config.multipart_threshold == 1024
+                assert transfer_config.multipart_chunksize == 1024
+                assert transfer_config.max_concurrency == 4
+    finally:
+        mlrun.mlconf.data_transfer = old_transfer
+
+
+@pytest.mark.skipif(not has_azure, reason="missing azure storage blob")
+def test_azure_transfers():
+    from mlrun.datastore.azure_blob import AzureBlobStore
+
+    old_transfer = mlrun.mlconf.data_transfer.to_dict()
+    mlrun.mlconf.data_transfer.part_size = 1024
+    mlrun.mlconf.data_transfer.concurrency = 4
+    secrets = {"AZURE_STORAGE_CONNECTION_STRING": "connection"}
+    try:
+        service_path = "mlrun.datastore.azure_blob.BlobServiceClient"
+        with patch(service_path) as service_client, TemporaryDirectory() as tmpdir:
+            store = AzureBlobStore(_store_parent(secrets), "az", "az://box", "box")
+            service_client.from_connection_string.assert_called_with(
+                "connection",
+                max_single_put_size=1024,
+                max_block_size=1024,
+                max_single_get_size=1024,
+                max_chunk_get_size=1024,
+            )
+
+            service = service_client.from_connection_string.return_value
+            blob_client = service.get_blob_client.return_value
+            with open(f"{tmpdir}/src.bin", "wb") as fp:
+                fp.write(b"data")
+            store.upload("/dir/file.bin", f"{tmpdir}/src.bin")
+            service.get_blob_client.assert_called_with(
+                container="box", blob="dir/file.bin"
+            )
+            assert blob_client.upload_blob.call_args[1] == {
+                "overwrite": True,
+                "max_concurrency": 4,
+            }, "bad upload args"
+
+            store.download("/dir/file.bin", f"{tmpdir}/dst.bin")
+            blob_client.download_blob.assert_called_with(max_concurrency=4)
+            assert blob_client.download_blob.return_value.readinto.called
+    finally:
+        mlrun.mlconf.data_transfer = old_transfer